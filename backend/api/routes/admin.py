@@ -0,0 +1,47 @@
+"""
+Admin API Routes
+"""
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Dict, Any
+import logging
+import secrets
+
+from config import settings
+from ml.model_server import model_server
+from ml.training import training_service
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def require_admin(x_admin_token: str = Header("", description="Must match ADMIN_TOKEN")):
+    """
+    Allow the request only with the configured admin token.
+
+    Raises:
+        HTTPException: 403 if ADMIN_TOKEN is unset or the header doesn't match
+    """
+    if not settings.admin_token or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.post("/retrain", status_code=202, dependencies=[Depends(require_admin)])
+async def retrain() -> Dict[str, Any]:
+    """
+    Start a retrain: absorb finished gameweeks, train, and publish the new model.
+
+    Training runs in the background; poll GET /retrain for the result.
+
+    Raises:
+        HTTPException: 409 if a retrain is already running
+    """
+    if not training_service.trigger("admin"):
+        raise HTTPException(status_code=409, detail="A retrain is already running")
+    logger.info("Retrain triggered via admin API")
+    return training_service.status()
+
+
+@router.get("/retrain", dependencies=[Depends(require_admin)])
+async def retrain_status() -> Dict[str, Any]:
+    """Current or last training run, the schedule, and the model being served."""
+    return {**training_service.status(), "model": model_server.status()}
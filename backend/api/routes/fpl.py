@@ -1,8 +1,10 @@
 """
 FPL Data API Routes
 """
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Path, Query, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
+import asyncio
 import logging
 
 from services.fpl_api import fpl_client
@@ -161,3 +163,75 @@ async def get_fixtures(
     except Exception as e:
         logger.error(f"Error getting fixtures: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/live/{gameweek}/stream")
+async def stream_live_gameweek(gameweek: int = Path(..., ge=1, le=38)):
+    """
+    Stream live gameweek points as Server-Sent Events.
+
+    The first event is a full snapshot, later events carry only the players
+    whose stats changed. All clients share one upstream poller.
+
+    Args:
+        gameweek: Gameweek number
+
+    Returns:
+        text/event-stream response
+    """
+    async def event_stream():
+        # Subscribe when the response starts streaming, so the finally always runs
+        queue = fpl_client.subscribe_live(gameweek)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15.0)
+                    yield f"data: {message}\n\n"
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            fpl_client.unsubscribe_live(gameweek, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/live/{gameweek}/ws")
+async def live_gameweek_websocket(websocket: WebSocket, gameweek: int = Path(..., ge=1, le=38)):
+    """
+    Push live gameweek points over a WebSocket.
+
+    The socket is read while waiting for updates, so a client that goes away
+    between deltas is unsubscribed straight away rather than at the next send.
+
+    Args:
+        gameweek: Gameweek number
+    """
+    await websocket.accept()
+    queue = fpl_client.subscribe_live(gameweek)
+    receiver = asyncio.ensure_future(websocket.receive())
+    getter = asyncio.ensure_future(queue.get())
+
+    try:
+        while True:
+            done, _ = await asyncio.wait({receiver, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    break
+                # Clients have nothing to say; ignore anything they send
+                receiver = asyncio.ensure_future(websocket.receive())
+            if getter in done:
+                await websocket.send_text(getter.result())
+                getter = asyncio.ensure_future(queue.get())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.debug(f"Live GW{gameweek} websocket send failed: {e}")
+    finally:
+        receiver.cancel()
+        getter.cancel()
+        fpl_client.unsubscribe_live(gameweek, queue)
+        logger.debug(f"Live GW{gameweek} websocket disconnected")
@@ -1,16 +1,76 @@
 """
 OCR API Routes
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Dict, Any
+import json
 import logging
 
-from services.ocr_service import ocr_service
+from config import settings
+from services.ocr_service import ocr_service, OCRQueueFullError
+from services.ocr_jobs import ocr_jobs
 from models.fpl_models import OCRResult
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_SIZE = 256 * 1024
+MULTIPART_OVERHEAD = 64 * 1024  # Part headers and boundaries on top of the file bytes
+
+
+def upload_limits(prefix: str) -> Dict[str, int]:
+    """
+    Request body limits for the upload routes, for UploadLimitMiddleware.
+
+    Args:
+        prefix: Path the router is mounted under (e.g. "/api/ocr")
+
+    Returns:
+        Maximum body bytes by route path
+    """
+    per_image = settings.ocr_max_upload_bytes + MULTIPART_OVERHEAD
+    return {
+        f"{prefix}/upload": per_image,
+        f"{prefix}/upload/batch": per_image * settings.ocr_batch_max_images,
+        f"{prefix}/jobs": per_image * settings.ocr_batch_max_images,
+    }
+
+
+async def read_upload(file: UploadFile) -> bytearray:
+    """
+    Read an uploaded image in chunks, enforcing the size limit as it goes.
+
+    Args:
+        file: Image file upload
+
+    Returns:
+        Encoded image bytes, in a buffer that is passed on without further copies
+
+    Raises:
+        HTTPException: 400 if the file isn't an image, 413 if it is too large
+    """
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File must be an image: {file.filename}"
+        )
+
+    max_bytes = settings.ocr_max_upload_bytes
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File size must be less than {max_bytes // (1024 * 1024)}MB: {file.filename}"
+    )
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        if len(buffer) + len(chunk) > max_bytes:
+            raise too_large
+        buffer += chunk
+    return buffer
+
 
 @router.post("/upload", response_model=OCRResult)
 async def upload_team_image(file: UploadFile = File(...)):
@@ -23,44 +83,214 @@ async def upload_team_image(file: UploadFile = File(...)):
     Returns:
         OCR result with detected players
     """
-    # Validate file type
-    if not file.content_type.startswith("image/"):
+    # Validate file type and size while reading
+    contents = await read_upload(file)
+    
+    try:
+        logger.info(f"Processing uploaded image: {file.filename}")
+        result = await ocr_service.process_image(contents)
+        
+        if not result.success:
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "message": "Failed to process image",
+                    "errors": result.validation_errors
+                }
+            )
+        
+        return result
+        
+    except OCRQueueFullError as e:
+        logger.warning(f"Rejecting upload {file.filename}: {e}")
         raise HTTPException(
-            status_code=400,
-            detail="File must be an image"
+            status_code=429,
+            detail="OCR service is busy. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing image: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
         )
+
+
+@router.post("/upload/batch", response_model=OCRResult)
+async def upload_team_images(files: List[UploadFile] = File(...)):
+    """
+    Upload several screenshots of one team (e.g. pitch view and bench) and
+    process them together as a single squad.
     
-    # Validate file size (10MB max)
-    contents = await file.read()
-    if len(contents) > 10 * 1024 * 1024:
+    Args:
+        files: Image file uploads
+        
+    Returns:
+        OCR result with detected players merged across all images
+    """
+    if len(files) > settings.ocr_batch_max_images:
         raise HTTPException(
             status_code=400,
-            detail="File size must be less than 10MB"
+            detail=f"At most {settings.ocr_batch_max_images} images can be uploaded at once"
         )
     
+    images = [await read_upload(file) for file in files]
+    
     try:
-        logger.info(f"Processing uploaded image: {file.filename}")
-        result = await ocr_service.process_image(contents)
+        logger.info(f"Processing {len(images)} uploaded images: {[f.filename for f in files]}")
+        result = await ocr_service.process_images(images)
         
         if not result.success:
             raise HTTPException(
                 status_code=422,
                 detail={
-                    "message": "Failed to process image",
+                    "message": "Failed to process images",
                     "errors": result.validation_errors
                 }
             )
         
         return result
         
+    except OCRQueueFullError as e:
+        logger.warning(f"Rejecting batch upload: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail="OCR service is busy. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing image: {e}")
+        logger.error(f"Error processing images: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
 
 
+def _job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job record (the result is served separately)."""
+    return {key: value for key, value in job.items() if key != "result"}
+
+
+@router.post("/jobs", status_code=202)
+async def submit_ocr_job(
+    files: List[UploadFile] = File(...),
+    priority: int = Query(5, ge=0, le=9, description="0 is highest")
+):
+    """
+    Queue screenshots of one team for OCR and return immediately.
+    
+    Poll /jobs/{job_id} or stream /jobs/{job_id}/events for progress, then
+    fetch /jobs/{job_id}/result.
+    
+    Args:
+        files: Image file uploads
+        priority: Queue priority, 0 (highest) to 9
+        
+    Returns:
+        Job id and status
+
+    Raises:
+        HTTPException: 429 if OCR_JOB_MAX_QUEUED jobs are already waiting
+    """
+    if len(files) > settings.ocr_batch_max_images:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ocr_batch_max_images} images can be uploaded at once"
+        )
+    
+    images = [await read_upload(file) for file in files]
+    try:
+        job = await ocr_jobs.submit(images, priority)
+    except OCRQueueFullError as e:
+        logger.warning(f"Rejecting OCR job: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many OCR jobs are waiting. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return _job_status(job)
+
+
+@router.get("/jobs/{job_id}")
+async def get_ocr_job(job_id: str):
+    """
+    Get an OCR job's status and timings.
+    
+    Args:
+        job_id: Job id
+        
+    Returns:
+        Job status, attempts and queue/execution timings
+    """
+    job = await ocr_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
+
+
+@router.get("/jobs/{job_id}/result", response_model=OCRResult)
+async def get_ocr_job_result(job_id: str):
+    """
+    Get the OCR result of a finished job.
+    
+    Args:
+        job_id: Job id
+        
+    Returns:
+        OCR result with detected players
+    """
+    job = await ocr_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job["status"] not in ("succeeded", "failed"):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    
+    if job["status"] == "failed":
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": "Failed to process image",
+                "errors": job["result"]["validation_errors"] if job["result"] else [job["error"]]
+            }
+        )
+    
+    return job["result"]
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_ocr_job(job_id: str):
+    """
+    Stream an OCR job's status as Server-Sent Events until it finishes.
+    
+    Args:
+        job_id: Job id
+        
+    Returns:
+        text/event-stream response
+    """
+    job = await ocr_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        async for update in ocr_jobs.events(job_id):
+            if update is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"data: {json.dumps(_job_status(update))}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/validate")
 async def validate_team(team_data: dict):
     """
@@ -5,7 +5,9 @@ from fastapi import APIRouter, Query, HTTPException
 from typing import Optional, List
 import logging
 
-from models.fpl_models import PlayerPrediction
+from models.fpl_models import PlayerPrediction, PlayerHorizon
+from services.fpl_api import fpl_client
+from services.prediction_engine import prediction_engine, POSITION_IDS
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -32,10 +34,13 @@ async def get_predictions(
     Returns:
         List of player predictions
     """
-    # TODO: Implement prediction logic
     logger.info(f"Getting predictions for GW{gameweek}")
-    
-    return []
+
+    element_type = _parse_position(position) if position else None
+    batch = await prediction_engine.get_batch(await fpl_client.get_players(), gameweek)
+    rows = batch.top(element_type, min_price, max_price, limit)
+
+    return batch.to_predictions(rows)
 
 
 @router.get("/player/{player_id}", response_model=PlayerPrediction)
@@ -53,13 +58,14 @@ async def get_player_prediction(
     Returns:
         Player prediction
     """
-    # TODO: Implement player prediction logic
     logger.info(f"Getting prediction for player {player_id}, GW{gameweek}")
-    
-    raise HTTPException(
-        status_code=501,
-        detail="Player predictions not yet implemented"
-    )
+
+    batch = await prediction_engine.get_batch(await fpl_client.get_players(), gameweek)
+    row = batch.row(player_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Player {player_id} not found")
+
+    return batch.to_prediction(row)
 
 
 @router.get("/top/{position}")
@@ -79,7 +85,55 @@ async def get_top_players(
     Returns:
         Top players by predicted points
     """
-    # TODO: Implement top players logic
     logger.info(f"Getting top {limit} {position} for GW{gameweek}")
-    
-    return []
+
+    element_type = None if position.upper() == "ALL" else _parse_position(position)
+    batch = await prediction_engine.get_batch(await fpl_client.get_players(), gameweek)
+    rows = batch.top(element_type, limit=limit)
+
+    return batch.to_predictions(rows)
+
+
+@router.get("/horizon", response_model=List[PlayerHorizon])
+async def get_horizon(
+    gameweek: Optional[int] = Query(None, description="First gameweek (defaults to next)"),
+    gameweeks: int = Query(5, ge=1, description="Gameweeks to look ahead (up to PREDICTION_HORIZON)"),
+    position: Optional[str] = Query(None, description="Filter by position (GK, DEF, MID, FWD)"),
+    min_price: Optional[float] = Query(None, description="Minimum price"),
+    max_price: Optional[float] = Query(None, description="Maximum price"),
+    limit: int = Query(50, ge=1, le=200, description="Number of results")
+):
+    """
+    Get expected points per gameweek over the coming gameweeks.
+
+    Blank gameweeks count zero and double gameweeks both fixtures.
+
+    Args:
+        gameweek: First gameweek
+        gameweeks: Number of gameweeks
+        position: Filter by position
+        min_price: Minimum player price
+        max_price: Maximum player price
+        limit: Number of results to return
+
+    Returns:
+        Players ranked by total expected points over the horizon
+    """
+    logger.info(f"Getting {gameweeks}-gameweek horizon from GW{gameweek}")
+
+    element_type = _parse_position(position) if position else None
+    batch = await prediction_engine.get_batch(await fpl_client.get_players(), gameweek)
+    rows = batch.rank_horizon(batch.select(element_type, min_price, max_price), gameweeks)[:limit]
+
+    return [batch.to_horizon(row, gameweeks) for row in rows]
+
+
+def _parse_position(position: str) -> int:
+    """Map a position name (GK, DEF, MID, FWD) to its element_type."""
+    element_type = POSITION_IDS.get(position.upper())
+    if element_type is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid position {position}. Use one of: {', '.join(POSITION_IDS)}"
+        )
+    return element_type
@@ -2,12 +2,13 @@
 Teams API Routes
 """
 from fastapi import APIRouter, HTTPException
-from typing import List
 import logging
 import httpx
+import numpy as np
 
 from models.fpl_models import TeamAnalysis, PlayerPrediction
 from services.fpl_api import fpl_client
+from services.prediction_engine import prediction_engine, suggest_transfers, PredictionBatch
 from services.supabase_client import supabase_service
 
 router = APIRouter()
@@ -23,7 +24,8 @@ async def analyze_team(team_data: dict):
         team_data: Team data including players
 
     Returns:
-        Team analysis with predictions and suggestions
+        Team analysis with predictions and suggestions; its id links to
+        GET /analysis/{id} when the analysis was saved
     """
     try:
         logger.info("Analyzing team")
@@ -50,45 +52,41 @@ async def analyze_team(team_data: dict):
 
         logger.info(f"Fetched {len(all_players)} total players from FPL API")
 
-        team_players = [p for p in all_players if p.get("id") in player_ids]
-        logger.info(f"Found {len(team_players)} team players")
+        batch = await prediction_engine.get_batch(all_players)
+        team_rows = batch.rows(player_ids)
+        logger.info(f"Found {len(team_rows)} team players")
 
-        if len(team_players) < len(player_ids) and len(team_players) < 11:
-            missing_ids = set(player_ids) - {p.get("id") for p in team_players}
+        if len(team_rows) < len(player_ids) and len(team_rows) < 11:
+            missing_ids = set(player_ids) - set(batch.ids[team_rows].tolist())
             logger.warning(f"Some players not found: {missing_ids}")
             raise HTTPException(status_code=400, detail=f"Players not found: {missing_ids}")
 
-        team_value = sum(p.get("now_cost", 0) for p in team_players) / 10.0
-        predicted_points = sum(_calculate_simple_prediction(p) for p in team_players[:11])
-        predicted_bench_points = sum(_calculate_simple_prediction(p) for p in team_players[11:])
+        team_value = float(batch.now_cost[team_rows].sum()) / 10.0
+        predicted_points = float(batch.expected_points[team_rows[:11]].sum())
+        predicted_bench_points = float(batch.expected_points[team_rows[11:]].sum())
 
-        captain_player = max(team_players[:11], key=lambda p: _calculate_simple_prediction(p))
-        vice_captain = sorted(
-            [p for p in team_players[:11] if p["id"] != captain_player["id"]],
-            key=lambda p: _calculate_simple_prediction(p),
-            reverse=True
-        )[0]
+        captain_row, vice_captain_row = _pick_captains(batch, team_rows[:11])
 
         logger.info("Generating transfer suggestions")
-        transfer_suggestions = _generate_transfer_suggestions(team_players, all_players)
+        transfer_suggestions = suggest_transfers(batch, team_rows)
 
         analysis_data = {
             "team_value": round(team_value, 1),
             "free_transfers": team_data.get("free_transfers", 1),
             "bank": team_data.get("bank", 0.0),
             "players": player_ids,
-            "captain_id": captain_player["id"],
-            "vice_captain_id": vice_captain["id"],
+            "captain_id": int(batch.ids[captain_row]),
+            "vice_captain_id": int(batch.ids[vice_captain_row]),
             "predicted_gameweek_points": round(predicted_points, 1),
             "predicted_bench_points": round(predicted_bench_points, 1),
             "transfer_suggestions": transfer_suggestions,
-            "captain_suggestion": _create_player_prediction(captain_player),
-            "vice_captain_suggestion": _create_player_prediction(vice_captain),
+            "captain_suggestion": batch.to_prediction(captain_row),
+            "vice_captain_suggestion": batch.to_prediction(vice_captain_row),
             "bench_order": player_ids[11:]
         }
 
         logger.info("Team analysis complete, saving to database")
-        # Save to database in background without blocking response
+        analysis_id = None
         try:
             analysis_id = await supabase_service.save_team_analysis(analysis_data)
             logger.info(f"Team analysis saved with ID: {analysis_id}")
@@ -96,7 +94,7 @@ async def analyze_team(team_data: dict):
             logger.error(f"Failed to save analysis to database: {save_error}")
             # Don't fail the response if database save fails
 
-        return TeamAnalysis(**analysis_data)
+        return TeamAnalysis(**analysis_data, id=analysis_id)
 
     except HTTPException:
         raise
@@ -111,6 +109,24 @@ async def analyze_team(team_data: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/analysis/{analysis_id}", response_model=TeamAnalysis)
+async def get_saved_analysis(analysis_id: str):
+    """
+    Get a previously saved team analysis.
+
+    Args:
+        analysis_id: Analysis ID returned when the analysis was saved
+
+    Returns:
+        The saved team analysis
+    """
+    analysis = await supabase_service.get_team_analysis(analysis_id)
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    return TeamAnalysis(**{**analysis, "id": str(analysis["id"])})
+
+
 @router.post("/captain")
 async def get_captain_suggestion(team_data: dict):
     """
@@ -130,20 +146,17 @@ async def get_captain_suggestion(team_data: dict):
             raise HTTPException(status_code=400, detail="No players provided")
 
         all_players = await fpl_client.get_players()
-        team_players = [p for p in all_players if p.get("id") in player_ids]
+        batch = await prediction_engine.get_batch(all_players)
 
-        captain_player = max(team_players, key=lambda p: _calculate_simple_prediction(p))
-        vice_captain = sorted(
-            [p for p in team_players if p["id"] != captain_player["id"]],
-            key=lambda p: _calculate_simple_prediction(p),
-            reverse=True
-        )[0]
+        captain_row, vice_captain_row = _pick_captains(batch, batch.rows(player_ids))
 
         return {
-            "captain": _create_player_prediction(captain_player),
-            "vice_captain": _create_player_prediction(vice_captain)
+            "captain": batch.to_prediction(captain_row),
+            "vice_captain": batch.to_prediction(vice_captain_row)
         }
 
+    except HTTPException:
+        raise
     except httpx.TimeoutException as e:
         logger.error(f"FPL API timeout while getting captain suggestion: {e}")
         raise HTTPException(status_code=504, detail="FPL API service is slow. Please try again.")
@@ -174,12 +187,12 @@ async def get_bench_order(team_data: dict):
             return {"bench_order": []}
 
         all_players = await fpl_client.get_players()
-        bench_players = [p for p in all_players if p.get("id") in player_ids]
+        batch = await prediction_engine.get_batch(all_players)
 
-        bench_players.sort(key=lambda p: _calculate_simple_prediction(p), reverse=True)
+        bench_rows = batch.rank(batch.rows(player_ids))
 
         return {
-            "bench_order": [p["id"] for p in bench_players]
+            "bench_order": batch.ids[bench_rows].tolist()
         }
 
     except httpx.TimeoutException as e:
@@ -193,93 +206,15 @@ async def get_bench_order(team_data: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def _calculate_simple_prediction(player: dict) -> float:
-    """Calculate simple prediction based on form and recent points."""
-    form = float(player.get("form", 0) or 0)
-    points_per_game = float(player.get("points_per_game", 0) or 0)
-    total_points = player.get("total_points", 0)
-
-    if total_points < 10:
-        return form * 1.2
-
-    return (form * 0.6 + points_per_game * 0.4) * 1.1
-
-
-def _create_player_prediction(player: dict) -> dict:
-    """Create a player prediction object."""
-    expected_points = _calculate_simple_prediction(player)
-
-    return {
-        "player_id": player["id"],
-        "player_name": player.get("web_name", ""),
-        "team": str(player.get("team", "")),
-        "position": _get_position_name(player.get("element_type", 0)),
-        "expected_points": round(expected_points, 1),
-        "expected_points_floor": round(expected_points * 0.6, 1),
-        "expected_points_ceiling": round(expected_points * 1.4, 1),
-        "start_probability": 0.85 if player.get("minutes", 0) > 200 else 0.65,
-        "expected_minutes": min(90, player.get("minutes", 0) / max(player.get("event_points", 1), 1)),
-        "rotation_risk": 0.2 if player.get("minutes", 0) > 500 else 0.4,
-        "injury_risk": 0.1 if player.get("status") == "a" else 0.6,
-        "confidence_score": 0.7,
-        "key_factors": [
-            f"Form: {player.get('form', 0)}",
-            f"Points: {player.get('total_points', 0)}",
-            f"Price: £{player.get('now_cost', 0) / 10.0}m"
-        ],
-        "fixture_difficulty": 3,
-        "opponent": "TBD"
-    }
-
-
-def _get_position_name(element_type: int) -> str:
-    """Get position name from element_type."""
-    positions = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
-    return positions.get(element_type, "UNK")
-
-
-def _generate_transfer_suggestions(team_players: List[dict], all_players: List[dict]) -> List[dict]:
-    """Generate basic transfer suggestions."""
-    suggestions = []
-
-    worst_performers = sorted(team_players[:11], key=lambda p: _calculate_simple_prediction(p))[:3]
-
-    best_alternatives = sorted(
-        [p for p in all_players if p["id"] not in [tp["id"] for tp in team_players]],
-        key=lambda p: _calculate_simple_prediction(p),
-        reverse=True
-    )[:10]
-
-    for i, player_out in enumerate(worst_performers[:2]):
-        for player_in in best_alternatives[:3]:
-            if player_in.get("element_type") == player_out.get("element_type"):
-                cost_diff = (player_in.get("now_cost", 0) - player_out.get("now_cost", 0)) / 10.0
-
-                if abs(cost_diff) <= 3.0:
-                    points_out = _calculate_simple_prediction(player_out)
-                    points_in = _calculate_simple_prediction(player_in)
-                    gain = points_in - points_out
-
-                    if gain > 0.5:
-                        suggestions.append({
-                            "player_out_id": player_out["id"],
-                            "player_out_name": player_out.get("web_name", ""),
-                            "player_in_id": player_in["id"],
-                            "player_in_name": player_in.get("web_name", ""),
-                            "expected_points_gain": round(gain, 1),
-                            "expected_points_gain_5gw": round(gain * 5, 1),
-                            "transfer_cost": 0,
-                            "net_cost_change": round(cost_diff, 1),
-                            "category": "overall" if i == 0 else "differential",
-                            "risk_level": "low" if gain > 2 else "medium",
-                            "risk_score": 0.3,
-                            "reasoning": f"Upgrade to higher form player with {gain:.1f} point advantage",
-                            "key_factors": [
-                                f"{player_in.get('web_name')} form: {player_in.get('form', 0)}",
-                                f"{player_out.get('web_name')} form: {player_out.get('form', 0)}",
-                                f"Cost difference: £{cost_diff:.1f}m"
-                            ]
-                        })
-                        break
-
-    return suggestions[:5]
+def _pick_captains(batch: PredictionBatch, rows: np.ndarray) -> tuple:
+    """
+    Highest and second-highest predicted players among rows.
+
+    Returns:
+        Tuple of (captain row, vice-captain row)
+    """
+    if len(rows) < 2:
+        raise HTTPException(status_code=400, detail="At least two known players are needed to pick a captain")
+
+    ranked = batch.rank(rows)
+    return int(ranked[0]), int(ranked[1])
@@ -6,6 +6,8 @@ from typing import List
 import logging
 
 from models.fpl_models import TransferSuggestion, TeamAnalysis
+from services.fpl_api import fpl_client
+from services.prediction_engine import prediction_engine, suggest_transfers, TRANSFER_HORIZON
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -22,10 +24,15 @@ async def get_transfer_suggestions(team_data: dict):
     Returns:
         List of transfer suggestions
     """
-    # TODO: Implement transfer optimization logic
     logger.info("Generating transfer suggestions")
-    
-    return []
+
+    player_ids = team_data.get("players", [])
+    if not player_ids:
+        raise HTTPException(status_code=400, detail="No players provided")
+
+    batch = await prediction_engine.get_batch(await fpl_client.get_players(), team_data.get("gameweek"))
+
+    return suggest_transfers(batch, batch.rows(player_ids))
 
 
 @router.post("/evaluate")
@@ -39,13 +46,23 @@ async def evaluate_transfer(transfer_data: dict):
     Returns:
         Transfer evaluation with expected points gain
     """
-    # TODO: Implement transfer evaluation logic
     logger.info("Evaluating transfer")
-    
+
+    batch = await prediction_engine.get_batch(await fpl_client.get_players(), transfer_data.get("gameweek"))
+    row_out = batch.row(transfer_data.get("player_out"))
+    row_in = batch.row(transfer_data.get("player_in"))
+    if row_out is None or row_in is None:
+        raise HTTPException(status_code=404, detail="Player not found")
+
+    gain = float(batch.expected_points[row_in] - batch.expected_points[row_out])
+    horizon_out, horizon_in = batch.horizon_points([row_out, row_in], TRANSFER_HORIZON)
+    risk_level = "low" if gain > 2 else "medium" if gain > 0.5 else "high"
+
     return {
-        "expected_points_gain": 0.0,
-        "risk_level": "medium",
-        "recommendation": "Transfer evaluation not yet implemented"
+        "expected_points_gain": round(gain, 1),
+        "expected_points_gain_5gw": round(float(horizon_in - horizon_out), 1),
+        "risk_level": risk_level,
+        "recommendation": "Make the transfer" if gain > 0.5 else "Hold the transfer"
     }
 
 
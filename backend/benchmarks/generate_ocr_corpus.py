@@ -0,0 +1,283 @@
+"""
+Synthetic OCR corpus generator - FPL-style pitch views with ground truth
+
+Renders team screenshots from real player names: a valid 15-player squad on
+a pitch in a random formation with the bench underneath, varied by
+resolution, layout, theme, compression and noise. Each image gets a JSON
+sidecar with the squad, and the player snapshot used is saved as
+snapshot.json so benchmarks match against the same data offline.
+
+Run from the backend directory:
+
+    python -m benchmarks.generate_ocr_corpus corpus/ --count 40 --seed 1
+"""
+import argparse
+import asyncio
+import colorsys
+import io
+import json
+import logging
+import random
+from pathlib import Path
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+FORMATIONS = ["3-4-3", "3-5-2", "4-3-3", "4-4-2", "4-5-1", "5-3-2", "5-4-1"]
+SQUAD_SHAPE = {1: 2, 2: 5, 3: 5, 4: 3}  # element_type -> squad count
+WIDTHS = [540, 720, 1080, 1440]
+LAYOUTS = {"mobile": 1.7, "desktop": 1.15}  # height / width
+QUALITIES = [None, 92, 75, 50]  # None saves PNG
+NOISE_LEVELS = [0.0, 4.0, 10.0]
+
+THEMES = {
+    "classic": {"header": (55, 0, 60), "pitch": [(0, 135, 75), (0, 120, 66)], "bench": (220, 235, 225), "fixture": (55, 0, 60)},
+    "dark": {"header": (20, 20, 30), "pitch": [(22, 70, 40), (18, 60, 34)], "bench": (60, 70, 65), "fixture": (90, 20, 100)},
+    "light": {"header": (230, 230, 240), "pitch": [(110, 190, 120), (100, 178, 110)], "bench": (245, 245, 245), "fixture": (0, 90, 60)},
+}
+
+FONT_CANDIDATES = ["DejaVuSans-Bold.ttf", "Arial Bold.ttf", "arialbd.ttf"]
+
+
+def load_font(size: int) -> ImageFont.ImageFont:
+    """Bold TrueType font at the given size, or PIL's default font."""
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def team_colour(team_id: int) -> Tuple[int, int, int]:
+    """Stable, saturated shirt colour per team."""
+    r, g, b = colorsys.hsv_to_rgb((team_id * 0.137) % 1.0, 0.8, 0.85)
+    return int(r * 255), int(g * 255), int(b * 255)
+
+
+def pick_squad(players: List[Dict[str, Any]], rng: random.Random) -> Optional[List[Dict[str, Any]]]:
+    """
+    Draw a valid squad: 2 GK, 5 DEF, 5 MID, 3 FWD, at most 3 per club, distinct web names.
+
+    Returns:
+        Squad ordered by position, or None if the snapshot can't supply one
+    """
+    by_position: Dict[int, List[Dict[str, Any]]] = {}
+    for player in players:
+        by_position.setdefault(player["element_type"], []).append(player)
+
+    squad: List[Dict[str, Any]] = []
+    per_team: Dict[int, int] = {}
+    names = set()
+    for position, count in SQUAD_SHAPE.items():
+        candidates = by_position.get(position, [])[:]
+        rng.shuffle(candidates)
+        chosen = 0
+        for player in candidates:
+            if chosen == count:
+                break
+            name = player["web_name"].casefold()
+            if per_team.get(player["team"], 0) >= 3 or name in names:
+                continue
+            squad.append(player)
+            per_team[player["team"]] = per_team.get(player["team"], 0) + 1
+            names.add(name)
+            chosen += 1
+        if chosen < count:
+            return None
+    return squad
+
+
+def split_lineup(squad: List[Dict[str, Any]], formation: str) -> Tuple[List[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    Arrange a squad into pitch rows for a formation.
+
+    Returns:
+        Tuple of (rows GK/DEF/MID/FWD, bench with the spare goalkeeper first)
+    """
+    counts = [1] + [int(n) for n in formation.split("-")]
+    rows, bench = [], []
+    for position, count in zip((1, 2, 3, 4), counts):
+        group = [p for p in squad if p["element_type"] == position]
+        rows.append(group[:count])
+        bench.extend(group[count:])
+    bench.sort(key=lambda p: p["element_type"] != 1)
+    return rows, bench
+
+
+def render(
+    rows: List[List[Dict[str, Any]]],
+    bench: List[Dict[str, Any]],
+    teams: Dict[int, str],
+    width: int,
+    layout: str,
+    theme_name: str,
+    gameweek: int
+) -> Image.Image:
+    """Draw one pitch view."""
+    theme = THEMES[theme_name]
+    height = int(width * LAYOUTS[layout])
+    image = Image.new("RGB", (width, height), theme["pitch"][0])
+    draw = ImageDraw.Draw(image)
+
+    # Mown stripes
+    stripe = height // 14
+    for i, top in enumerate(range(0, height, stripe)):
+        draw.rectangle([0, top, width, top + stripe], fill=theme["pitch"][i % 2])
+
+    # Header with UI text the name filter has to ignore
+    header_height = int(height * 0.09)
+    draw.rectangle([0, 0, width, header_height], fill=theme["header"])
+    header_text = (255, 255, 255) if sum(theme["header"]) < 384 else (30, 30, 30)
+    header_font = load_font(max(10, header_height // 4))
+    draw.text((width * 0.04, header_height * 0.2), "Pick Team", fill=header_text, font=header_font)
+    draw.text((width * 0.04, header_height * 0.55), f"Gameweek {gameweek}", fill=header_text, font=header_font)
+    draw.text((width * 0.7, header_height * 0.35), "Bank 0.5", fill=header_text, font=header_font)
+
+    bench_top = int(height * 0.84)
+    draw.rectangle([0, bench_top, width, height], fill=theme["bench"])
+
+    plate_height = max(12, int(height * 0.026))
+    plate_font = load_font(int(plate_height * 0.72))
+    shirt_width = int(width * 0.075)
+    shirt_height = int(shirt_width * 1.1)
+
+    def draw_player(player: Dict[str, Any], cx: int, top: int, slot_width: float):
+        colour = team_colour(player["team"])
+        draw.rectangle([cx - shirt_width // 2, top, cx + shirt_width // 2, top + shirt_height], fill=colour)
+        draw.rectangle([cx - shirt_width, top + shirt_height // 5, cx - shirt_width // 2, top + shirt_height // 2], fill=colour)
+        draw.rectangle([cx + shirt_width // 2, top + shirt_height // 5, cx + shirt_width, top + shirt_height // 2], fill=colour)
+
+        # Plates never overlap their neighbours; long names get a smaller font
+        name = player["web_name"]
+        max_plate_width = int(slot_width * 0.94)
+        font = plate_font
+        size = int(plate_height * 0.72)
+        while draw.textlength(name, font=font) + plate_height > max_plate_width and size > 8:
+            size -= 1
+            font = load_font(size)
+        text_width = draw.textlength(name, font=font)
+        plate_width = int(min(max(text_width + plate_height, width * 0.13), max_plate_width))
+        plate_top = top + shirt_height + plate_height // 4
+        draw.rectangle(
+            [cx - plate_width // 2, plate_top, cx + plate_width // 2, plate_top + plate_height],
+            fill=(250, 250, 250)
+        )
+        draw.text((cx, plate_top + plate_height / 2), name, fill=(25, 25, 30), font=font, anchor="mm")
+
+        fixture_top = plate_top + plate_height
+        draw.rectangle(
+            [cx - plate_width // 2, fixture_top, cx + plate_width // 2, fixture_top + plate_height],
+            fill=theme["fixture"]
+        )
+        opponent = teams.get(player["team"] % 20 + 1, "OPP")
+        draw.text(
+            (cx, fixture_top + plate_height / 2), f"{opponent} (H)",
+            fill=(255, 255, 255), font=load_font(int(plate_height * 0.6)), anchor="mm"
+        )
+
+    pitch_top = header_height + int(height * 0.03)
+    row_gap = (bench_top - pitch_top) / 4
+    for i, row in enumerate(rows):
+        for j, player in enumerate(row):
+            cx = int((j + 1) * width / (len(row) + 1))
+            draw_player(player, cx, int(pitch_top + i * row_gap), width / (len(row) + 1))
+    for j, player in enumerate(bench):
+        cx = int((j + 1) * width / (len(bench) + 1))
+        draw_player(player, cx, bench_top + int(height * 0.015), width / (len(bench) + 1))
+
+    return image
+
+
+def encode(image: Image.Image, quality: Optional[int], noise: float, rng: np.random.Generator) -> Tuple[bytes, str]:
+    """
+    Add sensor-style noise and encode.
+
+    Returns:
+        Tuple of (file bytes, file suffix)
+    """
+    if noise > 0:
+        pixels = np.asarray(image, dtype=np.float32)
+        pixels += rng.normal(0, noise, pixels.shape)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    buffer = io.BytesIO()
+    if quality is None:
+        image.save(buffer, "PNG")
+        return buffer.getvalue(), ".png"
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue(), ".jpg"
+
+
+async def load_snapshot(snapshot: Optional[Path]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Players and teams from a saved snapshot, or live from the FPL API."""
+    if snapshot:
+        data = json.loads(snapshot.read_text())
+        return data["players"], data["teams"]
+
+    from services.fpl_api import fpl_client
+    await fpl_client.initialize()
+    try:
+        return await fpl_client.get_players(), await fpl_client.get_teams()
+    finally:
+        await fpl_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic FPL screenshot corpus")
+    parser.add_argument("output", type=Path, help="Directory to write images and sidecars to")
+    parser.add_argument("--count", type=int, default=40, help="Number of screenshots")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--snapshot", type=Path, help="Use players/teams from this snapshot.json instead of the FPL API")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    players, teams = asyncio.run(load_snapshot(args.snapshot))
+    if not players:
+        parser.error("No players available")
+    team_names = {team["id"]: team.get("short_name", "OPP") for team in teams}
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    (args.output / "snapshot.json").write_text(json.dumps({"players": players, "teams": teams}))
+
+    rng = random.Random(args.seed)
+    noise_rng = np.random.default_rng(args.seed)
+
+    for index in range(args.count):
+        squad = pick_squad(players, rng)
+        if squad is None:
+            parser.error("Snapshot can't supply a valid squad")
+
+        formation = rng.choice(FORMATIONS)
+        rows, bench = split_lineup(squad, formation)
+        variant = {
+            "width": rng.choice(WIDTHS),
+            "layout": rng.choice(list(LAYOUTS)),
+            "theme": rng.choice(list(THEMES)),
+            "quality": rng.choice(QUALITIES),
+            "noise": rng.choice(NOISE_LEVELS),
+        }
+
+        image = render(rows, bench, team_names, variant["width"], variant["layout"], variant["theme"], rng.randint(1, 38))
+        data, suffix = encode(image, variant["quality"], variant["noise"], noise_rng)
+
+        stem = f"team_{index:03d}"
+        (args.output / f"{stem}{suffix}").write_bytes(data)
+        starters = [p for row in rows for p in row]
+        (args.output / f"{stem}.json").write_text(json.dumps({
+            "players": [p["web_name"] for p in starters + bench],
+            "player_ids": [p["id"] for p in starters + bench],
+            "starters": [p["id"] for p in starters],
+            "bench": [p["id"] for p in bench],
+            "formation": formation,
+            "variant": variant,
+        }, indent=2))
+        logger.info(f"{stem}{suffix}: {formation}, {variant}")
+
+
+if __name__ == "__main__":
+    main()
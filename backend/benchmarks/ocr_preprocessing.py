@@ -0,0 +1,164 @@
+"""
+OCR preprocessing benchmark - latency and name-match accuracy per preprocessing mode
+
+The corpus is a directory of screenshots, each with a JSON sidecar of the same
+stem listing the player names shown on it:
+
+    corpus/
+        team_01.png
+        team_01.json    {"players": ["Raya", "Saliba", ...]}
+
+Run from the backend directory:
+
+    python -m benchmarks.ocr_preprocessing path/to/corpus --modes fast,balanced,accurate,auto
+"""
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+from dataclasses import replace
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz
+
+from config import settings
+from services import ocr_worker
+from services.ocr_service import ocr_service
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def load_corpus(corpus_dir: Path) -> List[Tuple[Path, bytes, List[str]]]:
+    """
+    Load screenshots that have a ground-truth sidecar.
+
+    Returns:
+        List of (path, image bytes, expected player names)
+    """
+    corpus = []
+    for path in sorted(corpus_dir.iterdir()):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        sidecar = path.with_suffix(".json")
+        if not sidecar.exists():
+            logger.warning(f"Skipping {path.name}: no {sidecar.name}")
+            continue
+        expected = json.loads(sidecar.read_text())["players"]
+        corpus.append((path, path.read_bytes(), expected))
+    return corpus
+
+
+def score_names(detected: List[str], expected: List[str]) -> Tuple[int, int, int]:
+    """
+    Match detected names one-to-one against the ground truth.
+
+    A detected name counts when it fuzzy-matches an unclaimed expected name at
+    FUZZY_MATCH_THRESHOLD, the same cut-off the service uses.
+
+    Returns:
+        Tuple of (correct, detected count, expected count)
+    """
+    remaining = [name.casefold() for name in expected]
+    correct = 0
+    for name in detected:
+        scores = [fuzz.ratio(name.casefold(), candidate) for candidate in remaining]
+        if scores and max(scores) >= settings.fuzzy_match_threshold:
+            remaining.pop(int(np.argmax(scores)))
+            correct += 1
+    return correct, len(detected), len(expected)
+
+
+def run_mode(
+    mode: str,
+    corpus: List[Tuple[Path, bytes, List[str]]],
+    reader: Any,
+    options: ocr_worker.OCROptions
+) -> Dict[str, Any]:
+    """
+    Benchmark one preprocessing mode over the corpus.
+
+    Returns:
+        Summary with preprocessing and end-to-end latency percentiles (ms),
+        precision, recall and, for auto, the modes it chose
+    """
+    options = replace(options, preprocess_mode=mode)
+    preprocess_ms = []
+    total_ms = []
+    correct = detected = expected_total = 0
+    chosen = Counter()
+
+    for path, image_bytes, expected in corpus:
+        image = ocr_worker.load_image(image_bytes, options.max_dimension)
+
+        start = time.perf_counter()
+        resolved = ocr_worker.choose_preprocess_mode(image) if mode == "auto" else mode
+        ocr_worker.preprocess_image(image, resolved)
+        preprocess_ms.append((time.perf_counter() - start) * 1000)
+        chosen[resolved] += 1
+
+        start = time.perf_counter()
+        extracted = ocr_worker.extract_text([image_bytes], ocr_service.engine, reader, options)[0]
+        total_ms.append((time.perf_counter() - start) * 1000)
+
+        names = [name for name, _, _ in ocr_service._filter_player_names(extracted)]
+        hits, found, wanted = score_names(names, expected)
+        correct += hits
+        detected += found
+        expected_total += wanted
+        logger.info(f"[{mode}] {path.name}: {hits}/{wanted} names in {total_ms[-1]:.0f}ms")
+
+    return {
+        "mode": mode,
+        "images": len(corpus),
+        "preprocess_p50_ms": round(float(np.percentile(preprocess_ms, 50)), 1),
+        "preprocess_p95_ms": round(float(np.percentile(preprocess_ms, 95)), 1),
+        "total_p50_ms": round(float(np.percentile(total_ms, 50)), 1),
+        "total_p95_ms": round(float(np.percentile(total_ms, 95)), 1),
+        "precision": round(correct / detected, 3) if detected else 0.0,
+        "recall": round(correct / expected_total, 3) if expected_total else 0.0,
+        "chosen_modes": dict(chosen),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR preprocessing modes")
+    parser.add_argument("corpus", type=Path, help="Directory of screenshots with JSON sidecars")
+    parser.add_argument("--modes", default="fast,balanced,accurate,auto", help="Comma-separated modes")
+    parser.add_argument("--no-layout", action="store_true", help="Disable name-plate detection (full-image OCR)")
+    parser.add_argument("--json", type=Path, help="Also write results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"No screenshots with sidecars found in {args.corpus}")
+
+    modes = [mode.strip() for mode in args.modes.split(",")]
+    for mode in modes:
+        if mode not in ocr_worker.PREPROCESS_MODES:
+            parser.error(f"Unknown mode: {mode}")
+
+    reader = ocr_worker.create_reader(ocr_service.engine, ocr_service.languages)
+    options = replace(ocr_service.options, layout_detection=not args.no_layout)
+
+    results = [run_mode(mode, corpus, reader, options) for mode in modes]
+
+    print(f"\n{'mode':<10}{'prep p50':>10}{'prep p95':>10}{'total p50':>11}{'total p95':>11}{'precision':>11}{'recall':>8}")
+    for r in results:
+        print(
+            f"{r['mode']:<10}{r['preprocess_p50_ms']:>10}{r['preprocess_p95_ms']:>10}"
+            f"{r['total_p50_ms']:>11}{r['total_p95_ms']:>11}{r['precision']:>11}{r['recall']:>8}"
+        )
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
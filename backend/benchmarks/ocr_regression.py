@@ -0,0 +1,196 @@
+"""
+OCR regression suite - latency, memory and squad accuracy per engine
+
+Drives OCRService.process_image over a corpus made by generate_ocr_corpus
+(images, JSON sidecars and snapshot.json) with the result cache disabled and
+OCR running in-process, so every image pays the full pipeline and its memory
+shows up in this process.
+
+Run from the backend directory:
+
+    python -m benchmarks.ocr_regression corpus/ --engines easyocr,tesseract --json results.json
+    python -m benchmarks.ocr_regression corpus/ --baseline results.json   # exit 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from config import settings
+from benchmarks.ocr_preprocessing import IMAGE_SUFFIXES
+from services.data_cache_service import data_cache
+
+logger = logging.getLogger(__name__)
+
+# Allowed drift against a baseline before the run counts as a regression
+MAX_RECALL_DROP = 0.02
+MAX_PRECISION_DROP = 0.02
+MAX_LATENCY_GROWTH = 0.2
+
+
+def load_corpus(corpus_dir: Path) -> List[Tuple[Path, bytes, Dict[str, Any]]]:
+    """
+    Load generated screenshots and their ground truth.
+
+    Returns:
+        List of (path, image bytes, sidecar)
+    """
+    corpus = []
+    for path in sorted(corpus_dir.iterdir()):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        sidecar = path.with_suffix(".json")
+        if sidecar.exists():
+            corpus.append((path, path.read_bytes(), json.loads(sidecar.read_text())))
+    return corpus
+
+
+async def run_engine(engine: str, corpus: List[Tuple[Path, bytes, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Benchmark one OCR engine over the corpus.
+
+    Returns:
+        Summary with latency percentiles (ms), peak traced memory (MB),
+        per-player precision/recall and formation accuracy
+    """
+    from services.ocr_service import OCRService
+
+    settings.ocr_engine = engine
+    service = OCRService()
+    try:
+        service._get_reader()
+    except Exception as e:
+        logger.warning(f"Skipping {engine}: {e}")
+        return {"engine": engine, "skipped": str(e)}
+
+    # Untimed warm-up so lazy model loading isn't counted against the first image
+    await service.process_image(corpus[0][1])
+
+    latencies, peaks = [], []
+    true_positives = matched_total = expected_total = 0
+    formations_correct = 0
+
+    for path, image_bytes, truth in corpus:
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = await service.process_image(image_bytes)
+        latencies.append((time.perf_counter() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / (1024 * 1024))
+
+        expected = set(truth["player_ids"])
+        matched = {player.id for player in result.matched_players}
+        hits = len(matched & expected)
+        true_positives += hits
+        matched_total += len(matched)
+        expected_total += len(expected)
+        formations_correct += result.formation == truth["formation"]
+
+        logger.info(
+            f"[{engine}] {path.name}: {hits}/{len(expected)} players, "
+            f"{len(matched) - hits} wrong, formation {result.formation} "
+            f"(expected {truth['formation']}), {latencies[-1]:.0f}ms"
+        )
+
+    service.shutdown()
+
+    return {
+        "engine": engine,
+        "images": len(corpus),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "peak_mb_p95": round(float(np.percentile(peaks, 95)), 1),
+        "precision": round(true_positives / matched_total, 3) if matched_total else 0.0,
+        "recall": round(true_positives / expected_total, 3) if expected_total else 0.0,
+        "formation_accuracy": round(formations_correct / len(corpus), 3),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]]) -> List[str]:
+    """
+    Find regressions against a previous run.
+
+    Returns:
+        Human-readable regression descriptions (empty if none)
+    """
+    previous = {r["engine"]: r for r in baseline if "skipped" not in r}
+    regressions = []
+    for current in results:
+        before = previous.get(current["engine"])
+        if not before or "skipped" in current:
+            continue
+        engine = current["engine"]
+        if current["recall"] < before["recall"] - MAX_RECALL_DROP:
+            regressions.append(f"{engine}: recall {before['recall']} -> {current['recall']}")
+        if current["precision"] < before["precision"] - MAX_PRECISION_DROP:
+            regressions.append(f"{engine}: precision {before['precision']} -> {current['precision']}")
+        if current["p95_ms"] > before["p95_ms"] * (1 + MAX_LATENCY_GROWTH):
+            regressions.append(f"{engine}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+    return regressions
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        raise SystemExit(f"No screenshots with sidecars found in {args.corpus}")
+
+    # Match against the snapshot the corpus was generated from
+    snapshot = args.corpus / "snapshot.json"
+    if snapshot.exists():
+        data_cache.set_players(json.loads(snapshot.read_text())["players"])
+
+    settings.ocr_workers = 0
+    settings.ocr_cache_size = 0
+
+    tracemalloc.start()
+    results = []
+    for engine in args.engines.split(","):
+        results.append(await run_engine(engine.strip(), corpus))
+    tracemalloc.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR latency/accuracy regression suite")
+    parser.add_argument("corpus", type=Path, help="Corpus directory from generate_ocr_corpus")
+    parser.add_argument("--engines", default="easyocr,tesseract", help="Comma-separated OCR engines")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    parser.add_argument("--baseline", type=Path, help="Previous results to check for regressions")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    results = asyncio.run(run(args))
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"\n{'engine':<11}{'p50 ms':>9}{'p95 ms':>9}{'peak MB':>9}{'precision':>11}{'recall':>8}{'formation':>11}")
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['engine']:<11}skipped: {r['skipped']}")
+            continue
+        print(
+            f"{r['engine']:<11}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['peak_mb_p95']:>9}"
+            f"{r['precision']:>11}{r['recall']:>8}{r['formation_accuracy']:>11}"
+        )
+    print(f"max RSS: {max_rss_mb:.0f}MB")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,9 +27,21 @@ class Settings(BaseSettings):
         return int(os.getenv("PORT", self.api_port))
     
     # Database
+    storage_backend: str = "supabase"  # supabase or sqlite (embedded, uses database_url)
+    storage_schema_dir: str = ""  # Defaults to supabase/migrations in the repo
     database_url: str = "sqlite:///./fpl_ai.db"
+    postgres_bulk_load: bool = False  # COPY bulk writes straight into database_url (Postgres only)
+    postgres_pool_size: int = 4
     supabase_url: str = ""
     supabase_anon_key: str = ""
+    supabase_max_workers: int = 8  # Threads running blocking Supabase calls
+    supabase_slow_query_seconds: float = 1.0
+    supabase_upsert_chunk_rows: int = 500
+    supabase_upsert_chunk_bytes: int = 1_000_000  # Stay well under PostgREST request limits
+    supabase_upsert_concurrency: int = 4
+    supabase_upsert_retries: int = 2
+    supabase_page_size: int = 1000  # Must not exceed PostgREST max-rows
+    supabase_read_concurrency: int = 4
     
     # Redis
     redis_host: str = "localhost"
@@ -41,16 +53,53 @@ class Settings(BaseSettings):
     fpl_api_base_url: str = "https://fantasy.premierleague.com/api"
     fpl_cache_ttl: int = 3600  # 1 hour
     fpl_deadline_cache_ttl: int = 300  # 5 minutes
+    analysis_cache_size: int = 1000  # Saved team analyses kept in memory
+    fpl_live_poll_interval: int = 30  # Seconds between /event/{gw}/live/ polls
+    fpl_live_queue_size: int = 100  # Pending live messages per subscriber
     
     # ML Models
     model_path: str = "./models"
-    model_version: str = "v1"
+    model_version: str = "v1"  # Served when MODEL_PATH/CURRENT doesn't name a version
+    model_reload_interval: int = 60  # Seconds between checks of MODEL_PATH/CURRENT for a new version; 0 disables
+    model_batch_cache_size: int = 16  # Model prediction batches kept in memory
+    prediction_cache_size: int = 8  # Scored snapshots kept per (players version, model version, gameweek)
+    prediction_top_k: int = 50  # Players presorted per position and price bucket for top-N queries
+    prediction_horizon: int = 5  # Gameweeks of expected points held per scored snapshot
+    explanation_top_k: int = 3  # Contributing features kept per player for key_factors
+    simulation_samples: int = 2000  # Monte Carlo gameweeks per scored snapshot; 0 uses fixed floor/ceiling multiples
+    feature_store_path: str = "./features"  # Per-season, per-gameweek feature matrices (.npy)
     retrain_schedule: str = "0 2 * * 1"  # Cron expression
+    retrain_enabled: bool = False  # Run the training pipeline on retrain_schedule
+    training_families: str = "xgboost,lightgbm,catboost,ridge"  # Ensemble members; missing libraries are skipped
+    training_cv_folds: int = 4  # Rolling-origin folds (last N played gameweeks)
+    training_time_budget: int = 1800  # Wall-clock seconds for all fits in a run
+    training_workers: int = 0  # Training processes; 0 uses every core
     
     # OCR
+    ocr_enabled: bool = True  # False serves the data API only; run ocr_app.py as a separate OCR tier
+    ocr_warmup: bool = False  # Warm the OCR engine in the background after startup
     ocr_engine: str = "easyocr"  # tesseract or easyocr
     ocr_languages: str = "en"
     ocr_confidence_threshold: float = 0.6
+    ocr_workers: int = 2  # OCR worker processes; 0 runs OCR on a thread in the API process
+    ocr_queue_size: int = 8  # Requests allowed to wait for a worker before returning 429
+    ocr_retry_after: int = 5  # Seconds suggested to clients when the queue is full
+    ocr_batch_max_images: int = 4  # Screenshots accepted per batch upload
+    ocr_max_upload_bytes: int = 10 * 1024 * 1024  # Per image; larger uploads get 413 before being fully read
+    ocr_max_dimension: int = 2000  # Images are downscaled at decode time to about this long side
+    ocr_layout_detection: bool = True  # OCR only the detected player name plates
+    ocr_text_height: int = 48  # Plate crops are scaled to this height in pixels
+    ocr_min_plates: int = 15  # Fewer detected plates than a full squad falls back to full-image OCR
+    ocr_preprocess_mode: str = "auto"  # fast, balanced, accurate, or auto to pick per image
+    ocr_cache_size: int = 512  # Results kept in memory by image digest; 0 disables the cache
+    ocr_cache_ttl: int = 86400  # Seconds results are kept in Redis
+    ocr_job_queue: str = "local"  # local (in-process) or redis (shared via CELERY_BROKER_URL)
+    ocr_job_consumers: int = 2  # Jobs processed at once in the API process; 0 leaves it to `python -m services.ocr_jobs`
+    ocr_job_max_attempts: int = 3
+    ocr_job_retry_backoff: float = 2.0  # Seconds, multiplied by the attempt number
+    ocr_job_timeout: float = 120.0  # Seconds before a running job is abandoned and failed
+    ocr_job_max_queued: int = 100  # Unfinished jobs accepted before submissions get 429
+    ocr_job_ttl: int = 3600  # Seconds job records and results are kept
     
     # Fuzzy Matching
     fuzzy_match_threshold: int = 80
@@ -63,6 +112,7 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-change-this-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    admin_token: str = ""  # X-Admin-Token for /api/admin; admin routes are disabled when empty
     
     # CORS
     cors_origins: str = "http://localhost:5173,http://localhost:5174,http://localhost:3000"
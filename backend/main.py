@@ -10,10 +10,20 @@ import asyncio
 from pathlib import Path
 
 from config import settings
-from api.routes import predictions, transfers, teams, ocr
+from api.routes import predictions, transfers, teams, admin
 from services.data_cache import cache_manager
 from services.fpl_api import fpl_client
 from services.supabase_client import supabase_service
+from ml.model_server import model_server
+from ml.training import training_service
+from utils.metrics import metrics_snapshot
+from utils.upload_limit import UploadLimitMiddleware
+
+# OCR pulls in OpenCV and the OCR engines; API processes that don't serve it skip the import
+if settings.ocr_enabled:
+    from api.routes import ocr
+    from services.ocr_service import ocr_service
+    from services.ocr_jobs import ocr_jobs
 
 # Create necessary directories before logging setup
 Path("logs").mkdir(exist_ok=True)
@@ -62,15 +72,31 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"FPL API cache pre-warm failed: {e}, will use fallback data")
 
+    # Optionally warm the OCR engine in the background so startup isn't delayed
+    if settings.ocr_enabled and settings.ocr_warmup:
+        asyncio.create_task(ocr_service.warm_up())
+
+    if settings.ocr_enabled:
+        ocr_jobs.start()
+
+    await model_server.start()
+    if settings.retrain_enabled:
+        training_service.start()
+
     logger.info("FPL AI Model API started successfully")
     
     yield
     
     # Shutdown
     logger.info("Shutting down FPL AI Model API...")
+    await training_service.stop()
+    await model_server.stop()
     await cache_manager.disconnect()
     await fpl_client.close()
     await supabase_service.disconnect()
+    if settings.ocr_enabled:
+        await ocr_jobs.stop()
+        ocr_service.shutdown()
     logger.info("FPL AI Model API shut down successfully")
 
 
@@ -84,6 +110,11 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+if settings.ocr_enabled:
+    # Reject oversized screenshots before their bodies are read. Added before
+    # CORS so it runs inside it and the 413 carries CORS headers.
+    app.add_middleware(UploadLimitMiddleware, limits=ocr.upload_limits("/api/ocr"))
+
 # Add middleware - with support for wildcard domains
 cors_origins = settings.cors_origins_list
 
@@ -134,6 +165,8 @@ async def health_check():
         "status": "healthy",
         "services": {
             "api": "up",
+            "ocr": ocr_service.state if settings.ocr_enabled else "disabled",
+            "model": model_server.version or "heuristic",
             # "database": "up" if await check_database() else "down",
             # "redis": "up" if await cache_manager.ping() else "down",
             # "fpl_api": "up" if await fpl_client.check_health() else "down",
@@ -141,14 +174,22 @@ async def health_check():
     }
 
 
+@app.get("/metrics", tags=["Health"])
+async def get_metrics():
+    """Latency metrics for database and other instrumented operations."""
+    return metrics_snapshot()
+
+
 # Include routers
 from api.routes import fpl
 
 app.include_router(predictions.router, prefix="/api/predictions", tags=["Predictions"])
 app.include_router(transfers.router, prefix="/api/transfers", tags=["Transfers"])
 app.include_router(teams.router, prefix="/api/teams", tags=["Teams"])
-app.include_router(ocr.router, prefix="/api/ocr", tags=["OCR"])
+if settings.ocr_enabled:
+    app.include_router(ocr.router, prefix="/api/ocr", tags=["OCR"])
 app.include_router(fpl.router, prefix="/api/fpl", tags=["FPL Data"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 
 if __name__ == "__main__":
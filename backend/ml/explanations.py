@@ -0,0 +1,224 @@
+"""
+Prediction explanations - compact top-k factor arrays
+
+After a model prediction run the points ensemble is explained for the whole
+player set at once: one shap.TreeExplainer call per tree member over the
+gameweek's feature matrix, exact linear attributions for ridge members,
+combined with the ensemble weights (SHAP values are additive, so the weighted
+sum explains the weighted mean). Only each player's EXPLANATION_TOP_K largest
+contributions are kept, as three (players, k) arrays cached per (model
+version, season, gameweek), so building a response's key_factors is an array
+lookup rather than an explainer call.
+
+Heuristic predictions are explained the same way from their own terms.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+from utils.metrics import get_recorder
+
+logger = logging.getLogger(__name__)
+
+explanation_metrics = get_recorder("explanations")
+
+# Shown in key_factors; names missing here are shown as-is
+FEATURE_LABELS = {
+    "form_3": "Avg points, last 3 GWs",
+    "form_5": "Avg points, last 5 GWs",
+    "form_10": "Avg points, last 10 GWs",
+    "points_per_game": "Points per game",
+    "points_ewm": "Recent points trend",
+    "minutes_3": "Avg minutes, last 3 GWs",
+    "minutes_ewm": "Recent minutes trend",
+    "minutes_trend": "Minutes trend",
+    "start_rate_5": "Starts, last 5 GWs",
+    "goals_5": "Goals per GW, last 5",
+    "assists_5": "Assists per GW, last 5",
+    "clean_sheets_5": "Clean sheets per GW, last 5",
+    "bonus_5": "Bonus per GW, last 5",
+    "ict_5": "ICT index, last 5 GWs",
+    "xgi_5": "xGI per GW, last 5",
+    "fixture_count": "Fixtures this GW",
+    "fixture_difficulty": "Fixture difficulty",
+    "home_share": "Home fixtures",
+    "opponent_attack": "Opponent attack",
+    "opponent_defence": "Opponent defence",
+    "team_attack": "Team attack",
+    "team_defence": "Team defence",
+    "team_goals_for_5": "Team goals per GW, last 5",
+    "team_goals_against_5": "Team conceded per GW, last 5",
+    "team_clean_sheet_rate_5": "Team clean sheet rate",
+    "element_type": "Position",
+    "price": "Price (£m)",
+    "points_per_million": "Points per £m",
+    "ownership": "Ownership %",
+    # Heuristic terms
+    "form": "Form",
+    "fixture_weight": "Fixture weight",
+    "model_adjustment": "Model prediction",
+    "availability": "Chance of playing",
+}
+
+MIN_CONTRIBUTION = 0.05  # Points; smaller contributions aren't worth listing
+
+
+@dataclass
+class Explanations:
+    """Each row's largest contributions, largest first."""
+    names: List[str]
+    features: np.ndarray  # (rows, k) int16 index into names, -1 for an empty slot
+    values: np.ndarray  # (rows, k) float32 feature value
+    contributions: np.ndarray  # (rows, k) float32 expected points contributed
+
+    @classmethod
+    def top(cls, contributions: np.ndarray, values: np.ndarray, names: Sequence[str], k: int) -> "Explanations":
+        """
+        Keep the k largest absolute contributions per row.
+
+        Args:
+            contributions: (rows, features) points contributed by each feature
+            values: (rows, features) feature values
+            names: Feature names
+            k: Factors to keep per row
+        """
+        k = min(k, contributions.shape[1])
+        order = np.argsort(-np.abs(contributions), axis=1, kind="stable")[:, :k]
+        return cls(
+            names=list(names),
+            features=order.astype(np.int16),
+            values=np.take_along_axis(values, order, axis=1).astype(np.float32),
+            contributions=np.take_along_axis(contributions, order, axis=1).astype(np.float32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def take(self, rows: np.ndarray) -> "Explanations":
+        """Rows in a new order; -1 gives an empty row."""
+        found = rows >= 0
+        safe = np.where(found, rows, 0)
+        return Explanations(
+            names=self.names,
+            features=np.where(found[:, None], self.features[safe], -1).astype(np.int16),
+            values=self.values[safe],
+            contributions=np.where(found[:, None], self.contributions[safe], 0).astype(np.float32),
+        )
+
+    def fill(self, fallback: "Explanations") -> "Explanations":
+        """Use fallback's factors for rows that have none here."""
+        empty = (self.features < 0).all(axis=1)
+        k = max(self.features.shape[1], fallback.features.shape[1])
+
+        def widen(array: np.ndarray, value) -> np.ndarray:
+            return np.pad(array, ((0, 0), (0, k - array.shape[1])), constant_values=value)
+
+        offset_features = np.where(fallback.features >= 0, fallback.features + len(self.names), -1)
+        return Explanations(
+            names=self.names + fallback.names,
+            features=np.where(empty[:, None], widen(offset_features, -1), widen(self.features, -1)).astype(np.int16),
+            values=np.where(empty[:, None], widen(fallback.values, 0), widen(self.values, 0)),
+            contributions=np.where(empty[:, None], widen(fallback.contributions, 0), widen(self.contributions, 0)),
+        )
+
+    def factors(self, row: int) -> List[str]:
+        """Readable key factors for one row, e.g. "Avg points, last 3 GWs: 6.3 (+1.2 pts)"."""
+        factors = []
+        for feature, value, contribution in zip(
+            self.features[row].tolist(), self.values[row].tolist(), self.contributions[row].tolist()
+        ):
+            if feature < 0 or abs(contribution) < MIN_CONTRIBUTION:
+                continue
+            name = self.names[feature]
+            factors.append(f"{FEATURE_LABELS.get(name, name)}: {value:.3g} ({contribution:+.1f} pts)")
+        return factors
+
+
+def member_contributions(member, features: np.ndarray) -> np.ndarray:
+    """
+    Per-feature contributions of one ensemble member, (rows, features).
+
+    Ridge members are linear, so their attributions are exact against the
+    batch mean; tree members go through one batched shap.TreeExplainer call.
+
+    Raises:
+        ImportError: If a tree member needs shap and it isn't installed
+    """
+    if member.family == "ridge":
+        return (features - features.mean(axis=0)) * member.model["coef"]
+
+    import shap
+    explainer = shap.TreeExplainer(member.model)
+    return np.asarray(explainer.shap_values(features), dtype=np.float64)
+
+
+def explain_ensemble(ensemble, features: np.ndarray, feature_names: Sequence[str], target: str = "points") -> Explanations:
+    """
+    Explain an ensemble's predictions for a whole feature matrix.
+
+    Args:
+        ensemble: ml.model_server.Ensemble
+        features: (rows, features) matrix
+        feature_names: Column names of features
+        target: Which target's members to explain
+
+    Returns:
+        Top EXPLANATION_TOP_K factors per row
+    """
+    matrix = ensemble.align(features, feature_names)
+    members = ensemble.members[target]
+    total_weight = sum(member.weight for member in members)
+    contributions = np.zeros(matrix.shape)
+    for member in members:
+        contributions += member.weight / total_weight * member_contributions(member, matrix)
+    return Explanations.top(contributions, matrix, ensemble.feature_names, settings.explanation_top_k)
+
+
+class ExplanationService:
+    """Explains model runs once and keeps the compact results."""
+
+    def __init__(self):
+        self._explanations: "OrderedDict[Tuple[str, str, int], Explanations]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._warned_missing = False
+
+    def explain(self, ensemble, features: np.ndarray, feature_names: Sequence[str], season: str, gameweek: int) -> Optional[Explanations]:
+        """
+        Explanations for one gameweek's feature matrix, rows in its order.
+
+        Returns:
+            Explanations, or None if they can't be computed (e.g. shap missing)
+        """
+        key = (ensemble.version, season, gameweek)
+        with self._lock:
+            cached = self._explanations.get(key)
+            if cached is not None:
+                self._explanations.move_to_end(key)
+                return cached
+
+            try:
+                with explanation_metrics.time(f"explain.{ensemble.version}"):
+                    explanations = explain_ensemble(ensemble, features, feature_names)
+            except ImportError as e:
+                if not self._warned_missing:
+                    logger.warning(f"Can't explain model predictions ({e}); key factors use the heuristic terms")
+                    self._warned_missing = True
+                return None
+            except Exception as e:
+                logger.error(f"Failed to explain {ensemble.version} for GW{gameweek}: {e}", exc_info=True)
+                return None
+
+            self._explanations[key] = explanations
+            while len(self._explanations) > settings.model_batch_cache_size:
+                self._explanations.popitem(last=False)
+        logger.info(f"Explained {len(explanations)} predictions for GW{gameweek} ({ensemble.version})")
+        return explanations
+
+
+# Global explanation service instance
+explanation_service = ExplanationService()
@@ -0,0 +1,626 @@
+"""
+Feature engineering - player form, fixture and team-context features
+
+Turns element-summary histories, fixtures and team strengths into one dense
+(gameweek, player, feature) tensor. Every rolling window is a cumulative-sum
+difference over a (player, gameweek) matrix, so a whole season is computed in
+a handful of array operations rather than a loop per player.
+
+Features for gameweek t only use results up to gameweek t - 1 (plus the
+fixtures scheduled for t), so the same row serves as a training example for
+t's points and as the inference input before t's deadline.
+"""
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Tuple
+
+import numpy as np
+
+FEATURE_VERSION = 2
+
+# Per-fixture history stats summed into each (player, gameweek) cell
+HISTORY_STATS = (
+    "total_points", "minutes", "goals_scored", "assists", "clean_sheets",
+    "bonus", "ict_index", "expected_goals", "expected_assists",
+)
+
+FEATURE_NAMES = (
+    # Player form
+    "form_3", "form_5", "form_10", "points_per_game", "points_ewm",
+    "minutes_3", "minutes_ewm", "minutes_trend", "start_rate_5",
+    "goals_5", "assists_5", "clean_sheets_5", "bonus_5", "ict_5", "xgi_5",
+    # Fixture
+    "fixture_count", "fixture_difficulty", "home_share", "opponent_attack", "opponent_defence",
+    # Team context
+    "team_attack", "team_defence", "team_goals_for_5", "team_goals_against_5", "team_clean_sheet_rate_5",
+    # Player-specific
+    "element_type", "price", "points_per_million", "ownership",
+)
+
+# Stored per player and gameweek for training: what actually happened
+TARGETS = ("points", "minutes")
+
+EWM_ALPHA = 0.3  # Weight of the latest gameweek in exponentially weighted form
+WINDOW = 10  # Longest rolling window; incremental state keeps this many gameweeks
+TEAM_WINDOW = 5
+TEAM_STATS = ("goals_for", "goals_against", "matches", "clean_sheets")
+STRENGTHS = ("strength_attack_home", "strength_attack_away", "strength_defence_home", "strength_defence_away")
+
+
+def _window_bounds(window: int, played: int, gameweeks: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end columns of the window before each gameweek."""
+    end = np.minimum(np.arange(gameweeks), played)
+    return np.maximum(end - window, 0), end
+
+
+def rolling_sum(values: np.ndarray, window: int, gameweeks: int) -> np.ndarray:
+    """
+    Sum of the last `window` gameweeks before each gameweek.
+
+    Args:
+        values: (players, played gameweeks) matrix, column g is gameweek g + 1
+        window: Gameweeks per window
+        gameweeks: Number of gameweeks to produce features for (1..gameweeks)
+
+    Returns:
+        (players, gameweeks) matrix; column t - 1 sums gameweeks
+        max(1, t - window)..t - 1, and is 0 for gameweek 1
+    """
+    totals = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=totals[:, 1:])
+    start, end = _window_bounds(window, values.shape[1], gameweeks)
+    return totals[:, end] - totals[:, start]
+
+
+def rolling_mean(values: np.ndarray, window: int, gameweeks: int) -> np.ndarray:
+    """Mean of the last `window` gameweeks before each gameweek (0 before gameweek 2)."""
+    start, end = _window_bounds(window, values.shape[1], gameweeks)
+    return rolling_sum(values, window, gameweeks) / np.maximum(end - start, 1)
+
+
+def rolling_ratio(numerator: np.ndarray, denominator: np.ndarray, window: int, gameweeks: int) -> np.ndarray:
+    """Rolling sum of numerator over rolling sum of denominator (0 where the denominator is 0)."""
+    top = rolling_sum(numerator, window, gameweeks)
+    bottom = rolling_sum(denominator, window, gameweeks)
+    return np.divide(top, bottom, out=np.zeros_like(top), where=bottom > 0)
+
+
+def ewm(values: np.ndarray, gameweeks: int, alpha: float = EWM_ALPHA) -> np.ndarray:
+    """
+    Exponentially weighted mean decayed from zero, as of before each gameweek.
+
+    Returns:
+        (players, gameweeks) matrix; column t - 1 covers gameweeks 1..t - 1
+    """
+    out = np.zeros((values.shape[0], gameweeks))
+    state = np.zeros(values.shape[0])
+    for g in range(1, gameweeks):
+        if g - 1 < values.shape[1]:
+            state = alpha * values[:, g - 1] + (1 - alpha) * state
+        out[:, g] = state
+    return out
+
+
+def last_known(values: np.ndarray, known: np.ndarray, fallback: np.ndarray, gameweeks: int) -> np.ndarray:
+    """
+    Most recent known value before each gameweek, else the fallback.
+
+    Args:
+        values: (players, played gameweeks) matrix
+        known: Mask of cells that hold a real value
+        fallback: (players,) value used before the first known cell
+        gameweeks: Number of gameweeks to produce features for
+    """
+    out = np.repeat(fallback[:, None].astype(np.float64), gameweeks, axis=1)
+    if not values.shape[1]:
+        return out
+
+    # Column of the latest known cell up to each gameweek, -1 before the first
+    positions = np.where(known, np.arange(values.shape[1]), -1)
+    latest = np.maximum.accumulate(positions, axis=1)
+
+    before = np.clip(np.arange(gameweeks) - 1, 0, values.shape[1] - 1)
+    source = latest[:, before]
+    source[:, 0] = -1
+    found = source >= 0
+    picked = np.take_along_axis(values, np.maximum(source, 0), axis=1)
+    out[found] = picked[found]
+    return out
+
+
+def history_tensor(
+    histories: Dict[int, List[Dict[str, Any]]],
+    player_index: Dict[int, int],
+    played: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Dense per-gameweek stats from element-summary histories.
+
+    Double gameweeks are summed into one cell; blank gameweeks stay zero.
+
+    Args:
+        histories: History rows by player ID
+        player_index: Row of each player ID
+        played: Finished gameweeks to include
+
+    Returns:
+        Tuple of (stats (players, played, len(HISTORY_STATS)), fixtures played
+        (players, played), value and selected by count (players, played) from
+        each gameweek's last fixture, mask of cells with any fixture)
+    """
+    players = len(player_index)
+    stats = np.zeros((players, played, len(HISTORY_STATS)))
+    fixtures = np.zeros((players, played))
+    value = np.zeros((players, played))
+    selected = np.zeros((players, played))
+
+    rows, columns, records = [], [], []
+    for player_id, history in histories.items():
+        row = player_index.get(player_id)
+        if row is None:
+            continue
+        for record in history:
+            gameweek = record.get("round") or 0
+            if 1 <= gameweek <= played:
+                rows.append(row)
+                columns.append(gameweek - 1)
+                records.append(record)
+
+    if records:
+        rows = np.array(rows)
+        columns = np.array(columns)
+        cells = np.array(
+            [[float(record.get(stat) or 0) for stat in HISTORY_STATS] for record in records]
+        )
+        np.add.at(stats, (rows, columns), cells)
+        np.add.at(fixtures, (rows, columns), 1)
+        # Later fixtures in a double gameweek overwrite earlier ones
+        order = np.argsort([record.get("fixture") or 0 for record in records], kind="stable")
+        value[rows[order], columns[order]] = [float(records[i].get("value") or 0) for i in order]
+        selected[rows[order], columns[order]] = [float(records[i].get("selected") or 0) for i in order]
+
+    return stats, fixtures, value, selected, fixtures > 0
+
+
+def team_results(
+    fixtures: List[Dict[str, Any]],
+    teams: int,
+    played: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Goals for, goals against, matches and clean sheets per (team, gameweek) from finished fixtures.
+
+    Returns:
+        Four (teams + 1, played) matrices indexed by team ID
+    """
+    goals_for = np.zeros((teams + 1, played))
+    goals_against = np.zeros((teams + 1, played))
+    matches = np.zeros((teams + 1, played))
+    clean_sheets = np.zeros((teams + 1, played))
+
+    for fixture in fixtures:
+        gameweek = fixture.get("event") or 0
+        if not fixture.get("finished") or not 1 <= gameweek <= played:
+            continue
+        g = gameweek - 1
+        home, away = fixture["team_h"], fixture["team_a"]
+        home_goals, away_goals = fixture.get("team_h_score") or 0, fixture.get("team_a_score") or 0
+        goals_for[home, g] += home_goals
+        goals_against[home, g] += away_goals
+        goals_for[away, g] += away_goals
+        goals_against[away, g] += home_goals
+        matches[home, g] += 1
+        matches[away, g] += 1
+        clean_sheets[home, g] += away_goals == 0
+        clean_sheets[away, g] += home_goals == 0
+
+    return goals_for, goals_against, matches, clean_sheets
+
+
+def fixture_context(
+    fixtures: List[Dict[str, Any]],
+    strengths: Dict[str, np.ndarray],
+    teams: int,
+    gameweeks: int
+) -> Dict[str, np.ndarray]:
+    """
+    Scheduled fixture features per (team, gameweek).
+
+    Args:
+        fixtures: All fixtures, finished or not
+        strengths: Team strength columns indexed by team ID
+            (strength_attack_home, strength_attack_away, strength_defence_home, strength_defence_away)
+        teams: Highest team ID
+        gameweeks: Number of gameweeks to produce features for
+
+    Returns:
+        (teams + 1, gameweeks) matrices keyed by feature name
+    """
+    count = np.zeros((teams + 1, gameweeks))
+    difficulty = np.zeros((teams + 1, gameweeks))
+    home = np.zeros((teams + 1, gameweeks))
+    opponent_attack = np.zeros((teams + 1, gameweeks))
+    opponent_defence = np.zeros((teams + 1, gameweeks))
+
+    for fixture in fixtures:
+        gameweek = fixture.get("event") or 0
+        if not 1 <= gameweek <= gameweeks:
+            continue
+        g = gameweek - 1
+        team_h, team_a = fixture["team_h"], fixture["team_a"]
+
+        count[team_h, g] += 1
+        difficulty[team_h, g] += fixture.get("team_h_difficulty") or 0
+        home[team_h, g] += 1
+        opponent_attack[team_h, g] += strengths["strength_attack_away"][team_a]
+        opponent_defence[team_h, g] += strengths["strength_defence_away"][team_a]
+
+        count[team_a, g] += 1
+        difficulty[team_a, g] += fixture.get("team_a_difficulty") or 0
+        opponent_attack[team_a, g] += strengths["strength_attack_home"][team_h]
+        opponent_defence[team_a, g] += strengths["strength_defence_home"][team_h]
+
+    matches = np.maximum(count, 1)
+    return {
+        "fixture_count": count,
+        "fixture_difficulty": difficulty / matches,
+        "home_share": home / matches,
+        "opponent_attack": opponent_attack / matches,
+        "opponent_defence": opponent_defence / matches,
+    }
+
+
+def _team_index(players: List[Dict[str, Any]], teams: List[Dict[str, Any]]) -> Tuple[int, np.ndarray]:
+    """Highest team ID, and each player's current club as an index into team tables."""
+    max_team = max([team["id"] for team in teams] + [player.get("team", 0) for player in players] + [0])
+    return max_team, np.array([player.get("team", 0) for player in players], dtype=np.int64)
+
+
+def context_features(
+    players: List[Dict[str, Any]],
+    fixtures: List[Dict[str, Any]],
+    teams: List[Dict[str, Any]],
+    gameweeks: int
+) -> Dict[str, np.ndarray]:
+    """
+    Features that don't depend on results: fixtures, team strength and position.
+
+    Returns:
+        (players, gameweeks) matrices keyed by feature name
+    """
+    max_team, player_team = _team_index(players, teams)
+    strengths = {}
+    for key in STRENGTHS:
+        strengths[key] = np.zeros(max_team + 1)
+        for team in teams:
+            strengths[key][team["id"]] = team.get(key) or 0
+
+    features = {name: matrix[player_team] for name, matrix in fixture_context(fixtures, strengths, max_team, gameweeks).items()}
+
+    team_attack = (strengths["strength_attack_home"] + strengths["strength_attack_away"]) / 2
+    team_defence = (strengths["strength_defence_home"] + strengths["strength_defence_away"]) / 2
+    element_type = np.array([player.get("element_type", 0) for player in players], dtype=np.float64)
+    features["team_attack"] = np.repeat(team_attack[player_team][:, None], gameweeks, axis=1)
+    features["team_defence"] = np.repeat(team_defence[player_team][:, None], gameweeks, axis=1)
+    features["element_type"] = np.repeat(element_type[:, None], gameweeks, axis=1)
+    return features
+
+
+def build_features(
+    players: List[Dict[str, Any]],
+    histories: Dict[int, List[Dict[str, Any]]],
+    fixtures: List[Dict[str, Any]],
+    teams: List[Dict[str, Any]],
+    played: int,
+    gameweeks: int,
+    total_players: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the season's feature tensor.
+
+    Args:
+        players: Bootstrap elements; row order of the output
+        histories: element-summary history rows by player ID
+        fixtures: All fixtures for the season
+        teams: Bootstrap teams
+        played: Finished gameweeks whose results are used
+        gameweeks: Gameweeks to produce features for (usually played + 1)
+        total_players: FPL managers, to turn selected counts into ownership %
+
+    Returns:
+        Tuple of (features (gameweeks, players, len(FEATURE_NAMES)) float32,
+        targets (gameweeks, players, len(TARGETS)) float32 points and minutes,
+        NaN where not played yet)
+    """
+    player_index = {player["id"]: row for row, player in enumerate(players)}
+    stats, _, value, selected, known = history_tensor(histories, player_index, played)
+    column = {stat: stats[:, :, i] for i, stat in enumerate(HISTORY_STATS)}
+    points, minutes = column["total_points"], column["minutes"]
+
+    features: Dict[str, np.ndarray] = {}
+    features["form_3"] = rolling_mean(points, 3, gameweeks)
+    features["form_5"] = rolling_mean(points, 5, gameweeks)
+    features["form_10"] = rolling_mean(points, 10, gameweeks)
+    features["points_per_game"] = rolling_ratio(points, (minutes > 0).astype(np.float64), played, gameweeks)
+    features["points_ewm"] = ewm(points, gameweeks)
+    features["minutes_3"] = rolling_mean(minutes, 3, gameweeks)
+    features["minutes_ewm"] = ewm(minutes, gameweeks)
+    features["minutes_trend"] = features["minutes_3"] - rolling_mean(minutes, 10, gameweeks)
+    features["start_rate_5"] = rolling_mean((minutes >= 60).astype(np.float64), 5, gameweeks)
+    features["goals_5"] = rolling_mean(column["goals_scored"], 5, gameweeks)
+    features["assists_5"] = rolling_mean(column["assists"], 5, gameweeks)
+    features["clean_sheets_5"] = rolling_mean(column["clean_sheets"], 5, gameweeks)
+    features["bonus_5"] = rolling_mean(column["bonus"], 5, gameweeks)
+    features["ict_5"] = rolling_mean(column["ict_index"], 5, gameweeks)
+    features["xgi_5"] = rolling_mean(column["expected_goals"] + column["expected_assists"], 5, gameweeks)
+
+    features.update(context_features(players, fixtures, teams, gameweeks))
+
+    max_team, player_team = _team_index(players, teams)
+    goals_for, goals_against, matches, clean_sheets = team_results(fixtures, max_team, played)
+    features["team_goals_for_5"] = rolling_ratio(goals_for, matches, TEAM_WINDOW, gameweeks)[player_team]
+    features["team_goals_against_5"] = rolling_ratio(goals_against, matches, TEAM_WINDOW, gameweeks)[player_team]
+    features["team_clean_sheet_rate_5"] = rolling_ratio(clean_sheets, matches, TEAM_WINDOW, gameweeks)[player_team]
+
+    now_cost = np.array([player.get("now_cost", 0) for player in players], dtype=np.float64)
+    ownership_now = np.array([float(player.get("selected_by_percent") or 0) for player in players])
+
+    features["price"] = last_known(value, known, now_cost, gameweeks) / 10.0
+    season_points = rolling_sum(points, played, gameweeks)
+    features["points_per_million"] = np.divide(
+        season_points, features["price"], out=np.zeros_like(season_points), where=features["price"] > 0
+    )
+    if total_players:
+        features["ownership"] = last_known(selected / total_players * 100, known, ownership_now, gameweeks)
+    else:
+        features["ownership"] = np.repeat(ownership_now[:, None], gameweeks, axis=1)
+
+    tensor = np.stack([features[name] for name in FEATURE_NAMES], axis=-1)  # (players, gameweeks, features)
+    targets = np.full((len(players), gameweeks, len(TARGETS)), np.nan)
+    targets[:, :min(played, gameweeks)] = np.stack([points, minutes], axis=-1)[:, :gameweeks]
+
+    return tensor.transpose(1, 0, 2).astype(np.float32), targets.transpose(1, 0, 2).astype(np.float32)
+
+
+@dataclass
+class FeatureState:
+    """
+    Rolling aggregates carried between gameweeks.
+
+    Holds just enough to produce the next gameweek's features and to absorb
+    one more finished gameweek: the last WINDOW gameweeks of stats per player,
+    season totals, exponentially weighted means, last known price and
+    ownership, and the last TEAM_WINDOW gameweeks of team results. Advancing
+    costs one gameweek of data regardless of how far into the season it is.
+    """
+    ids: np.ndarray  # (players,) player IDs, one row each
+    played: int  # Finished gameweeks absorbed
+    recent: np.ndarray  # (players, WINDOW, len(HISTORY_STATS)), oldest first
+    season_points: np.ndarray
+    appearances: np.ndarray
+    points_ewm: np.ndarray
+    minutes_ewm: np.ndarray
+    price: np.ndarray  # £m, NaN until known
+    ownership: np.ndarray  # %, NaN until known
+    team_recent: np.ndarray  # (teams + 1, TEAM_WINDOW, len(TEAM_STATS)), oldest first
+
+    @classmethod
+    def from_history(
+        cls,
+        players: List[Dict[str, Any]],
+        histories: Dict[int, List[Dict[str, Any]]],
+        fixtures: List[Dict[str, Any]],
+        teams: List[Dict[str, Any]],
+        played: int,
+        total_players: int = 0
+    ) -> "FeatureState":
+        """State after `played` gameweeks, from the same inputs as build_features."""
+        player_index = {player["id"]: row for row, player in enumerate(players)}
+        stats, _, value, selected, known = history_tensor(histories, player_index, played)
+        points = stats[:, :, HISTORY_STATS.index("total_points")]
+        minutes = stats[:, :, HISTORY_STATS.index("minutes")]
+        nothing = np.full(len(players), np.nan)
+
+        recent = np.zeros((len(players), WINDOW, len(HISTORY_STATS)))
+        tail = stats[:, -WINDOW:] if played else stats
+        recent[:, WINDOW - tail.shape[1]:] = tail
+
+        max_team, _ = _team_index(players, teams)
+        results = np.stack(team_results(fixtures, max_team, played), axis=-1)
+        team_recent = np.zeros((max_team + 1, TEAM_WINDOW, len(TEAM_STATS)))
+        team_tail = results[:, -TEAM_WINDOW:] if played else results
+        team_recent[:, TEAM_WINDOW - team_tail.shape[1]:] = team_tail
+
+        ownership = nothing
+        if total_players:
+            ownership = last_known(selected / total_players * 100, known, nothing, played + 1)[:, played]
+
+        return cls(
+            ids=np.array([player["id"] for player in players], dtype=np.int64),
+            played=played,
+            recent=recent,
+            season_points=points.sum(axis=1),
+            appearances=(minutes > 0).sum(axis=1).astype(np.float64),
+            points_ewm=ewm(points, played + 1)[:, played],
+            minutes_ewm=ewm(minutes, played + 1)[:, played],
+            price=last_known(value, known, nothing, played + 1)[:, played] / 10.0,
+            ownership=ownership,
+            team_recent=team_recent,
+        )
+
+    def extend(self, player_ids: Iterable[int]) -> np.ndarray:
+        """
+        Add rows for players not tracked yet (e.g. mid-season signings).
+
+        Returns:
+            Row of each given player
+        """
+        player_ids = np.fromiter(player_ids, dtype=np.int64)
+        new = np.setdiff1d(player_ids, self.ids)
+        if len(new):
+            count = len(new)
+            self.ids = np.concatenate([self.ids, new])
+            self.recent = np.concatenate([self.recent, np.zeros((count,) + self.recent.shape[1:])])
+            for name in ("season_points", "appearances", "points_ewm", "minutes_ewm"):
+                setattr(self, name, np.concatenate([getattr(self, name), np.zeros(count)]))
+            for name in ("price", "ownership"):
+                setattr(self, name, np.concatenate([getattr(self, name), np.full(count, np.nan)]))
+        return self.rows(player_ids)
+
+    def rows(self, player_ids: np.ndarray) -> np.ndarray:
+        """Row of each tracked player ID."""
+        index = {int(player_id): row for row, player_id in enumerate(self.ids)}
+        return np.array([index[int(player_id)] for player_id in player_ids], dtype=np.int64)
+
+    def advance(
+        self,
+        stats: np.ndarray,
+        played_mask: np.ndarray,
+        price: np.ndarray,
+        ownership: np.ndarray,
+        results: np.ndarray
+    ) -> np.ndarray:
+        """
+        Absorb one finished gameweek.
+
+        Args:
+            stats: (players, len(HISTORY_STATS)) gameweek totals per state row
+            played_mask: Rows whose club had a fixture in the gameweek
+            price: £m per row after the gameweek (read where played_mask)
+            ownership: Ownership % per row (read where played_mask; NaN to skip)
+            results: (teams + 1, len(TEAM_STATS)) team results for the gameweek
+
+        Returns:
+            Rows whose stats, price or ownership changed
+        """
+        points = stats[:, HISTORY_STATS.index("total_points")]
+        minutes = stats[:, HISTORY_STATS.index("minutes")]
+
+        self.recent = np.concatenate([self.recent[:, 1:], stats[:, None]], axis=1)
+        self.season_points = self.season_points + points
+        self.appearances = self.appearances + (minutes > 0)
+        self.points_ewm = EWM_ALPHA * points + (1 - EWM_ALPHA) * self.points_ewm
+        self.minutes_ewm = EWM_ALPHA * minutes + (1 - EWM_ALPHA) * self.minutes_ewm
+
+        repriced = played_mask & (price != self.price)
+        self.price = np.where(played_mask, price, self.price)
+        owned = played_mask & ~np.isnan(ownership)
+        self.ownership = np.where(owned, ownership, self.ownership)
+
+        self.team_recent = np.concatenate([self.team_recent[:, 1:], results[:, None]], axis=1)
+        self.played += 1
+
+        return np.flatnonzero(played_mask | (stats != 0).any(axis=1) | repriced)
+
+    def features(
+        self,
+        players: List[Dict[str, Any]],
+        fixtures: List[Dict[str, Any]],
+        teams: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """
+        Features for the next gameweek (played + 1), matching build_features.
+
+        Args:
+            players: Bootstrap elements; row order of the output (added to the state if new)
+
+        Returns:
+            (players, len(FEATURE_NAMES)) float32
+        """
+        rows = self.extend(player["id"] for player in players)
+        gameweek = self.played + 1
+        recent = self.recent[rows]
+        column = {stat: recent[:, :, i] for i, stat in enumerate(HISTORY_STATS)}
+        points, minutes = column["total_points"], column["minutes"]
+
+        def window_mean(values: np.ndarray, window: int) -> np.ndarray:
+            return values[:, WINDOW - window:].sum(axis=1) / max(min(window, self.played), 1)
+
+        features: Dict[str, np.ndarray] = {}
+        features["form_3"] = window_mean(points, 3)
+        features["form_5"] = window_mean(points, 5)
+        features["form_10"] = window_mean(points, 10)
+        appearances = self.appearances[rows]
+        season_points = self.season_points[rows]
+        features["points_per_game"] = np.divide(
+            season_points, appearances, out=np.zeros(len(rows)), where=appearances > 0
+        )
+        features["points_ewm"] = self.points_ewm[rows]
+        features["minutes_3"] = window_mean(minutes, 3)
+        features["minutes_ewm"] = self.minutes_ewm[rows]
+        features["minutes_trend"] = features["minutes_3"] - window_mean(minutes, 10)
+        features["start_rate_5"] = window_mean((minutes >= 60).astype(np.float64), 5)
+        features["goals_5"] = window_mean(column["goals_scored"], 5)
+        features["assists_5"] = window_mean(column["assists"], 5)
+        features["clean_sheets_5"] = window_mean(column["clean_sheets"], 5)
+        features["bonus_5"] = window_mean(column["bonus"], 5)
+        features["ict_5"] = window_mean(column["ict_index"], 5)
+        features["xgi_5"] = window_mean(column["expected_goals"] + column["expected_assists"], 5)
+
+        features.update({name: matrix[:, -1] for name, matrix in context_features(players, fixtures, teams, gameweek).items()})
+
+        _, player_team = _team_index(players, teams)
+        team_totals = self.team_recent.sum(axis=1)[player_team]
+        matches = team_totals[:, TEAM_STATS.index("matches")]
+        for name, stat in (
+            ("team_goals_for_5", "goals_for"),
+            ("team_goals_against_5", "goals_against"),
+            ("team_clean_sheet_rate_5", "clean_sheets"),
+        ):
+            features[name] = np.divide(
+                team_totals[:, TEAM_STATS.index(stat)], matches, out=np.zeros(len(rows)), where=matches > 0
+            )
+
+        now_cost = np.array([player.get("now_cost", 0) for player in players], dtype=np.float64)
+        ownership_now = np.array([float(player.get("selected_by_percent") or 0) for player in players])
+        price = self.price[rows]
+        ownership = self.ownership[rows]
+        features["price"] = np.where(np.isnan(price), now_cost / 10.0, price)
+        features["points_per_million"] = np.divide(
+            season_points, features["price"], out=np.zeros(len(rows)), where=features["price"] > 0
+        )
+        features["ownership"] = np.where(np.isnan(ownership), ownership_now, ownership)
+
+        return np.stack([features[name] for name in FEATURE_NAMES], axis=-1).astype(np.float32)
+
+    def save(self, path) -> None:
+        """Write the state as an .npz archive (path or binary file)."""
+        np.savez(
+            path,
+            played=np.array(self.played),
+            **{name: getattr(self, name) for name in (
+                "ids", "recent", "season_points", "appearances", "points_ewm",
+                "minutes_ewm", "price", "ownership", "team_recent",
+            )}
+        )
+
+    @classmethod
+    def load(cls, path) -> "FeatureState":
+        """Read a state written by save()."""
+        with np.load(path) as data:
+            fields = {name: data[name] for name in data.files}
+        fields["played"] = int(fields["played"])
+        return cls(**fields)
+
+
+def live_stats(live: Dict[str, Any], player_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gameweek totals from an /event/{gw}/live/ response.
+
+    Args:
+        live: Live gameweek payload
+        player_ids: Player ID of each output row
+
+    Returns:
+        Tuple of (stats (players, len(HISTORY_STATS)), mask of players whose club had a fixture)
+    """
+    index = {int(player_id): row for row, player_id in enumerate(player_ids)}
+    stats = np.zeros((len(player_ids), len(HISTORY_STATS)))
+    played = np.zeros(len(player_ids), dtype=bool)
+    for element in live.get("elements", []):
+        row = index.get(element.get("id"))
+        if row is None:
+            continue
+        values = element.get("stats", {})
+        stats[row] = [float(values.get(stat) or 0) for stat in HISTORY_STATS]
+        played[row] = bool(element.get("explain"))
+    return stats, played
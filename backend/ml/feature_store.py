@@ -0,0 +1,379 @@
+"""
+Feature store - persisted per-gameweek feature matrices
+
+Feature matrices from ml.feature_engineering are written as plain .npy files,
+one per season and gameweek, so training and inference open them with
+np.load(mmap_mode="r") and read straight from the page cache instead of
+recomputing or copying:
+
+    {FEATURE_STORE_PATH}/{season}/meta.json          feature names and version, built gameweeks
+    {FEATURE_STORE_PATH}/{season}/gw07.npy           (players, features) float32
+    {FEATURE_STORE_PATH}/{season}/gw07_ids.npy       player ID of each row
+    {FEATURE_STORE_PATH}/{season}/gw07_target.npy    (players, targets) points and minutes in the gameweek (NaN until played)
+    {FEATURE_STORE_PATH}/{season}/state.npz          rolling aggregates for incremental updates
+
+Build the current season from the FPL API, or absorb newly finished
+gameweeks into an existing build (from the backend directory):
+
+    python -m ml.feature_store
+    python -m ml.feature_store --update
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from config import settings
+from ml.feature_engineering import (
+    FEATURE_NAMES, FEATURE_VERSION, HISTORY_STATS, TARGETS,
+    FeatureState, build_features, live_stats, team_results,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_GAMEWEEK = 38
+
+
+def season_name(events: List[Dict[str, Any]]) -> str:
+    """Season label such as "2024-25" from the first gameweek's deadline."""
+    deadlines = [event["deadline_time"] for event in events if event.get("deadline_time")]
+    if not deadlines:
+        raise ValueError("Gameweek deadlines are needed to name the season")
+    year = int(min(deadlines)[:4])
+    return f"{year}-{(year + 1) % 100:02d}"
+
+
+def finished_gameweeks(events: List[Dict[str, Any]]) -> int:
+    """Highest gameweek that is finished and has checked data."""
+    return max(
+        [event["id"] for event in events if event.get("finished") and event.get("data_checked")] + [0]
+    )
+
+
+@dataclass
+class FeatureFrame:
+    """One gameweek's features, memory-mapped from the store."""
+    season: str
+    gameweek: int
+    ids: np.ndarray
+    features: np.ndarray
+    targets: np.ndarray
+    names: List[str]
+
+    def column(self, name: str) -> np.ndarray:
+        """One feature for every player (a view, not a copy)."""
+        return self.features[:, self.names.index(name)]
+
+    def target(self, name: str) -> np.ndarray:
+        """One target (points or minutes) for every player, NaN until played."""
+        return self.targets[:, TARGETS.index(name)]
+
+    def rows(self, player_ids: np.ndarray) -> np.ndarray:
+        """
+        Rows of the given players, -1 for players not in this gameweek.
+        """
+        if not len(self.ids):
+            return np.full(len(player_ids), -1)
+        order = np.argsort(self.ids)
+        positions = np.searchsorted(self.ids, player_ids, sorter=order)
+        positions = np.minimum(positions, len(order) - 1)
+        rows = order[positions]
+        return np.where(self.ids[rows] == player_ids, rows, -1)
+
+
+class FeatureStore:
+    """Reads and writes feature matrices under FEATURE_STORE_PATH."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.feature_store_path)
+
+    def _season_dir(self, season: str) -> Path:
+        return self.root / season
+
+    def meta(self, season: str) -> Dict[str, Any]:
+        """Season metadata, or an empty dict if the season hasn't been built."""
+        path = self._season_dir(season) / "meta.json"
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
+
+    def gameweeks(self, season: str) -> List[int]:
+        """Gameweeks stored for a season."""
+        return sorted(self.meta(season).get("gameweeks", []))
+
+    def seasons(self) -> List[str]:
+        """Seasons with any stored gameweeks."""
+        if not self.root.exists():
+            return []
+        return sorted(path.name for path in self.root.iterdir() if (path / "meta.json").exists())
+
+    def current_season(self) -> Optional[str]:
+        """Most recent stored season."""
+        seasons = self.seasons()
+        return seasons[-1] if seasons else None
+
+    def save(
+        self,
+        season: str,
+        gameweek: int,
+        ids: np.ndarray,
+        features: np.ndarray,
+        targets: np.ndarray,
+        extra_meta: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Write one gameweek's matrices and record it in the season metadata.
+
+        Files are written beside their final name and renamed into place, so
+        readers with the previous version mapped keep a consistent view.
+        """
+        directory = self._season_dir(season)
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = f"gw{gameweek:02d}"
+
+        self._write_array(directory / f"{stem}.npy", np.ascontiguousarray(features, dtype=np.float32))
+        self._write_array(directory / f"{stem}_ids.npy", np.asarray(ids, dtype=np.int64))
+        self._write_array(directory / f"{stem}_target.npy", np.asarray(targets, dtype=np.float32))
+
+        meta = self.meta(season)
+        meta.update(extra_meta or {})
+        meta["feature_names"] = list(FEATURE_NAMES)
+        meta["feature_version"] = FEATURE_VERSION
+        meta["gameweeks"] = sorted(set(meta.get("gameweeks", [])) | {gameweek})
+        meta["updated_at"] = datetime.now().isoformat()
+        self._write_text(directory / "meta.json", json.dumps(meta, indent=2))
+
+    def load(self, season: str, gameweek: int) -> FeatureFrame:
+        """
+        Memory-map one gameweek.
+
+        Raises:
+            FileNotFoundError: If the gameweek hasn't been built
+            ValueError: If it was built with a different feature set
+        """
+        meta = self.meta(season)
+        if meta.get("feature_version") != FEATURE_VERSION:
+            raise ValueError(
+                f"Season {season} has feature version {meta.get('feature_version')}, expected {FEATURE_VERSION}; rebuild it"
+            )
+
+        directory = self._season_dir(season)
+        stem = f"gw{gameweek:02d}"
+        return FeatureFrame(
+            season=season,
+            gameweek=gameweek,
+            ids=np.load(directory / f"{stem}_ids.npy", mmap_mode="r"),
+            features=np.load(directory / f"{stem}.npy", mmap_mode="r"),
+            targets=np.load(directory / f"{stem}_target.npy", mmap_mode="r"),
+            names=meta["feature_names"],
+        )
+
+    def load_range(self, season: str, gameweeks: Optional[List[int]] = None) -> List[FeatureFrame]:
+        """Memory-map several gameweeks (all stored ones by default)."""
+        return [self.load(season, gameweek) for gameweek in (gameweeks or self.gameweeks(season))]
+
+    def save_targets(self, season: str, gameweek: int, player_ids: np.ndarray, values: np.ndarray):
+        """
+        Fill in a stored gameweek's targets once it has been played.
+
+        Args:
+            player_ids: Player ID for each row of values
+            values: (players, len(TARGETS)) points and minutes in the gameweek
+        """
+        path = self._season_dir(season) / f"gw{gameweek:02d}_ids.npy"
+        if not path.exists():
+            return
+        stored_ids = np.load(path)
+        order = np.argsort(player_ids)
+        positions = np.minimum(np.searchsorted(player_ids, stored_ids, sorter=order), len(order) - 1)
+        rows = order[positions]
+        found = player_ids[rows] == stored_ids
+        targets = np.full((len(stored_ids), len(TARGETS)), np.nan, dtype=np.float32)
+        targets[found] = values[rows[found]]
+        self._write_array(self._season_dir(season) / f"gw{gameweek:02d}_target.npy", targets)
+
+    def load_state(self, season: str) -> Optional[FeatureState]:
+        """Incremental state for a season, or None if it has never been built."""
+        path = self._season_dir(season) / "state.npz"
+        if not path.exists():
+            return None
+        return FeatureState.load(path)
+
+    def save_state(self, season: str, state: FeatureState):
+        path = self._season_dir(season) / "state.npz"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            state.save(f)
+        os.replace(tmp, path)
+
+    def _write_array(self, path: Path, array: np.ndarray):
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+
+    def _write_text(self, path: Path, text: str):
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(text)
+        os.replace(tmp, path)
+
+    async def build(self, season: Optional[str] = None) -> List[int]:
+        """
+        Rebuild every gameweek of the current season from the FPL API.
+
+        Writes features for each finished gameweek (with targets) and for the
+        next one (inference input).
+
+        Args:
+            season: Label to store under (derived from the gameweek deadlines by default)
+
+        Returns:
+            Gameweeks written
+        """
+        from services.fpl_api import fpl_client
+
+        bootstrap = await fpl_client.get_bootstrap_static()
+        events = bootstrap.get("events", [])
+        players = bootstrap.get("elements", [])
+        season = season or season_name(events)
+        played = finished_gameweeks(events)
+        gameweeks = min(played + 1, MAX_GAMEWEEK)
+
+        logger.info(f"Building features for {season}: {len(players)} players, {played} finished gameweeks")
+        histories = await fpl_client.get_player_histories([player["id"] for player in players])
+        fixtures = await fpl_client.get_fixtures(force_refresh=True)
+
+        features, targets = await asyncio.to_thread(
+            build_features,
+            players,
+            histories,
+            fixtures,
+            bootstrap.get("teams", []),
+            played,
+            gameweeks,
+            bootstrap.get("total_players", 0),
+        )
+
+        ids = np.array([player["id"] for player in players], dtype=np.int64)
+        for gameweek in range(1, gameweeks + 1):
+            self.save(season, gameweek, ids, features[gameweek - 1], targets[gameweek - 1], {"played": played})
+
+        state = FeatureState.from_history(
+            players, histories, fixtures, bootstrap.get("teams", []), played, bootstrap.get("total_players", 0)
+        )
+        self.save_state(season, state)
+
+        logger.info(f"Stored features for {season} GW1-{gameweeks} in {self._season_dir(season)}")
+        return list(range(1, gameweeks + 1))
+
+    async def update(self, season: Optional[str] = None) -> List[int]:
+        """
+        Absorb gameweeks finished since the last build or update.
+
+        Each newly finished (and data-checked) gameweek costs one
+        /event/{gw}/live/ request and one state step: its targets are filled
+        in, and the next gameweek's features are written from the carried
+        rolling aggregates. Falls back to a full build when there is no state.
+
+        Args:
+            season: Label the store was built under (derived by default)
+
+        Returns:
+            Gameweeks whose features were written
+        """
+        from services.fpl_api import fpl_client
+
+        bootstrap = await fpl_client.get_bootstrap_static(force_refresh=True)
+        events = bootstrap.get("events", [])
+        season = season or season_name(events)
+
+        state = self.load_state(season)
+        if state is None:
+            logger.info(f"No feature state for {season}, running a full build")
+            return await self.build(season)
+
+        finished = finished_gameweeks(events)
+        pending = list(range(state.played + 1, finished + 1))
+        if not pending:
+            logger.info(f"Features for {season} are up to date (GW{state.played} absorbed)")
+            return []
+
+        players = bootstrap.get("elements", [])
+        teams = bootstrap.get("teams", [])
+        fixtures = await fpl_client.get_fixtures(force_refresh=True)
+        total_players = bootstrap.get("total_players", 0)
+
+        ids = np.array([player["id"] for player in players], dtype=np.int64)
+        rows = state.extend(ids)
+        price = np.full(len(state.ids), np.nan)
+        price[rows] = [player.get("now_cost", 0) / 10.0 for player in players]
+        ownership = np.full(len(state.ids), np.nan)
+        if total_players:
+            ownership[rows] = [float(player.get("selected_by_percent") or 0) for player in players]
+
+        results = np.stack(team_results(fixtures, state.team_recent.shape[0] - 1, finished), axis=-1)
+
+        written = []
+        for gameweek in pending:
+            live = await fpl_client.get_live_gameweek(gameweek)
+            stats, played_mask = live_stats(live, state.ids)
+            changed = state.advance(stats, played_mask, price, ownership, results[:, gameweek - 1])
+
+            outcomes = stats[:, [HISTORY_STATS.index("total_points"), HISTORY_STATS.index("minutes")]]
+            self.save_targets(season, gameweek, state.ids, outcomes)
+
+            if gameweek < MAX_GAMEWEEK:
+                features = await asyncio.to_thread(state.features, players, fixtures, teams)
+                self.save(
+                    season, gameweek + 1, ids, features, np.full((len(ids), len(TARGETS)), np.nan),
+                    {"played": state.played, "changed_players": state.ids[changed].tolist()}
+                )
+                written.append(gameweek + 1)
+
+            # Persist after every gameweek so a failed run resumes where it stopped
+            self.save_state(season, state)
+            logger.info(f"Absorbed GW{gameweek} for {season}: {len(changed)} players changed")
+
+        return written
+
+
+# Global feature store instance
+feature_store = FeatureStore()
+
+
+async def run_build(season: Optional[str] = None, incremental: bool = False):
+    """Build or update the store from the FPL API."""
+    from services.fpl_api import fpl_client
+
+    await fpl_client.initialize()
+    try:
+        if incremental:
+            await feature_store.update(season)
+        else:
+            await feature_store.build(season)
+    finally:
+        await fpl_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-gameweek feature store")
+    parser.add_argument("--season", help="Season label to store under (default: derived from the FPL API)")
+    parser.add_argument("--update", action="store_true", help="Only absorb newly finished gameweeks")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    asyncio.run(run_build(args.season, args.update))
+
+
+if __name__ == "__main__":
+    main()
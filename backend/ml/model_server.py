@@ -0,0 +1,303 @@
+"""
+Model server - versioned ensemble loading and batched inference
+
+Models live under MODEL_PATH, one directory per version:
+
+    {MODEL_PATH}/CURRENT                   name of the version to serve (else MODEL_VERSION)
+    {MODEL_PATH}/{version}/manifest.json   feature names and ensemble members per target
+    {MODEL_PATH}/{version}/points_xgboost.json, ...
+
+    {
+      "version": "20250112-0200",
+      "feature_names": ["form_3", ...],
+      "feature_version": 1,
+      "models": {
+        "points": [{"family": "xgboost", "file": "points_xgboost.json", "weight": 0.5}, ...],
+        "minutes": [...]
+      }
+    }
+
+An ensemble is loaded once per process and swapped atomically when CURRENT
+changes: in-flight batches finish on the ensemble they started with and the
+next batch picks up the new one, with no restart. Each target's prediction is
+the weighted mean of its members over the whole feature matrix in one call.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Sequence, Hashable, Tuple
+
+import numpy as np
+
+from config import settings
+from utils.metrics import get_recorder
+
+logger = logging.getLogger(__name__)
+
+model_metrics = get_recorder("model_server")
+
+Predictor = Callable[[np.ndarray], np.ndarray]
+
+
+@dataclass
+class Member:
+    """One loaded model in an ensemble."""
+    family: str
+    model: Any  # Booster, CatBoostRegressor, or {"coef", "intercept"} for ridge
+    predict: Predictor
+    weight: float
+
+
+def load_member(family: str, path: Path, weight: float = 1.0) -> Member:
+    """
+    Load one saved model with a function from a feature matrix to predictions.
+
+    Supported families: xgboost, lightgbm, catboost, and ridge (a numpy
+    linear model saved as .npz with "coef" and "intercept").
+    """
+    if family == "xgboost":
+        import xgboost as xgb
+        booster = xgb.Booster()
+        booster.load_model(str(path))
+        return Member(family, booster, lambda features: booster.inplace_predict(features), weight)
+
+    if family == "lightgbm":
+        import lightgbm as lgb
+        booster = lgb.Booster(model_file=str(path))
+        return Member(family, booster, booster.predict, weight)
+
+    if family == "catboost":
+        from catboost import CatBoostRegressor
+        model = CatBoostRegressor()
+        model.load_model(str(path))
+        return Member(family, model, model.predict, weight)
+
+    if family == "ridge":
+        with np.load(path) as data:
+            coef, intercept = data["coef"], float(data["intercept"])
+        return Member(family, {"coef": coef, "intercept": intercept}, lambda features: features @ coef + intercept, weight)
+
+    raise ValueError(f"Unknown model family: {family}")
+
+
+@dataclass
+class Ensemble:
+    """A loaded model version: weighted members per target."""
+    version: str
+    feature_names: List[str]
+    members: Dict[str, List[Member]]
+    manifest: Dict[str, Any]
+
+    @classmethod
+    def load(cls, directory: Path) -> "Ensemble":
+        """
+        Load every member listed in a version's manifest.
+
+        Raises:
+            FileNotFoundError: If the version has no manifest
+        """
+        manifest = json.loads((directory / "manifest.json").read_text())
+        members = {}
+        for target, entries in manifest["models"].items():
+            members[target] = [
+                load_member(entry["family"], directory / entry["file"], float(entry.get("weight", 1.0)))
+                for entry in entries
+            ]
+        return cls(
+            version=manifest.get("version", directory.name),
+            feature_names=manifest["feature_names"],
+            members=members,
+            manifest=manifest,
+        )
+
+    def align(self, features: np.ndarray, feature_names: Sequence[str]) -> np.ndarray:
+        """
+        Reorder a feature matrix's columns to the training order.
+
+        Raises:
+            ValueError: If a feature the model needs is missing
+        """
+        if list(feature_names) != self.feature_names:
+            missing = set(self.feature_names) - set(feature_names)
+            if missing:
+                raise ValueError(f"Model {self.version} needs features that aren't available: {sorted(missing)}")
+            columns = [list(feature_names).index(name) for name in self.feature_names]
+            features = features[:, columns]
+        return np.ascontiguousarray(features, dtype=np.float32)
+
+    def predict(self, features: np.ndarray, feature_names: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Predict every target for a feature matrix.
+
+        Args:
+            features: (rows, features) matrix
+            feature_names: Column names of features; reordered to the training order
+
+        Returns:
+            Predictions per target, one value per row
+        """
+        features = self.align(features, feature_names)
+
+        outputs = {}
+        for target, members in self.members.items():
+            total_weight = sum(member.weight for member in members)
+            combined = np.zeros(len(features))
+            for member in members:
+                combined += member.weight * np.asarray(member.predict(features), dtype=np.float64)
+            outputs[target] = combined / total_weight
+        return outputs
+
+
+@dataclass
+class ModelPredictions:
+    """Predictions for one feature matrix and the version that made them."""
+    version: str
+    outputs: Dict[str, np.ndarray]
+
+
+class ModelServer:
+    """Serves the current ensemble and caches recent prediction batches."""
+
+    def __init__(self):
+        self._ensemble: Optional[Ensemble] = None
+        self._load_lock = threading.Lock()
+        self._batches: "OrderedDict[Tuple[str, Hashable], ModelPredictions]" = OrderedDict()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        """Version being served, or None if no model is loaded."""
+        ensemble = self._ensemble
+        return ensemble.version if ensemble else None
+
+    @property
+    def ensemble(self) -> Optional[Ensemble]:
+        """Ensemble being served, e.g. for explaining its predictions."""
+        return self._ensemble
+
+    @property
+    def ready(self) -> bool:
+        return self._ensemble is not None
+
+    def active_version(self) -> str:
+        """Version that should be served: CURRENT if present, else MODEL_VERSION."""
+        pointer = Path(settings.model_path) / "CURRENT"
+        if pointer.exists():
+            version = pointer.read_text().strip()
+            if version:
+                return version
+        return settings.model_version
+
+    def load(self, version: Optional[str] = None) -> bool:
+        """
+        Load a version and swap it in.
+
+        Returns:
+            True if a new version was swapped in, False if it was already served
+
+        Raises:
+            FileNotFoundError: If the version has no manifest
+        """
+        version = version or self.active_version()
+        with self._load_lock:
+            if self.version == version:
+                return False
+            with model_metrics.time(f"load.{version}"):
+                ensemble = Ensemble.load(Path(settings.model_path) / version)
+            previous = self.version
+            # A single reference assignment: readers see the old or the new ensemble, never a mix
+            self._ensemble = ensemble
+        logger.info(f"Serving model {ensemble.version} (was {previous})")
+        return True
+
+    async def reload(self, version: Optional[str] = None) -> bool:
+        """
+        Load a version off the event loop, keeping the current one on failure.
+
+        Returns:
+            True if a new version was swapped in
+        """
+        try:
+            return await asyncio.to_thread(self.load, version)
+        except FileNotFoundError:
+            logger.info(f"No model artifacts for {version or self.active_version()} in {settings.model_path}")
+        except Exception as e:
+            logger.error(f"Failed to load model {version or self.active_version()}: {e}", exc_info=True)
+        return False
+
+    async def start(self):
+        """Load the active version and watch CURRENT for new ones."""
+        await self.reload()
+        if settings.model_reload_interval > 0 and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(settings.model_reload_interval)
+            if self.active_version() != self.version:
+                await self.reload()
+
+    def predict(
+        self,
+        features: np.ndarray,
+        feature_names: Sequence[str],
+        key: Optional[Hashable] = None
+    ) -> Optional[ModelPredictions]:
+        """
+        Batched inference over a feature matrix.
+
+        Args:
+            features: (rows, features) matrix, e.g. one gameweek from the feature store
+            feature_names: Column names of features
+            key: Identifies the matrix (e.g. (season, gameweek)) so repeat
+                requests are served from the batch cache
+
+        Returns:
+            Predictions per target, or None if no model is loaded
+        """
+        ensemble = self._ensemble
+        if ensemble is None:
+            return None
+
+        cache_key = (ensemble.version, key)
+        if key is not None:
+            cached = self._batches.get(cache_key)
+            if cached is not None:
+                self._batches.move_to_end(cache_key)
+                return cached
+
+        with model_metrics.time(f"predict.{ensemble.version}"):
+            predictions = ModelPredictions(ensemble.version, ensemble.predict(features, feature_names))
+
+        if key is not None and settings.model_batch_cache_size > 0:
+            self._batches[cache_key] = predictions
+            while len(self._batches) > settings.model_batch_cache_size:
+                self._batches.popitem(last=False)
+        return predictions
+
+    def status(self) -> Dict[str, Any]:
+        """Served version and what CURRENT points at."""
+        ensemble = self._ensemble
+        return {
+            "version": ensemble.version if ensemble else None,
+            "active_version": self.active_version(),
+            "targets": sorted(ensemble.members) if ensemble else [],
+            "cached_batches": len(self._batches),
+        }
+
+
+# Global model server instance
+model_server = ModelServer()
@@ -0,0 +1,294 @@
+"""
+Monte Carlo points distributions
+
+Draws SIMULATION_SAMPLES outcomes of a gameweek for every player at once,
+as (samples, players) arrays:
+
+- each fixture's score: Poisson team goals around the attacking team's
+  expected goals (from its players' rates, scaled by fixture difficulty),
+  times a per-match lognormal shock shared by the whole team;
+- each player's minutes: no appearance, a substitute appearance or 60+,
+  from availability and their share of the minutes played so far;
+- goals and assists: binomial draws from the team's simulated goals in
+  proportion to the player's share of its expected goals, so teammates'
+  returns rise and fall together and a clean sheet really is the opponent
+  scoring zero;
+- bonus: Poisson around the player's bonus rate, tilted towards samples
+  where they returned.
+
+Points use FPL scoring. Double gameweeks simulate each fixture; a blank
+gameweek simulates nothing.
+
+The engine's expected points per player (which already include their
+chance of being available) set the target mean. The samples are moved
+towards it in two steps: scaled by the ratio of the two means, clipped to
+MAX_RESCALE either way, then shifted by whatever difference remains, at
+most MAX_SHIFT points. The shift applies only to samples where the player
+got on the pitch, so a benched or injured draw stays a zero. When the two
+means disagree by more than that allows (e.g. strong form from very few
+minutes), the samples keep the simulation's view rather than inventing an
+extreme tail.
+
+Floor, median, ceiling and haul probability are all read from these
+adjusted samples, so they describe one distribution; blank probability
+counts returns as drawn.
+"""
+import logging
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# FPL scoring by element_type (index 0 unused)
+GOAL_POINTS = np.array([0, 6, 6, 5, 4])
+CLEAN_SHEET_POINTS = np.array([0, 4, 4, 1, 0])
+CONCEDED_PENALTY = np.array([0, 1, 1, 0, 0])  # per 2 goals conceded
+ASSIST_POINTS = 3
+
+# Priors per 90 minutes by element_type, worth PRIOR_NINETIES of evidence
+PRIOR_GOALS = np.array([0, 0.0, 0.05, 0.18, 0.40])
+PRIOR_ASSISTS = np.array([0, 0.02, 0.08, 0.17, 0.15])
+PRIOR_BONUS = np.array([0, 0.25, 0.25, 0.30, 0.35])
+PRIOR_NINETIES = 5.0
+
+LEAGUE_GOALS = 1.4  # Goals per team per match, when a team's players don't say
+MATCH_SHOCK = 0.35  # Std dev of the log team-goals shock per match
+DIFFICULTY_WEIGHT = 0.1  # Expected goals scale by 10% per FDR step easier (or harder) than 3
+SUB_SHARE = 0.15  # Extra chance of a substitute appearance on top of the 60+ chance
+PITCH_TIME = (0.0, 0.3, 0.95)  # Share of the match on the pitch: none, substitute, 60+
+
+MAX_RESCALE = 1.5  # Largest factor the samples are scaled by (or down by) towards the engine mean
+MAX_SHIFT = 6.0  # Most points added to (or taken from) an appearance to close the remaining gap
+HAUL_POINTS = 10
+FLOOR_PERCENTILE = 10
+CEILING_PERCENTILE = 90
+SEED = 0  # Same snapshot, same distribution
+
+AVAILABILITY = {"a": 1.0, "d": 0.5}
+
+
+def _number(player: Dict[str, Any], key: str) -> float:
+    value = player.get(key)
+    return float(value) if value not in (None, "") else np.nan
+
+
+def availability(players: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Each player's chance of being fit and selected at all, 0-1.
+
+    Uses chance_of_playing_next_round where FPL sends it, else the status
+    (available, doubtful, or injured/suspended/unavailable).
+    """
+    chance = np.array([_number(player, "chance_of_playing_next_round") for player in players]) / 100
+    status = np.array([AVAILABILITY.get(player.get("status", "a"), 0.0) for player in players])
+    return np.clip(np.where(np.isnan(chance), status, chance), 0, 1)
+
+
+@dataclass
+class PlayerRates:
+    """Per-player simulation inputs, one array entry per player."""
+    available: np.ndarray  # chance of being fit and selected at all
+    share: np.ndarray  # chance of 60+ minutes given available
+    goals: np.ndarray  # per 90
+    assists: np.ndarray  # per 90
+    bonus: np.ndarray  # per 90
+
+    @classmethod
+    def from_players(cls, players: List[Dict[str, Any]], element_type: np.ndarray) -> "PlayerRates":
+        """
+        Estimate rates from season totals, shrunk towards position priors.
+
+        Expected goals and assists are preferred to actual ones where the API
+        sends them; they are less noisy over a few gameweeks.
+        """
+        minutes = np.array([_number(player, "minutes") for player in players])
+        minutes = np.nan_to_num(minutes)
+        nineties = minutes / 90
+
+        def per_90(primary: str, fallback: str, prior: np.ndarray) -> np.ndarray:
+            counts = np.array([_number(player, primary) for player in players])
+            actual = np.nan_to_num(np.array([_number(player, fallback) for player in players]))
+            counts = np.where(np.isnan(counts), actual, counts)
+            return (counts + prior[element_type] * PRIOR_NINETIES) / (nineties + PRIOR_NINETIES)
+
+        # Matches played so far, from whoever has played the most
+        starts = np.array([_number(player, "starts") for player in players])
+        games = np.nanmax(starts) if np.isfinite(starts).any() else 0
+        games = max(games, minutes.max(initial=0) / 90, 1)
+
+        return cls(
+            available=availability(players),
+            share=np.clip(minutes / (90 * games), 0, 1),
+            goals=per_90("expected_goals", "goals_scored", PRIOR_GOALS),
+            assists=per_90("expected_assists", "assists", PRIOR_ASSISTS),
+            bonus=per_90("bonus", "bonus", PRIOR_BONUS),
+        )
+
+
+@dataclass
+class PointsDistribution:
+    """Summary of each player's simulated points."""
+    floor: np.ndarray  # FLOOR_PERCENTILE
+    median: np.ndarray
+    ceiling: np.ndarray  # CEILING_PERCENTILE
+    haul_probability: np.ndarray  # P(points >= HAUL_POINTS)
+    blank_probability: np.ndarray  # P(no goal, assist, clean sheet or bonus)
+    start_probability: np.ndarray  # P(60+ minutes in at least one fixture)
+    rotation_risk: np.ndarray  # P(under 60 minutes | available)
+
+
+def fixture_slots(
+    fixtures: Optional[List[Dict[str, Any]]],
+    gameweek: int,
+    team_count: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The gameweek's matches and each team's place in them.
+
+    Without a fixture list (or gameweek) every team plays one match against
+    an average opponent (team 0, which has no players).
+
+    Returns:
+        Tuple of (matches (M, 4) of home, away, home FDR, away FDR;
+        slot_match (teams + 1, slots) match index or -1; slot_home (teams + 1, slots))
+    """
+    if not fixtures or gameweek <= 0:
+        matches = [(team, 0, 3, 3) for team in range(1, team_count + 1)]
+    else:
+        matches = [
+            (fixture["team_h"], fixture["team_a"],
+             fixture.get("team_h_difficulty") or 3, fixture.get("team_a_difficulty") or 3)
+            for fixture in fixtures if fixture.get("event") == gameweek
+        ]
+    matches = np.array(matches, dtype=np.int64).reshape(-1, 4)
+
+    slots: List[List[Tuple[int, bool]]] = [[] for _ in range(team_count + 1)]
+    for index, (home, away, _, _) in enumerate(matches.tolist()):
+        if home <= team_count:
+            slots[home].append((index, True))
+        if 0 < away <= team_count:
+            slots[away].append((index, False))
+
+    width = max([len(team_slots) for team_slots in slots] + [1])
+    slot_match = np.full((team_count + 1, width), -1, dtype=np.int64)
+    slot_home = np.zeros((team_count + 1, width), dtype=bool)
+    for team, team_slots in enumerate(slots):
+        for k, (index, home) in enumerate(team_slots):
+            slot_match[team, k] = index
+            slot_home[team, k] = home
+    return matches, slot_match, slot_home
+
+
+def simulate_points(
+    players: List[Dict[str, Any]],
+    element_type: np.ndarray,
+    team: np.ndarray,
+    expected_points: np.ndarray,
+    fixtures: Optional[List[Dict[str, Any]]],
+    gameweek: int,
+    samples: int
+) -> PointsDistribution:
+    """
+    Simulate a gameweek for every player and summarize the distributions.
+
+    Args:
+        players: FPL elements
+        element_type: Position per player (1-4)
+        team: Team ID per player
+        expected_points: Mean the samples are rescaled to, per player; should
+            already be scaled by availability() (0 gives all-zero samples)
+        fixtures: FPL fixtures (None to assume one average match each)
+        gameweek: Gameweek to simulate
+        samples: Number of simulated gameweeks
+
+    Returns:
+        Distribution summary per player
+    """
+    rng = np.random.default_rng(SEED)
+    element_type = element_type.astype(np.int64)
+    rates = PlayerRates.from_players(players, element_type)
+    team_count = int(max(team.max(initial=0), max((max(f["team_h"], f["team_a"]) for f in fixtures or []), default=0)))
+    matches, slot_match, slot_home = fixture_slots(fixtures, gameweek, team_count)
+
+    # Each team's expected goals with its expected line-up
+    p60 = rates.available * rates.share
+    p_sub = np.minimum(rates.available - p60, rates.available * SUB_SHARE)
+    pitch = p60 * PITCH_TIME[2] + p_sub * PITCH_TIME[1]
+    team_goals = np.bincount(team, weights=rates.goals * pitch, minlength=team_count + 1)
+    team_goals = np.where(team_goals > 0.3, team_goals, LEAGUE_GOALS)
+
+    # Score of every match in every sample
+    home, away, home_fdr, away_fdr = matches.T
+    means = np.stack([
+        team_goals[home] * (1 + DIFFICULTY_WEIGHT * (3 - home_fdr)),
+        team_goals[away] * (1 + DIFFICULTY_WEIGHT * (3 - away_fdr)),
+    ])  # (2, M)
+    shocks = rng.lognormal(-MATCH_SHOCK ** 2 / 2, MATCH_SHOCK, size=(samples, 2, len(matches)))
+    goals = rng.poisson(means * shocks)  # (samples, 2, M)
+
+    player_count = len(players)
+    points = np.zeros((samples, player_count), dtype=np.float32)
+    returned = np.zeros((samples, player_count), dtype=bool)
+    started = np.zeros((samples, player_count), dtype=bool)
+    appeared = np.zeros((samples, player_count), dtype=bool)
+
+    for k in range(slot_match.shape[1]):
+        match = slot_match[team, k]
+        plays = match >= 0
+        if not plays.any() or len(matches) == 0:
+            continue
+        match = np.where(plays, match, 0)
+        side = np.where(slot_home[team, k], 0, 1)
+        scored = goals[:, side, match]
+        conceded = goals[:, 1 - side, match]
+
+        draw = rng.random((samples, player_count), dtype=np.float32)
+        full = (draw < p60) & plays
+        sub = ~full & (draw < p60 + p_sub) & plays
+        on_pitch = np.where(full, PITCH_TIME[2], np.where(sub, PITCH_TIME[1], 0.0))
+
+        team_total = team_goals[team]
+        player_goals = rng.binomial(scored, np.clip(rates.goals * on_pitch / team_total, 0, 1))
+        player_assists = rng.binomial(scored, np.clip(rates.assists * on_pitch / team_total, 0, 1))
+        involvement = player_goals + player_assists
+        expected_involvement = (rates.goals + rates.assists) * on_pitch
+        bonus = np.minimum(3, rng.poisson(rates.bonus * on_pitch * (1 + involvement) / (1 + expected_involvement)))
+        clean_sheet = full & (conceded == 0)
+
+        points += (
+            np.where(full, 2, np.where(sub, 1, 0))
+            + GOAL_POINTS[element_type] * player_goals
+            + ASSIST_POINTS * player_assists
+            + CLEAN_SHEET_POINTS[element_type] * clean_sheet
+            - CONCEDED_PENALTY[element_type] * full * (conceded // 2)
+            + bonus
+        )
+        returned |= (involvement > 0) | (clean_sheet & (CLEAN_SHEET_POINTS[element_type] > 0)) | (bonus > 0)
+        started |= full
+        appeared |= full | sub
+
+    # The engine owns the mean; the simulation supplies the shape around it.
+    # Players who never got on the pitch in any sample keep their mean as a point mass
+    # (zero for unavailable players, whose mean the engine has already zeroed).
+    simulated_mean = points.mean(axis=0)
+    simulated = simulated_mean > 0
+    scale = np.clip(expected_points / np.where(simulated, simulated_mean, 1), 1 / MAX_RESCALE, MAX_RESCALE)
+    adjusted = points * scale.astype(np.float32)
+    appearance_rate = appeared.mean(axis=0)
+    shift = (expected_points - adjusted.mean(axis=0)) / np.where(appearance_rate > 0, appearance_rate, 1)
+    shift = np.clip(shift, -MAX_SHIFT, MAX_SHIFT)
+    adjusted = np.where(appeared, np.maximum(adjusted + shift.astype(np.float32), points.min(axis=0)), adjusted)
+    adjusted = np.where(simulated, adjusted, expected_points.astype(np.float32))
+
+    floor, median, ceiling = np.percentile(adjusted, [FLOOR_PERCENTILE, 50, CEILING_PERCENTILE], axis=0)
+    return PointsDistribution(
+        floor=floor,
+        median=median,
+        ceiling=ceiling,
+        haul_probability=(adjusted >= HAUL_POINTS).mean(axis=0),
+        blank_probability=1 - returned.mean(axis=0),
+        start_probability=started.mean(axis=0),
+        rotation_risk=np.where(rates.available > 0, 1 - rates.share, 1.0),
+    )
@@ -0,0 +1,552 @@
+"""
+Training pipeline - rolling-origin cross-validation and versioned artifacts
+
+Trains the points and minutes models from the feature store. Every played
+gameweek becomes rows of (features, targets); the dataset is written once to
+.npy files that each worker memory-maps, so the pool shares it through the
+page cache instead of pickling copies.
+
+Validation is rolling-origin by gameweek: for each of the last
+TRAINING_CV_FOLDS played gameweeks, fit on everything before it and score on
+it, exactly as the model is used (features known before the deadline, points
+scored after it). Every (target, family, fold) fit and every final fit is an
+independent single-threaded task in one process pool sized to the machine,
+and the whole run shares a single wall-clock deadline (TRAINING_TIME_BUDGET):
+tasks still running at the deadline are killed and their families left out.
+
+Output is a version directory in the layout ml.model_server serves:
+
+    {MODEL_PATH}/{version}/manifest.json   members per target, weighted by 1 / CV MAE
+    {MODEL_PATH}/{version}/metrics.json    per-fold scores, durations, dataset size
+    {MODEL_PATH}/{version}/points_ridge.npz, ...
+
+and CURRENT is repointed at it, which running servers pick up on their next
+check. Runs are also logged to MLFLOW_TRACKING_URI when mlflow is installed.
+
+Retrain on demand from the backend directory (after python -m ml.feature_store):
+
+    python -m ml.training
+    python -m ml.training --families ridge,lightgbm --budget 600 --no-promote
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from config import settings
+from ml.feature_engineering import FEATURE_VERSION, TARGETS
+from ml.feature_store import FeatureStore, MAX_GAMEWEEK, feature_store
+
+logger = logging.getLogger(__name__)
+
+# Module each family needs; families whose module isn't installed are skipped
+FAMILY_MODULES = {
+    "xgboost": "xgboost",
+    "lightgbm": "lightgbm",
+    "catboost": "catboost",
+    "ridge": "numpy",
+}
+
+MODEL_SUFFIXES = {
+    "xgboost": ".json",
+    "lightgbm": ".txt",
+    "catboost": ".cbm",
+    "ridge": ".npz",
+}
+
+# Each task is single-threaded: the pool, not the library, uses the cores
+TREE_ROUNDS = 400
+LEARNING_RATE = 0.05
+RIDGE_ALPHA = 1.0
+
+
+class RidgeModel:
+    """Closed-form ridge regression on standardized features."""
+
+    def __init__(self, alpha: float = RIDGE_ALPHA):
+        self.alpha = alpha
+        self.coef: Optional[np.ndarray] = None
+        self.intercept = 0.0
+
+    def fit(self, features: np.ndarray, targets: np.ndarray) -> "RidgeModel":
+        features = np.nan_to_num(np.asarray(features, dtype=np.float64))
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1.0
+        standardized = (features - mean) / scale
+
+        gram = standardized.T @ standardized + self.alpha * np.eye(features.shape[1])
+        weights = np.linalg.solve(gram, standardized.T @ (targets - targets.mean()))
+
+        # Fold the scaling into the coefficients so serving is a single matmul
+        self.coef = weights / scale
+        self.intercept = float(targets.mean() - mean @ self.coef)
+        return self
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return np.nan_to_num(np.asarray(features, dtype=np.float64)) @ self.coef + self.intercept
+
+    def save(self, path: Path):
+        with open(path, "wb") as f:
+            np.savez(f, coef=self.coef.astype(np.float32), intercept=np.float64(self.intercept))
+
+
+def make_model(family: str):
+    """Unfitted single-threaded model with the sklearn fit/predict interface."""
+    if family == "xgboost":
+        from xgboost import XGBRegressor
+        return XGBRegressor(
+            n_estimators=TREE_ROUNDS, learning_rate=LEARNING_RATE, max_depth=6,
+            subsample=0.8, colsample_bytree=0.8, tree_method="hist", n_jobs=1, random_state=0
+        )
+
+    if family == "lightgbm":
+        from lightgbm import LGBMRegressor
+        return LGBMRegressor(
+            n_estimators=TREE_ROUNDS, learning_rate=LEARNING_RATE, num_leaves=31,
+            subsample=0.8, subsample_freq=1, colsample_bytree=0.8, n_jobs=1, random_state=0, verbose=-1
+        )
+
+    if family == "catboost":
+        from catboost import CatBoostRegressor
+        return CatBoostRegressor(
+            iterations=TREE_ROUNDS, learning_rate=LEARNING_RATE, depth=6,
+            thread_count=1, random_seed=0, verbose=False, allow_writing_files=False
+        )
+
+    if family == "ridge":
+        return RidgeModel()
+
+    raise ValueError(f"Unknown model family: {family}")
+
+
+def save_model(family: str, model, path: Path):
+    """Save a fitted model in the format ml.model_server.load_member reads."""
+    if family == "xgboost":
+        model.get_booster().save_model(str(path))
+    elif family == "lightgbm":
+        model.booster_.save_model(str(path))
+    elif family == "catboost":
+        model.save_model(str(path))
+    elif family == "ridge":
+        model.save(path)
+    else:
+        raise ValueError(f"Unknown model family: {family}")
+
+
+def build_dataset(store: FeatureStore, directory: Path) -> Dict[str, Any]:
+    """
+    Write every played gameweek in the store as one training set.
+
+    Rows are ordered by time, where time is the gameweek counted across
+    seasons (season index * MAX_GAMEWEEK + gameweek), so folds are plain
+    comparisons on the times array.
+
+    Returns:
+        Dataset summary: feature names, rows, and the played times
+
+    Raises:
+        ValueError: If no stored gameweek has been played yet
+    """
+    features, targets, times = [], [], []
+    feature_names = None
+    for season_index, season in enumerate(store.seasons()):
+        for frame in store.load_range(season):
+            played = ~np.isnan(frame.targets).any(axis=1)
+            if not played.any():
+                continue
+            feature_names = feature_names or list(frame.names)
+            if list(frame.names) != feature_names:
+                raise ValueError(f"{season} GW{frame.gameweek} has different features; rebuild the store")
+            features.append(np.asarray(frame.features[played]))
+            targets.append(np.asarray(frame.targets[played]))
+            times.append(np.full(int(played.sum()), season_index * MAX_GAMEWEEK + frame.gameweek, dtype=np.int32))
+
+    if not features:
+        raise ValueError(f"No played gameweeks in the feature store at {store.root}")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / "features.npy", np.concatenate(features).astype(np.float32))
+    np.save(directory / "targets.npy", np.concatenate(targets).astype(np.float32))
+    np.save(directory / "times.npy", np.concatenate(times))
+
+    all_times = np.concatenate(times)
+    return {
+        "feature_names": feature_names,
+        "rows": int(len(all_times)),
+        "times": sorted(set(all_times.tolist())),
+    }
+
+
+def rolling_origins(times: List[int], folds: int) -> List[int]:
+    """Validation gameweeks: the last folds played ones that have earlier data to train on."""
+    return times[1:][-folds:] if folds > 0 else []
+
+
+def run_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fit one model in a worker process.
+
+    A task with an origin is a CV fold (train before it, score on it); a task
+    without one is a final fit on every row, saved to task["path"].
+    """
+    started = time.perf_counter()
+    directory = Path(task["dataset"])
+    features = np.load(directory / "features.npy", mmap_mode="r")
+    targets = np.load(directory / "targets.npy", mmap_mode="r")[:, TARGETS.index(task["target"])]
+    times = np.load(directory / "times.npy")
+
+    origin = task.get("origin")
+    train = times < origin if origin is not None else np.ones(len(times), dtype=bool)
+    model = make_model(task["family"]).fit(features[train], targets[train])
+
+    result = {**task, "train_rows": int(train.sum())}
+    if origin is not None:
+        valid = times == origin
+        errors = model.predict(features[valid]) - targets[valid]
+        result["mae"] = float(np.abs(errors).mean())
+        result["rmse"] = float(np.sqrt((errors ** 2).mean()))
+    else:
+        save_model(task["family"], model, Path(task["path"]))
+
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def run_pool(tasks: List[Dict[str, Any]], workers: int, budget: float) -> List[Dict[str, Any]]:
+    """
+    Run tasks across a process pool under one wall-clock deadline.
+
+    Returns:
+        Finished task results; tasks that failed or missed the deadline are left out
+    """
+    # Spawned rather than forked: the API process has an event loop and threads
+    context = multiprocessing.get_context("spawn")
+    deadline = time.monotonic() + budget
+    results = []
+    with context.Pool(processes=workers) as pool:
+        pending = [(task, pool.apply_async(run_task, (task,))) for task in tasks]
+        for task, handle in pending:
+            handle.wait(max(0.0, deadline - time.monotonic()))
+            name = f"{task['target']}/{task['family']}/{task.get('origin') or 'final'}"
+            if not handle.ready():
+                logger.warning(f"Training task {name} missed the {budget:.0f}s budget")
+                continue
+            try:
+                results.append(handle.get())
+            except Exception as e:
+                logger.error(f"Training task {name} failed: {e}")
+        # Leaving the block terminates anything still running
+    return results
+
+
+def available_families(families: List[str]) -> List[str]:
+    available = []
+    for family in families:
+        module = FAMILY_MODULES.get(family)
+        if module is None:
+            logger.warning(f"Unknown model family {family}, skipping")
+        elif importlib.util.find_spec(module) is None:
+            logger.warning(f"{module} isn't installed, skipping {family}")
+        else:
+            available.append(family)
+    return available
+
+
+def summarize(results: List[Dict[str, Any]], families: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-target CV scores and ensemble weights.
+
+    A family is an ensemble member for a target when its final fit finished
+    and at least one fold scored it; its weight is proportional to 1 / mean MAE.
+    """
+    summary = {}
+    for target in TARGETS:
+        members = {}
+        for family in families:
+            folds = [r for r in results if r["target"] == target and r["family"] == family and r.get("origin")]
+            final = next((r for r in results if r["target"] == target and r["family"] == family and r.get("origin") is None), None)
+            if not folds or final is None:
+                continue
+            mae = float(np.mean([fold["mae"] for fold in folds]))
+            members[family] = {
+                "file": Path(final["path"]).name,
+                "mae": round(mae, 4),
+                "rmse": round(float(np.mean([fold["rmse"] for fold in folds])), 4),
+                "folds": {str(fold["origin"]): round(fold["mae"], 4) for fold in folds},
+                "seconds": round(final["seconds"] + sum(fold["seconds"] for fold in folds), 2),
+            }
+        inverse = {family: 1.0 / max(member["mae"], 1e-6) for family, member in members.items()}
+        for family, member in members.items():
+            member["weight"] = round(inverse[family] / sum(inverse.values()), 4)
+        summary[target] = members
+    return summary
+
+
+def log_to_mlflow(version: str, directory: Path, params: Dict[str, Any], summary: Dict[str, Dict[str, Any]]):
+    """Record the run in MLflow if it's installed; never fails the training run."""
+    try:
+        import mlflow
+    except ImportError:
+        return
+    try:
+        mlflow.set_tracking_uri(settings.mlflow_tracking_uri)
+        mlflow.set_experiment("fpl-training")
+        with mlflow.start_run(run_name=version):
+            mlflow.log_params(params)
+            for target, members in summary.items():
+                for family, member in members.items():
+                    mlflow.log_metric(f"{target}_{family}_mae", member["mae"])
+                    mlflow.log_metric(f"{target}_{family}_weight", member["weight"])
+            mlflow.log_artifacts(str(directory))
+    except Exception as e:
+        logger.warning(f"Failed to log training run {version} to MLflow: {e}")
+
+
+def promote(version: str):
+    """Point CURRENT at a version; servers swap to it on their next check."""
+    pointer = Path(settings.model_path) / "CURRENT"
+    tmp = pointer.with_suffix(".tmp")
+    tmp.write_text(version)
+    os.replace(tmp, pointer)
+
+
+def train(
+    families: Optional[List[str]] = None,
+    folds: Optional[int] = None,
+    budget: Optional[float] = None,
+    workers: Optional[int] = None,
+    store: Optional[FeatureStore] = None,
+    publish: bool = True
+) -> Dict[str, Any]:
+    """
+    Run the whole pipeline: dataset, CV and final fits, artifacts, promotion.
+
+    Args:
+        families: Model families (default TRAINING_FAMILIES)
+        folds: Rolling-origin folds (default TRAINING_CV_FOLDS)
+        budget: Wall-clock seconds for all fits (default TRAINING_TIME_BUDGET)
+        workers: Pool size (default TRAINING_WORKERS, 0 meaning every core)
+        store: Feature store to train from
+        publish: Repoint CURRENT at the new version
+
+    Returns:
+        Run summary (also written as metrics.json)
+
+    Raises:
+        ValueError: If the store has no played gameweeks or no family is usable
+    """
+    started = time.perf_counter()
+    store = store or feature_store
+    families = available_families(
+        families or [family.strip() for family in settings.training_families.split(",") if family.strip()]
+    )
+    if not families:
+        raise ValueError("No model family is available to train")
+    folds = settings.training_cv_folds if folds is None else folds
+    budget = budget or settings.training_time_budget
+    workers = workers or settings.training_workers or os.cpu_count() or 1
+
+    version = datetime.now().strftime("%Y%m%d-%H%M%S")
+    directory = Path(settings.model_path) / version
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(prefix="fpl-train-") as scratch:
+        dataset = build_dataset(store, Path(scratch))
+        origins = rolling_origins(dataset["times"], folds)
+        logger.info(
+            f"Training {version}: {dataset['rows']} rows, {len(families)} families, "
+            f"{len(origins)} folds, {workers} workers, {budget:.0f}s budget"
+        )
+
+        # Final fits first: they're the ones the version can't do without
+        tasks = [
+            {"dataset": scratch, "target": target, "family": family, "origin": None,
+             "path": str(directory / f"{target}_{family}{MODEL_SUFFIXES[family]}")}
+            for target in TARGETS for family in families
+        ]
+        tasks += [
+            {"dataset": scratch, "target": target, "family": family, "origin": origin}
+            for origin in reversed(origins) for target in TARGETS for family in families
+        ]
+        results = run_pool(tasks, min(workers, len(tasks)), budget)
+
+    summary = summarize(results, families)
+    complete = all(summary[target] for target in TARGETS)
+
+    metrics = {
+        "version": version,
+        "feature_version": FEATURE_VERSION,
+        "rows": dataset["rows"],
+        "folds": origins,
+        "workers": workers,
+        "budget_seconds": budget,
+        "seconds": round(time.perf_counter() - started, 2),
+        "tasks": {"submitted": len(tasks), "finished": len(results)},
+        "targets": summary,
+    }
+    (directory / "metrics.json").write_text(json.dumps(metrics, indent=2))
+
+    if not complete:
+        missing = [target for target in TARGETS if not summary[target]]
+        logger.error(f"Training {version} produced no usable model for {missing}; not publishing it")
+        return {**metrics, "promoted": False}
+
+    manifest = {
+        "version": version,
+        "feature_names": dataset["feature_names"],
+        "feature_version": FEATURE_VERSION,
+        "trained_at": datetime.now().isoformat(),
+        "models": {
+            target: [
+                {"family": family, "file": member["file"], "weight": member["weight"]}
+                for family, member in members.items()
+            ]
+            for target, members in summary.items()
+        },
+    }
+    (directory / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    log_to_mlflow(version, directory, {
+        "families": ",".join(families), "folds": len(origins), "rows": dataset["rows"],
+        "workers": workers, "budget_seconds": budget, "feature_version": FEATURE_VERSION,
+    }, summary)
+
+    if publish:
+        promote(version)
+    logger.info(
+        f"Trained {version} in {metrics['seconds']:.0f}s: "
+        + ", ".join(f"{target} MAE {min(m['mae'] for m in summary[target].values()):.3f}" for target in TARGETS)
+    )
+    return {**metrics, "promoted": publish}
+
+
+class TrainingService:
+    """Runs the pipeline off the event loop, on RETRAIN_SCHEDULE or on demand."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._scheduler = None
+        self.trigger_reason: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def trigger(self, reason: str) -> bool:
+        """
+        Start a retrain in the background.
+
+        Returns:
+            False if one is already running
+        """
+        if self.running:
+            return False
+        self.trigger_reason = reason
+        self.started_at = datetime.now()
+        self._task = asyncio.create_task(self.retrain())
+        return True
+
+    async def retrain(self) -> Optional[Dict[str, Any]]:
+        """Absorb finished gameweeks, train, and swap the new version in."""
+        from ml.model_server import model_server
+
+        logger.info(f"Retraining ({self.trigger_reason or 'manual'})")
+        try:
+            await feature_store.update()
+        except Exception as e:
+            logger.warning(f"Feature store update failed, training on what's stored: {e}")
+
+        try:
+            result = await asyncio.to_thread(train)
+        except Exception as e:
+            logger.error(f"Training failed: {e}", exc_info=True)
+            self.last_run = {"error": str(e), "finished_at": datetime.now().isoformat()}
+            return None
+
+        if result["promoted"]:
+            await model_server.reload()
+        self.last_run = {**result, "finished_at": datetime.now().isoformat()}
+        return result
+
+    def start(self):
+        """Schedule retrains on RETRAIN_SCHEDULE."""
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        from apscheduler.triggers.cron import CronTrigger
+
+        if self._scheduler is not None:
+            return
+        self._scheduler = AsyncIOScheduler()
+        self._scheduler.add_job(
+            self._scheduled, CronTrigger.from_crontab(settings.retrain_schedule),
+            id="retrain", coalesce=True, max_instances=1
+        )
+        self._scheduler.start()
+        logger.info(f"Retraining on schedule {settings.retrain_schedule!r}")
+
+    async def _scheduled(self):
+        # A coroutine so the scheduler runs it on the event loop, not a worker thread
+        if not self.trigger("schedule"):
+            logger.info("Skipping scheduled retrain: one is already running")
+
+    async def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+        if self.running:
+            # The worker thread can't be interrupted; let the run finish in the background
+            logger.info("Shutting down with a training run in progress")
+
+    def status(self) -> Dict[str, Any]:
+        job = self._scheduler.get_job("retrain") if self._scheduler else None
+        return {
+            "running": self.running,
+            "trigger": self.trigger_reason,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "schedule": settings.retrain_schedule if self._scheduler else None,
+            "next_run": job.next_run_time.isoformat() if job and job.next_run_time else None,
+            "last_run": self.last_run,
+        }
+
+
+# Global training service instance
+training_service = TrainingService()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and publish the points and minutes models")
+    parser.add_argument("--families", help="Comma-separated model families (default: TRAINING_FAMILIES)")
+    parser.add_argument("--folds", type=int, help="Rolling-origin CV folds (default: TRAINING_CV_FOLDS)")
+    parser.add_argument("--budget", type=float, help="Wall-clock seconds for all fits (default: TRAINING_TIME_BUDGET)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: every core)")
+    parser.add_argument("--no-promote", action="store_true", help="Write the version without repointing CURRENT")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    result = train(
+        families=args.families.split(",") if args.families else None,
+        folds=args.folds,
+        budget=args.budget,
+        workers=args.workers,
+        publish=not args.no_promote,
+    )
+    print(json.dumps(result["targets"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -172,6 +172,8 @@ class PlayerPrediction(BaseModel):
     
     # Confidence
     confidence_score: float  # 0-1
+    haul_probability: Optional[float] = None  # P(10+ points)
+    blank_probability: Optional[float] = None  # P(no goal, assist, clean sheet or bonus)
     
     # Explanation
     key_factors: List[str] = Field(default_factory=list)
@@ -179,6 +181,17 @@ class PlayerPrediction(BaseModel):
     opponent: Optional[str] = None
 
 
+class PlayerHorizon(BaseModel):
+    """Expected points for a player over the coming gameweeks."""
+    player_id: int
+    player_name: str
+    team: str
+    position: str
+    gameweeks: List[int]
+    expected_points: List[float]  # One per gameweek; 0 in a blank, both fixtures in a double
+    total_expected_points: float
+
+
 class TransferSuggestion(BaseModel):
     """Transfer suggestion model."""
     player_out_id: int
@@ -208,6 +221,7 @@ class TransferSuggestion(BaseModel):
 
 class TeamAnalysis(BaseModel):
     """Analysis of a user's FPL team."""
+    id: Optional[str] = None  # Saved analysis, for GET /api/teams/analysis/{id}; None if it wasn't saved
     team_value: float
     free_transfers: int
     bank: float
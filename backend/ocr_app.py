@@ -0,0 +1,93 @@
+"""
+FPL AI Model - Standalone OCR Service
+
+Runs only the OCR routes so screenshot processing can be scaled and deployed
+separately from the data API (set OCR_ENABLED=false there).
+
+    uvicorn ocr_app:app --host 0.0.0.0 --port 8001
+"""
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import logging
+import asyncio
+
+from config import settings
+from api.routes import ocr
+from services.data_cache import cache_manager
+from services.fpl_api import fpl_client
+from services.ocr_service import ocr_service
+from services.ocr_jobs import ocr_jobs
+from utils.metrics import metrics_snapshot
+from utils.upload_limit import UploadLimitMiddleware
+
+logging.basicConfig(
+    level=getattr(logging, settings.log_level),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start Redis (OCR result cache), the FPL client (player matching) and warm the OCR engine."""
+    logger.info("Starting FPL OCR service...")
+    await cache_manager.connect()
+    await fpl_client.initialize()
+
+    # A dedicated OCR tier always warms up; readiness is reported on /health
+    asyncio.create_task(ocr_service.warm_up())
+    ocr_jobs.start()
+
+    yield
+
+    logger.info("Shutting down FPL OCR service...")
+    await ocr_jobs.stop()
+    ocr_service.shutdown()
+    await fpl_client.close()
+    await cache_manager.disconnect()
+
+
+app = FastAPI(
+    title="FPL AI OCR Service",
+    description="Screenshot OCR for FPL team import",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Reject oversized screenshots before their bodies are read. Added before
+# CORS so it runs inside it and the 413 carries CORS headers.
+app.add_middleware(UploadLimitMiddleware, limits=ocr.upload_limits("/api/ocr"))
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.cors_origins_list,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.get("/health", tags=["Health"])
+async def health_check():
+    """Health check; status is "warming" until the OCR engine is loaded."""
+    return {
+        "status": "healthy" if ocr_service.ready else "warming",
+        "services": {"ocr": ocr_service.state}
+    }
+
+
+@app.get("/metrics", tags=["Health"])
+async def get_metrics():
+    """OCR queue and execution latency metrics."""
+    return metrics_snapshot()
+
+
+app.include_router(ocr.router, prefix="/api/ocr", tags=["OCR"])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("ocr_app:app", host=settings.api_host, port=settings.port)
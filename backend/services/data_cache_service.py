@@ -4,9 +4,12 @@ Caches FPL data in memory to avoid repeated slow API calls.
 Includes fallback demo data for development/testing.
 """
 import logging
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
+from config import settings
+
 logger = logging.getLogger(__name__)
 
 # Minimal demo data for fallback
@@ -37,10 +40,19 @@ class DataCacheService:
         self.teams_cache: Optional[List[Dict[str, Any]]] = None
         self.cache_timestamp: Optional[datetime] = None
         self.cache_ttl_seconds: int = 3600  # 1 hour
+        # Bumped on every set_players so derived data (e.g. predictions) can key on the snapshot
+        self.players_version: int = 0
+        # The full fixture list, versioned the same way so horizons can key on it
+        self.fixtures_cache: Optional[List[Dict[str, Any]]] = None
+        self.fixtures_timestamp: Optional[datetime] = None
+        self.fixtures_version: int = 0
+        # Saved analyses never change, so they live until evicted (LRU)
+        self.analyses_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
     
     def set_players(self, players: List[Dict[str, Any]]):
         """Cache player data."""
         self.players_cache = players
+        self.players_version += 1
         self.cache_timestamp = datetime.now()
         logger.info(f"Cached {len(players)} players in memory")
     
@@ -62,6 +74,35 @@ class DataCacheService:
         """Get cached teams."""
         return self.teams_cache
     
+    def set_fixtures(self, fixtures: List[Dict[str, Any]]):
+        """Cache the full fixture list."""
+        self.fixtures_cache = fixtures
+        self.fixtures_version += 1
+        self.fixtures_timestamp = datetime.now()
+        logger.info(f"Cached {len(fixtures)} fixtures in memory")
+
+    def get_fixtures(self) -> Optional[List[Dict[str, Any]]]:
+        """Get the cached fixture list if still fresh."""
+        if self.fixtures_cache is not None and self.fixtures_timestamp:
+            age = (datetime.now() - self.fixtures_timestamp).total_seconds()
+            if age < self.cache_ttl_seconds:
+                return self.fixtures_cache
+        return None
+
+    def set_analysis(self, analysis_id: str, analysis: Dict[str, Any]):
+        """Cache a saved team analysis."""
+        self.analyses_cache[analysis_id] = analysis
+        self.analyses_cache.move_to_end(analysis_id)
+        while len(self.analyses_cache) > settings.analysis_cache_size:
+            self.analyses_cache.popitem(last=False)
+
+    def get_analysis(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Get a cached team analysis."""
+        analysis = self.analyses_cache.get(analysis_id)
+        if analysis is not None:
+            self.analyses_cache.move_to_end(analysis_id)
+        return analysis
+
     def is_fresh(self) -> bool:
         """Check if cache is still fresh."""
         if not self.cache_timestamp:
@@ -72,8 +113,13 @@ class DataCacheService:
     def clear(self):
         """Clear the cache."""
         self.players_cache = None
+        self.players_version += 1
         self.teams_cache = None
         self.cache_timestamp = None
+        self.fixtures_cache = None
+        self.fixtures_timestamp = None
+        self.fixtures_version += 1
+        self.analyses_cache.clear()
         logger.info("Cache cleared")
 
     def get_demo_players(self) -> List[Dict[str, Any]]:
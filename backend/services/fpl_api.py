@@ -2,9 +2,10 @@
 FPL API Client - Handles all interactions with the official FPL API
 """
 import httpx
+import json
 import logging
 import asyncio
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set
 from datetime import datetime, timedelta
 from config import settings
 from services.data_cache_service import data_cache
@@ -111,9 +112,175 @@ def convert_to_supabase_format(data: Dict[str, Any], data_type: str) -> Dict[str
             "finished_provisional": data.get("finished_provisional", False),
             "stats": data.get("stats"),
         }
+    elif data_type == "history":
+        return {
+            "player_id": data.get("element"),
+            "fixture_id": data.get("fixture"),
+            "round": data.get("round"),
+            "opponent_team": data.get("opponent_team"),
+            "was_home": data.get("was_home", False),
+            "kickoff_time": data.get("kickoff_time"),
+            "team_h_score": data.get("team_h_score"),
+            "team_a_score": data.get("team_a_score"),
+            "total_points": data.get("total_points", 0),
+            "minutes": data.get("minutes", 0),
+            "starts": data.get("starts", 0),
+            "goals_scored": data.get("goals_scored", 0),
+            "assists": data.get("assists", 0),
+            "clean_sheets": data.get("clean_sheets", 0),
+            "goals_conceded": data.get("goals_conceded", 0),
+            "own_goals": data.get("own_goals", 0),
+            "penalties_saved": data.get("penalties_saved", 0),
+            "penalties_missed": data.get("penalties_missed", 0),
+            "yellow_cards": data.get("yellow_cards", 0),
+            "red_cards": data.get("red_cards", 0),
+            "saves": data.get("saves", 0),
+            "bonus": data.get("bonus", 0),
+            "bps": data.get("bps", 0),
+            "influence": float(data.get("influence", 0) or 0),
+            "creativity": float(data.get("creativity", 0) or 0),
+            "threat": float(data.get("threat", 0) or 0),
+            "ict_index": float(data.get("ict_index", 0) or 0),
+            "expected_goals": float(data.get("expected_goals", 0) or 0) if data.get("expected_goals") else None,
+            "expected_assists": float(data.get("expected_assists", 0) or 0) if data.get("expected_assists") else None,
+            "expected_goal_involvements": float(data.get("expected_goal_involvements", 0) or 0) if data.get("expected_goal_involvements") else None,
+            "expected_goals_conceded": float(data.get("expected_goals_conceded", 0) or 0) if data.get("expected_goals_conceded") else None,
+            "value": data.get("value"),
+            "selected": data.get("selected"),
+            "transfers_in": data.get("transfers_in", 0),
+            "transfers_out": data.get("transfers_out", 0),
+        }
     return data
 
 
+class LiveGameweekFeed:
+    """
+    Single upstream poller for a gameweek's live data.
+
+    One task polls /event/{gw}/live/ no matter how many clients are listening.
+    Each poll is diffed against the previous one and only the players whose
+    stats changed are serialized, once, and handed to every subscriber queue.
+    """
+
+    def __init__(self, api_client: "FPLAPIClient", gameweek: int):
+        self.api_client = api_client
+        self.gameweek = gameweek
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._stats: Dict[int, Dict[str, Any]] = {}
+        self._snapshot_message: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Register a subscriber and start polling if this is the first one.
+
+        Returns:
+            Queue of serialized JSON messages (a snapshot first, then deltas)
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.fpl_live_queue_size)
+        if self._stats:
+            queue.put_nowait(self._snapshot())
+        self._subscribers.add(queue)
+
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+            logger.info(f"Started live poller for GW{self.gameweek}")
+
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove a subscriber and stop polling once nobody is listening."""
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            self.stop()
+
+    def stop(self):
+        """Cancel the upstream poller."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            logger.info(f"Stopped live poller for GW{self.gameweek}")
+        self._task = None
+
+    def _snapshot(self) -> str:
+        """Serialized full state, built at most once per change."""
+        if self._snapshot_message is None:
+            self._snapshot_message = json.dumps({
+                "type": "snapshot",
+                "gameweek": self.gameweek,
+                "players": [{"id": player_id, "stats": stats} for player_id, stats in self._stats.items()]
+            })
+        return self._snapshot_message
+
+    def _apply(self, elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge a live payload into the current state.
+
+        Args:
+            elements: The "elements" list from /event/{gw}/live/
+
+        Returns:
+            Changed rows, each carrying only the stats fields that differ
+        """
+        changed = []
+        for element in elements:
+            player_id = element.get("id")
+            stats = element.get("stats") or {}
+            previous = self._stats.get(player_id)
+
+            if previous is None:
+                diff = stats
+            else:
+                diff = {key: value for key, value in stats.items() if previous.get(key) != value}
+
+            if diff:
+                changed.append({"id": player_id, "stats": diff})
+                self._stats[player_id] = stats
+
+        return changed
+
+    def _publish(self, message: str):
+        """Hand one pre-serialized message to every subscriber."""
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and resync it with a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._snapshot())
+
+    async def _poll(self):
+        """Poll the live endpoint until cancelled."""
+        while True:
+            try:
+                live = await self.api_client.get_live_gameweek(self.gameweek)
+                first_poll = not self._stats
+                changed = self._apply(live.get("elements", []))
+
+                if changed:
+                    self._snapshot_message = None
+                    if first_poll:
+                        self._publish(self._snapshot())
+                    else:
+                        self._publish(json.dumps({
+                            "type": "delta",
+                            "gameweek": self.gameweek,
+                            "players": changed
+                        }))
+                    logger.debug(f"GW{self.gameweek} live: {len(changed)} players changed, "
+                                 f"{len(self._subscribers)} subscribers")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Live poll for GW{self.gameweek} failed: {e}")
+
+            await asyncio.sleep(settings.fpl_live_poll_interval)
+
+
 class FPLAPIClient:
     """Client for interacting with the Fantasy Premier League API."""
 
@@ -123,6 +290,7 @@ class FPLAPIClient:
         self._bootstrap_data: Optional[Dict] = None
         self._bootstrap_timestamp: Optional[datetime] = None
         self._supabase_service = None
+        self._live_feeds: Dict[int, LiveGameweekFeed] = {}
         
     async def initialize(self):
         """Initialize the HTTP client."""
@@ -142,6 +310,10 @@ class FPLAPIClient:
         
     async def close(self):
         """Close the HTTP client."""
+        for feed in self._live_feeds.values():
+            feed.stop()
+        self._live_feeds.clear()
+
         if self.client:
             await self.client.aclose()
             logger.info("FPL API client closed")
@@ -219,14 +391,7 @@ class FPLAPIClient:
                     try:
                         players = await self._supabase_service.get_players()
                         teams = await self._supabase_service.get_teams()
-                        gameweeks = []
-
-                        try:
-                            if self._supabase_service.client:
-                                response = self._supabase_service.client.table("gameweeks").select("*").execute()
-                                gameweeks = response.data if response.data else []
-                        except Exception:
-                            gameweeks = []
+                        gameweeks = await self._supabase_service.get_gameweeks()
 
                         if players and teams:
                             self._bootstrap_data = {
@@ -290,6 +455,8 @@ class FPLAPIClient:
                 try:
                     players = await self._supabase_service.get_players()
                     if players:
+                        # Supabase rows store the team as team_id; callers expect the FPL key
+                        players = [{**player, "team": player.get("team", player.get("team_id"))} for player in players]
                         logger.info(f"Retrieved {len(players)} players from Supabase fallback")
                         data_cache.set_players(players)
                         return players
@@ -354,16 +521,24 @@ class FPLAPIClient:
                 return gw
         return None
     
-    async def get_fixtures(self, gameweek: Optional[int] = None) -> List[Dict[str, Any]]:
+    async def get_fixtures(self, gameweek: Optional[int] = None, force_refresh: bool = False) -> List[Dict[str, Any]]:
         """
         Get fixtures, optionally filtered by gameweek.
+        The full list is served from the in-memory cache while fresh.
         
         Args:
             gameweek: Optional gameweek number to filter by
+            force_refresh: Fetch the full list even if it is cached
             
         Returns:
             List of fixture dictionaries
         """
+        if gameweek is None and not force_refresh:
+            cached_fixtures = data_cache.get_fixtures()
+            if cached_fixtures is not None:
+                logger.debug(f"Using {len(cached_fixtures)} fixtures from memory cache")
+                return cached_fixtures
+
         try:
             url = "/fixtures/"
             if gameweek:
@@ -375,6 +550,8 @@ class FPLAPIClient:
             
             fixtures = response.json()
             logger.info(f"Fetched {len(fixtures)} fixtures")
+            if gameweek is None:
+                data_cache.set_fixtures(fixtures)
 
             # Sync fixtures to Supabase
             if self._supabase_service and fixtures:
@@ -411,6 +588,112 @@ class FPLAPIClient:
             logger.error(f"Failed to fetch player {player_id} summary: {e}")
             raise
     
+    async def get_player_histories(
+        self,
+        player_ids: Optional[List[int]] = None,
+        concurrency: int = 10
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Fetch this season's per-fixture history for players.
+
+        Args:
+            player_ids: Players to load (defaults to every player)
+            concurrency: Maximum concurrent element-summary requests
+
+        Returns:
+            History rows by player ID (empty for players that failed to load)
+        """
+        if player_ids is None:
+            player_ids = [p["id"] for p in await self.get_players()]
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_history(player_id: int) -> List[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    summary = await self.get_player_summary(player_id)
+                    return summary.get("history", [])
+                except httpx.HTTPError:
+                    return []
+
+        histories = await asyncio.gather(*(fetch_history(pid) for pid in player_ids))
+        return dict(zip(player_ids, histories))
+
+    async def sync_player_histories(
+        self,
+        player_ids: Optional[List[int]] = None,
+        concurrency: int = 10
+    ) -> int:
+        """
+        Fetch season history for players and store it in one bulk write.
+
+        Args:
+            player_ids: Players to load (defaults to every player)
+            concurrency: Maximum concurrent element-summary requests
+
+        Returns:
+            Number of history rows written
+        """
+        if player_ids is None:
+            player_ids = [p["id"] for p in await self.get_players()]
+
+        histories = await self.get_player_histories(player_ids, concurrency)
+        rows = [convert_to_supabase_format(h, "history") for history in histories.values() for h in history]
+
+        if not rows or not self._supabase_service:
+            return 0
+
+        result = await self._supabase_service.upsert_player_history(rows)
+        await self._supabase_service.update_cache_metadata("player_history", "player_history", settings.fpl_cache_ttl)
+        logger.info(f"Synced {result.written_rows} history rows for {len(player_ids)} players")
+        return result.written_rows
+
+    async def get_live_gameweek(self, gameweek: int) -> Dict[str, Any]:
+        """
+        Get live per-player stats for a gameweek.
+
+        Args:
+            gameweek: Gameweek number
+
+        Returns:
+            Live data dictionary with an "elements" list
+        """
+        try:
+            response = await self.client.get(f"/event/{gameweek}/live/")
+            response.raise_for_status()
+
+            return response.json()
+
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to fetch live data for GW{gameweek}: {e}")
+            raise
+
+    def subscribe_live(self, gameweek: int) -> asyncio.Queue:
+        """
+        Subscribe to live updates for a gameweek.
+        All subscribers of a gameweek share a single upstream poller.
+
+        Args:
+            gameweek: Gameweek number
+
+        Returns:
+            Queue of serialized snapshot/delta messages
+        """
+        feed = self._live_feeds.get(gameweek)
+        if feed is None:
+            feed = LiveGameweekFeed(self, gameweek)
+            self._live_feeds[gameweek] = feed
+        return feed.subscribe()
+
+    def unsubscribe_live(self, gameweek: int, queue: asyncio.Queue):
+        """Unsubscribe from live updates, dropping the feed when it goes idle."""
+        feed = self._live_feeds.get(gameweek)
+        if feed is None:
+            return
+        feed.unsubscribe(queue)
+        if feed.subscriber_count == 0:
+            del self._live_feeds[gameweek]
+    
     async def get_user_team(self, team_id: int, gameweek: Optional[int] = None) -> Dict[str, Any]:
         """
         Get a user's team for a specific gameweek.
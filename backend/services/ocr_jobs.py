@@ -0,0 +1,493 @@
+"""
+OCR Jobs - Asynchronous OCR behind a prioritized job queue
+
+Uploads are stored as jobs and answered immediately with a job id; consumers
+run OCR in the background and clients poll or stream the job status.
+
+Jobs live in Redis (OCR_JOB_QUEUE=redis, using CELERY_BROKER_URL) so several
+worker processes can share them, or in process memory (OCR_JOB_QUEUE=local)
+for single-instance deployments and tests. Standalone worker:
+
+    python -m services.ocr_jobs
+"""
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Optional, List, Dict, Any, Set, AsyncIterator
+
+import redis.asyncio as redis
+
+from config import settings
+from services import ocr_worker
+from services.ocr_service import ocr_service, OCRQueueFullError
+from utils.metrics import get_recorder
+
+logger = logging.getLogger(__name__)
+
+job_metrics = get_recorder("ocr_jobs")
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+def _new_job(job_id: str, priority: int, image_count: int) -> Dict[str, Any]:
+    """Initial job record."""
+    return {
+        "id": job_id,
+        "status": "queued",  # queued, running, succeeded or failed
+        "priority": priority,
+        "images": image_count,
+        "attempts": 0,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "queue_wait": None,
+        "execution": None,
+        "result": None,
+        "error": None,
+    }
+
+
+class JobStore(ABC):
+    """Storage and queueing primitives for OCR jobs."""
+
+    @abstractmethod
+    async def enqueue(self, job: Dict[str, Any], images: List[ocr_worker.ImageBuffer]):
+        """Store a new job with its images and queue it."""
+
+    @abstractmethod
+    async def pending_count(self) -> int:
+        """Jobs accepted and not yet finished, i.e. still holding their images."""
+
+    @abstractmethod
+    async def requeue(self, job_id: str, priority: int):
+        """Put an existing job back on the queue."""
+
+    @abstractmethod
+    async def dequeue(self, timeout: float) -> Optional[str]:
+        """Pop the highest-priority job id, waiting up to timeout seconds."""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job record, or None if unknown or expired."""
+
+    @abstractmethod
+    async def update(self, job_id: str, **fields) -> Dict[str, Any]:
+        """Update a job record and notify subscribers; returns the new record."""
+
+    @abstractmethod
+    async def get_images(self, job_id: str) -> List[ocr_worker.ImageBuffer]:
+        """Images uploaded with a job."""
+
+    @abstractmethod
+    async def discard_images(self, job_id: str):
+        """Drop a finished job's images; the record is kept until it expires."""
+
+    @abstractmethod
+    def subscribe(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the job record on every update."""
+
+    async def close(self):
+        """Release connections."""
+
+
+class LocalJobStore(JobStore):
+    """In-process job store on an asyncio.PriorityQueue."""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._images: Dict[str, List[ocr_worker.ImageBuffer]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    @property
+    def queue(self) -> asyncio.PriorityQueue:
+        # Created lazily so it binds to the running loop
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        return self._queue
+
+    def _prune(self):
+        """Forget finished jobs older than OCR_JOB_TTL."""
+        cutoff = time.time() - settings.ocr_job_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._images.pop(job_id, None)
+
+    async def enqueue(self, job: Dict[str, Any], images: List[ocr_worker.ImageBuffer]):
+        self._prune()
+        self._jobs[job["id"]] = job
+        self._images[job["id"]] = images
+        await self.queue.put((job["priority"], next(self._sequence), job["id"]))
+
+    async def pending_count(self) -> int:
+        return len(self._images)
+
+    async def requeue(self, job_id: str, priority: int):
+        await self.queue.put((priority, next(self._sequence), job_id))
+
+    async def dequeue(self, timeout: float) -> Optional[str]:
+        try:
+            _, _, job_id = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            return job_id
+        except asyncio.TimeoutError:
+            return None
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def update(self, job_id: str, **fields) -> Dict[str, Any]:
+        job = self._jobs[job_id]
+        job.update(fields)
+        snapshot = dict(job)
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(snapshot)
+        return snapshot
+
+    async def get_images(self, job_id: str) -> List[ocr_worker.ImageBuffer]:
+        return self._images.get(job_id, [])
+
+    async def discard_images(self, job_id: str):
+        self._images.pop(job_id, None)
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+
+class RedisJobStore(JobStore):
+    """
+    Redis job store shared by API and worker processes.
+
+    Keys:
+        ocr:jobs:queue           sorted set of job ids, scored by (priority, enqueue time)
+        ocr:job:{id}             job record (JSON)
+        ocr:job:{id}:images      list of image payloads
+        ocr:job:{id}:events      pub/sub channel of job records
+    """
+
+    QUEUE_KEY = "ocr:jobs:queue"
+
+    def __init__(self, url: str):
+        # Binary-safe client: image payloads are raw bytes
+        self.redis = redis.from_url(url, decode_responses=False)
+
+    @staticmethod
+    def _score(priority: int) -> float:
+        # Priority dominates; enqueue time keeps FIFO order within a priority
+        return priority * 1e13 + time.time() * 1000
+
+    async def enqueue(self, job: Dict[str, Any], images: List[ocr_worker.ImageBuffer]):
+        job_id = job["id"]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(f"ocr:job:{job_id}", json.dumps(job), ex=settings.ocr_job_ttl)
+            pipe.rpush(f"ocr:job:{job_id}:images", *[bytes(image) for image in images])
+            pipe.expire(f"ocr:job:{job_id}:images", settings.ocr_job_ttl)
+            pipe.zadd(self.QUEUE_KEY, {job_id: self._score(job["priority"])})
+            await pipe.execute()
+
+    async def pending_count(self) -> int:
+        # Queued jobs; the few running or waiting to retry are bounded by the consumers
+        return await self.redis.zcard(self.QUEUE_KEY)
+
+    async def requeue(self, job_id: str, priority: int):
+        await self.redis.zadd(self.QUEUE_KEY, {job_id: self._score(priority)})
+
+    async def dequeue(self, timeout: float) -> Optional[str]:
+        popped = await self.redis.bzpopmin(self.QUEUE_KEY, timeout=max(1, int(timeout)))
+        if not popped:
+            return None
+        _, job_id, _ = popped
+        return job_id.decode()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(f"ocr:job:{job_id}")
+        return json.loads(raw) if raw else None
+
+    async def update(self, job_id: str, **fields) -> Dict[str, Any]:
+        job = await self.get(job_id) or {}
+        job.update(fields)
+        payload = json.dumps(job)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(f"ocr:job:{job_id}", payload, ex=settings.ocr_job_ttl)
+            pipe.publish(f"ocr:job:{job_id}:events", payload)
+            await pipe.execute()
+        return job
+
+    async def get_images(self, job_id: str) -> List[ocr_worker.ImageBuffer]:
+        return await self.redis.lrange(f"ocr:job:{job_id}:images", 0, -1)
+
+    async def discard_images(self, job_id: str):
+        await self.redis.delete(f"ocr:job:{job_id}:images")
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(f"ocr:job:{job_id}:events")
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield json.loads(message["data"])
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+
+    async def close(self):
+        await self.redis.close()
+
+
+def create_job_store() -> JobStore:
+    """Job store selected by OCR_JOB_QUEUE."""
+    if settings.ocr_job_queue == "redis":
+        return RedisJobStore(settings.celery_broker_url)
+    if settings.ocr_job_queue == "local":
+        return LocalJobStore()
+    raise ValueError(f"Unknown OCR job queue: {settings.ocr_job_queue}")
+
+
+class OCRJobService:
+    """
+    Submits OCR jobs and runs consumers that process them.
+
+    Consumers pull jobs in priority order (0 is highest) and hand them to
+    ocr_service. A job that raises (queue full, worker crash) is retried with
+    backoff up to OCR_JOB_MAX_ATTEMPTS; a job that times out fails at once,
+    since its OCR keeps running in the pool and a retry would take a second
+    worker. A completed OCRResult, successful or not, finishes the job.
+
+    At most OCR_JOB_MAX_QUEUED jobs wait at once; beyond that submissions are
+    rejected with OCRQueueFullError.
+    """
+
+    def __init__(self):
+        self.store: JobStore = create_job_store()
+        self._consumers: List[asyncio.Task] = []
+        self._retries: Set[asyncio.Task] = set()
+
+    async def submit(self, images: List[ocr_worker.ImageBuffer], priority: int = 5) -> Dict[str, Any]:
+        """
+        Queue images for OCR.
+
+        Args:
+            images: Image file bytes, one entry per screenshot
+            priority: 0 (highest) to 9 (lowest)
+
+        Returns:
+            The new job record
+
+        Raises:
+            OCRQueueFullError: If OCR_JOB_MAX_QUEUED jobs are already waiting
+        """
+        if await self.store.pending_count() >= settings.ocr_job_max_queued:
+            job_metrics.observe("rejected", 0.0, error=True)
+            raise OCRQueueFullError(settings.ocr_retry_after)
+
+        job = _new_job(uuid.uuid4().hex, priority, len(images))
+        await self.store.enqueue(job, images)
+        logger.info(f"Queued OCR job {job['id']} ({len(images)} image(s), priority {priority})")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job record, or None if unknown or expired."""
+        return await self.store.get(job_id)
+
+    async def events(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield the job record now and after every update, until it finishes.
+
+        The stored record is re-read whenever no update arrives for heartbeat
+        seconds, which also covers updates published before subscribing.
+
+        Args:
+            job_id: Job id
+            heartbeat: Seconds between re-reads
+
+        Yields:
+            Job records, or None after a quiet heartbeat interval
+        """
+        updates = self.store.subscribe(job_id)
+        next_update = asyncio.ensure_future(updates.__anext__())
+        try:
+            job = await self.store.get(job_id)
+            if job is None:
+                return
+            yield job
+
+            while job["status"] not in TERMINAL_STATUSES:
+                done, _ = await asyncio.wait({next_update}, timeout=heartbeat)
+                if done:
+                    latest = next_update.result()
+                    next_update = asyncio.ensure_future(updates.__anext__())
+                else:
+                    latest = await self.store.get(job_id)
+                    if latest is None:
+                        return
+
+                if latest != job:
+                    job = latest
+                    yield job
+                else:
+                    yield None
+        finally:
+            next_update.cancel()
+            try:
+                await next_update
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+            await updates.aclose()
+
+    def start(self, consumers: Optional[int] = None):
+        """
+        Start background consumers in this process.
+
+        Args:
+            consumers: Number of jobs processed at once (defaults to OCR_JOB_CONSUMERS)
+        """
+        count = settings.ocr_job_consumers if consumers is None else consumers
+        for i in range(count):
+            self._consumers.append(asyncio.create_task(self._consume(i)))
+        if count:
+            logger.info(f"Started {count} OCR job consumer(s)")
+
+    async def stop(self):
+        """Stop consumers and close the store."""
+        for task in self._consumers + list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._consumers, *self._retries, return_exceptions=True)
+        self._consumers.clear()
+        self._retries.clear()
+        await self.store.close()
+
+    async def _consume(self, index: int):
+        """Consumer loop: pop a job, process it, repeat."""
+        while True:
+            try:
+                job_id = await self.store.dequeue(timeout=5.0)
+                if job_id:
+                    await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"OCR job consumer {index} error: {e}")
+                await asyncio.sleep(1.0)
+
+    async def _run(self, job_id: str):
+        """Process one job, recording its timings."""
+        job = await self.store.get(job_id)
+        if job is None:
+            logger.warning(f"OCR job {job_id} expired before it ran")
+            return
+        if job["status"] in TERMINAL_STATUSES:
+            return
+
+        started = time.time()
+        attempts = job["attempts"] + 1
+        queue_wait = started - job["created_at"]
+        await self.store.update(job_id, status="running", attempts=attempts, started_at=started)
+
+        try:
+            images = await self.store.get_images(job_id)
+            start = time.perf_counter()
+            result = await asyncio.wait_for(
+                ocr_service.process_images(images),
+                timeout=settings.ocr_job_timeout
+            )
+            execution = time.perf_counter() - start
+        except Exception as e:
+            await self._retry_or_fail(job, attempts, e)
+            return
+
+        finished = time.time()
+        await self.store.update(
+            job_id,
+            status="succeeded" if result.success else "failed",
+            finished_at=finished,
+            queue_wait=queue_wait,
+            execution=execution,
+            result=result.model_dump(mode="json"),
+            error=None if result.success else "; ".join(result.validation_errors)
+        )
+        await self.store.discard_images(job_id)
+
+        job_metrics.observe("queue_wait", queue_wait)
+        job_metrics.observe("execution", execution, error=not result.success)
+        job_metrics.observe("total", finished - job["created_at"])
+        logger.info(f"OCR job {job_id} finished in {execution:.2f}s after {queue_wait:.2f}s queued")
+
+    async def _retry_or_fail(self, job: Dict[str, Any], attempts: int, error: Exception):
+        """Requeue a job after a raised error, or fail it once out of attempts."""
+        job_id = job["id"]
+        message = "OCR timed out" if isinstance(error, asyncio.TimeoutError) else str(error)
+
+        # A full OCR queue is back-pressure, not a failure of this job
+        if isinstance(error, OCRQueueFullError):
+            attempts -= 1
+            delay = float(error.retry_after)
+        else:
+            delay = settings.ocr_job_retry_backoff * attempts
+
+        # The timed-out OCR is still running and can't be cancelled; don't start another
+        if attempts >= settings.ocr_job_max_attempts or isinstance(error, asyncio.TimeoutError):
+            await self.store.update(job_id, status="failed", attempts=attempts, finished_at=time.time(), error=message)
+            await self.store.discard_images(job_id)
+            job_metrics.observe("execution", 0.0, error=True)
+            logger.error(f"OCR job {job_id} failed after {attempts} attempt(s): {message}")
+            return
+
+        await self.store.update(job_id, status="queued", attempts=attempts, error=message)
+        logger.warning(f"OCR job {job_id} attempt {attempts} failed ({message}), retrying in {delay:.1f}s")
+
+        async def requeue_later():
+            await asyncio.sleep(delay)
+            await self.store.requeue(job_id, job["priority"])
+
+        task = asyncio.create_task(requeue_later())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+
+# Global OCR job service instance
+ocr_jobs = OCRJobService()
+
+
+async def run_worker():
+    """Run a standalone job worker until interrupted."""
+    from services.data_cache import cache_manager
+    from services.fpl_api import fpl_client
+
+    await cache_manager.connect()
+    await fpl_client.initialize()
+    await ocr_service.warm_up()
+    ocr_jobs.start(max(settings.ocr_job_consumers, 1))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await ocr_jobs.stop()
+        ocr_service.shutdown()
+        await fpl_client.close()
+        await cache_manager.disconnect()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    asyncio.run(run_worker())
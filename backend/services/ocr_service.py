@@ -1,88 +1,173 @@
 """
 OCR Service - Extract FPL team information from screenshots
 """
+import asyncio
 import logging
-from typing import List, Tuple, Optional
-from pathlib import Path
-import cv2
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Tuple, Optional, Dict, Any
 import numpy as np
-from PIL import Image
-import io
+from rapidfuzz import fuzz, process
 
 from config import settings
 from models.fpl_models import OCRResult, FPLPlayer
+from services import ocr_worker
+from services.data_cache import cache_manager
 from services.fpl_api import fpl_client
+from utils.metrics import get_recorder
 
 logger = logging.getLogger(__name__)
 
+ocr_metrics = get_recorder("ocr")
+
+
+class OCRQueueFullError(Exception):
+    """Raised when the OCR queue is at capacity; retry after the given number of seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"OCR queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
 
 class OCRService:
-    """Service for extracting team information from screenshots using OCR."""
+    """
+    Service for extracting team information from screenshots using OCR.
+
+    Decoding, preprocessing and text extraction run in a dedicated process pool
+    whose workers each hold a warmed reader, so OCR never blocks the event loop.
+    With OCR_WORKERS=0 they run on a thread using an in-process reader instead.
+    Work beyond the pool size waits in a bounded queue; past that, requests are
+    rejected with OCRQueueFullError.
+
+    Nothing heavy happens at construction: the pool and reader are created on
+    first use, or ahead of time by warm_up().
+
+    Results are cached by a SHA-256 of the uploaded file, so re-uploads of the
+    same screenshot skip OCR: an in-memory LRU in front of Redis, which shares
+    results between instances. Only identical files match; screenshots of
+    different squads in the same layout look alike to any small perceptual
+    hash, so near-duplicates are never reused.
+    """
     
     def __init__(self):
         self.engine = settings.ocr_engine
         self.confidence_threshold = settings.ocr_confidence_threshold
+        self.languages = settings.ocr_languages.split(",")
         self.reader = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inline_executor: Optional[ThreadPoolExecutor] = None
+        self._reader_lock = threading.Lock()
+        self._reader_loaded = False
+        self._pending = 0
+        self.state = "cold"  # cold, warming, ready or failed
+        self._result_cache: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+        self.options = ocr_worker.OCROptions(
+            confidence_threshold=self.confidence_threshold,
+            layout_detection=settings.ocr_layout_detection,
+            text_height=settings.ocr_text_height,
+            min_plates=settings.ocr_min_plates,
+            preprocess_mode=settings.ocr_preprocess_mode,
+            max_dimension=settings.ocr_max_dimension
+        )
         
-        # Initialize OCR engine
-        if self.engine == "easyocr":
-            self._init_easyocr()
-        elif self.engine == "tesseract":
-            self._init_tesseract()
-        else:
+        if self.engine not in ("easyocr", "tesseract"):
             raise ValueError(f"Unknown OCR engine: {self.engine}")
-    
-    def _init_easyocr(self):
-        """Initialize EasyOCR reader."""
-        try:
-            import easyocr
-            languages = settings.ocr_languages.split(",")
-            self.reader = easyocr.Reader(languages, gpu=False)
-            logger.info(f"EasyOCR initialized with languages: {languages}")
-        except Exception as e:
-            logger.error(f"Failed to initialize EasyOCR: {e}")
-            raise
-    
-    def _init_tesseract(self):
-        """Initialize Tesseract OCR."""
+        if self.options.preprocess_mode not in ocr_worker.PREPROCESS_MODES:
+            raise ValueError(f"Unknown OCR preprocess mode: {self.options.preprocess_mode}")
+
+    @property
+    def ready(self) -> bool:
+        """Whether the OCR engine is warmed and requests won't pay startup cost."""
+        return self.state == "ready"
+
+    @property
+    def capacity(self) -> int:
+        """Maximum requests running or waiting at once."""
+        return max(settings.ocr_workers, 1) + settings.ocr_queue_size
+
+    def _get_reader(self):
+        """In-process reader for inline mode, created on first use."""
+        with self._reader_lock:
+            if not self._reader_loaded:
+                self.reader = ocr_worker.create_reader(self.engine, self.languages)
+                self._reader_loaded = True
+                self.state = "ready"
+        return self.reader
+
+    def _get_executor(self):
+        """The process pool, or the single inline thread when OCR_WORKERS=0."""
+        if settings.ocr_workers > 0:
+            if self._pool is None:
+                self._pool = self._create_pool()
+            return self._pool
+        if self._inline_executor is None:
+            # One thread, since a reader must not be shared between threads
+            self._inline_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+        return self._inline_executor
+
+    async def warm_up(self):
+        """
+        Start the OCR engine ahead of the first request.
+        Spawns every pool worker (each loads its reader) or loads the inline reader.
+        """
+        if self.state in ("warming", "ready"):
+            return
+
+        self.state = "warming"
+        start = time.perf_counter()
         try:
-            import pytesseract
-            # Test if tesseract is available
-            pytesseract.get_tesseract_version()
-            logger.info("Tesseract OCR initialized")
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            if settings.ocr_workers > 0:
+                await asyncio.gather(*(
+                    loop.run_in_executor(executor, ocr_worker.ping) for _ in range(settings.ocr_workers)
+                ))
+                self.state = "ready"
+            else:
+                await loop.run_in_executor(executor, self._get_reader)
+            logger.info(f"OCR engine warmed in {time.perf_counter() - start:.1f}s")
         except Exception as e:
-            logger.error(f"Failed to initialize Tesseract: {e}")
-            raise
+            self.state = "failed"
+            logger.error(f"OCR warm-up failed: {e}")
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        """Process pool whose workers each initialize their own reader."""
+        return ProcessPoolExecutor(
+            max_workers=settings.ocr_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=ocr_worker.init_worker,
+            initargs=(self.engine, self.languages, self.options)
+        )
+
+    def shutdown(self):
+        """Stop the OCR worker processes."""
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self.state = "cold"
+            logger.info("OCR worker pool shut down")
+        if self._inline_executor:
+            self._inline_executor.shutdown(wait=False, cancel_futures=True)
+            self._inline_executor = None
     
-    def preprocess_image(self, image: np.ndarray) -> np.ndarray:
+    def preprocess_image(self, image: np.ndarray, mode: Optional[str] = None) -> np.ndarray:
         """
         Preprocess image for better OCR results.
         
         Args:
             image: Input image as numpy array
+            mode: fast, balanced, accurate or auto (defaults to OCR_PREPROCESS_MODE)
             
         Returns:
             Preprocessed image
         """
-        # Convert to grayscale
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-        
-        # Increase contrast
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
-        
-        # Denoise
-        denoised = cv2.fastNlMeansDenoising(enhanced)
-        
-        # Threshold
-        _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        return binary
+        return ocr_worker.preprocess_image(image, mode or self.options.preprocess_mode)
     
-    def extract_text_easyocr(self, image: np.ndarray) -> List[Tuple[str, float]]:
+    def extract_text_easyocr(self, image: np.ndarray) -> List[ocr_worker.Detection]:
         """
         Extract text using EasyOCR.
         
@@ -90,20 +175,11 @@ class OCRService:
             image: Input image
             
         Returns:
-            List of (text, confidence) tuples
+            List of (text, confidence, position) tuples
         """
-        results = self.reader.readtext(image)
-        
-        # Filter by confidence and extract text
-        extracted = []
-        for bbox, text, confidence in results:
-            if confidence >= self.confidence_threshold:
-                extracted.append((text.strip(), confidence))
-                logger.debug(f"Detected: '{text}' (confidence: {confidence:.2f})")
-        
-        return extracted
+        return ocr_worker.extract_text_easyocr(self._get_reader(), image, self.confidence_threshold)
     
-    def extract_text_tesseract(self, image: np.ndarray) -> List[Tuple[str, float]]:
+    def extract_text_tesseract(self, image: np.ndarray) -> List[ocr_worker.Detection]:
         """
         Extract text using Tesseract.
         
@@ -111,28 +187,67 @@ class OCRService:
             image: Input image
             
         Returns:
-            List of (text, confidence) tuples
+            List of (text, confidence, position) tuples
         """
-        import pytesseract
-        from pytesseract import Output
-        
-        # Get detailed data
-        data = pytesseract.image_to_data(image, output_type=Output.DICT)
-        
-        extracted = []
-        n_boxes = len(data['text'])
-        
-        for i in range(n_boxes):
-            confidence = float(data['conf'][i])
-            text = data['text'][i].strip()
-            
-            if confidence >= self.confidence_threshold * 100 and text:
-                extracted.append((text, confidence / 100.0))
-                logger.debug(f"Detected: '{text}' (confidence: {confidence:.2f})")
-        
+        return ocr_worker.extract_text_tesseract(image, self.confidence_threshold)
+
+    def _release(self):
+        """Free a queue slot once its OCR work has finished."""
+        self._pending -= 1
+
+    def _restart_pool(self):
+        """Drop a crashed worker pool; the next task creates a new one."""
+        logger.error("OCR worker pool crashed, restarting it")
+        self._pool = None
+        self.state = "cold"
+
+    async def _extract_text(self, images: List[ocr_worker.ImageBuffer]) -> List[List[ocr_worker.Detection]]:
+        """
+        Run OCR for a batch of images off the event loop as one task,
+        recording queue wait and execution time.
+
+        Raises:
+            OCRQueueFullError: If the queue is at capacity
+        """
+        if self._pending >= self.capacity:
+            ocr_metrics.observe("rejected", 0.0, error=True)
+            raise OCRQueueFullError(settings.ocr_retry_after)
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if settings.ocr_workers > 0:
+            task, args = ocr_worker.run_ocr, (images,)
+        else:
+            def run_inline():
+                reader = self._get_reader()
+                start = time.perf_counter()
+                text = ocr_worker.extract_text(images, self.engine, reader, self.options)
+                return text, time.perf_counter() - start
+            task, args = run_inline, ()
+
+        submitted = time.perf_counter()
+        try:
+            future = executor.submit(task, *args)
+        except BrokenProcessPool:
+            self._restart_pool()
+            raise
+        # The slot is freed when the work itself finishes, not when the caller stops
+        # waiting: a caller that gives up (e.g. a job timeout) can't cancel running OCR
+        self._pending += 1
+        future.add_done_callback(lambda _: loop.is_closed() or loop.call_soon_threadsafe(self._release))
+        try:
+            extracted, execution = await asyncio.wrap_future(future)
+            self.state = "ready"
+        except BrokenProcessPool:
+            self._restart_pool()
+            raise
+
+        total = time.perf_counter() - submitted
+        ocr_metrics.observe("queue_wait", max(total - execution, 0.0))
+        ocr_metrics.observe("execution", execution)
         return extracted
     
-    async def process_image(self, image_bytes: bytes) -> OCRResult:
+    async def process_image(self, image_bytes: ocr_worker.ImageBuffer) -> OCRResult:
         """
         Process an FPL team screenshot and extract player names.
         
@@ -141,39 +256,64 @@ class OCRService:
             
         Returns:
             OCRResult with detected players and validation
+
+        Raises:
+            OCRQueueFullError: If the OCR queue is at capacity
+            BrokenProcessPool: If an OCR worker process died
+        """
+        return await self.process_images([image_bytes])
+
+    async def process_images(self, images: List[ocr_worker.ImageBuffer]) -> OCRResult:
+        """
+        Process one or more screenshots of the same squad (e.g. pitch view plus bench).
+
+        Text detection runs over all images in one batched model call, detected
+        names are merged and de-duplicated, and the squad is resolved once.
+
+        Args:
+            images: Image file bytes, one entry per screenshot
+
+        Returns:
+            OCRResult with detected players and validation
+
+        Raises:
+            OCRQueueFullError: If the OCR queue is at capacity
+            BrokenProcessPool: If an OCR worker process died
         """
         try:
-            # Load image
-            image = Image.open(io.BytesIO(image_bytes))
-            image_np = np.array(image)
-            
-            # Preprocess
-            preprocessed = self.preprocess_image(image_np)
-            
-            # Extract text
-            if self.engine == "easyocr":
-                extracted_text = self.extract_text_easyocr(preprocessed)
+            hashes = await self._hash_images(images)
+            cached = await self._get_cached_result(hashes) if hashes else None
+
+            if cached:
+                player_names = [(name, conf, tuple(position)) for name, conf, position in cached["names"]]
+                matched_players, unmatched, positions = await self._revalidate_cached(cached, player_names)
             else:
-                extracted_text = self.extract_text_tesseract(preprocessed)
-            
-            logger.info(f"Extracted {len(extracted_text)} text items from image")
-            
-            # Filter for player names (heuristics)
-            player_names = self._filter_player_names(extracted_text)
-            
-            # Match to FPL database
-            matched_players, unmatched = await self._match_players(player_names)
+                extracted_batches = await self._extract_text(images)
+                
+                logger.info(f"Extracted {sum(len(e) for e in extracted_batches)} text items "
+                            f"from {len(images)} image(s)")
+                
+                # Filter for player names (heuristics), merging duplicates across screenshots
+                player_names = self._merge_player_names([
+                    self._filter_player_names(extracted_text) for extracted_text in extracted_batches
+                ])
+                
+                # Match to FPL database
+                matched_players, unmatched, positions = await self._match_players(player_names)
+
+                if hashes:
+                    await self._cache_result(hashes, player_names, matched_players, unmatched, positions)
             
             # Validate team
             is_valid, errors = self._validate_team(matched_players)
             
-            # Detect formation
-            formation = self._detect_formation(matched_players)
+            # Detect formation from where the names sit on the pitch
+            formation = self._detect_formation(matched_players, positions)
             
             result = OCRResult(
                 success=len(matched_players) > 0,
-                players_detected=[name for name, _ in player_names],
-                confidence_scores=[conf for _, conf in player_names],
+                players_detected=[name for name, _, _ in player_names],
+                confidence_scores=[conf for _, conf, _ in player_names],
                 matched_players=matched_players,
                 unmatched_names=unmatched,
                 is_valid_team=is_valid,
@@ -185,26 +325,133 @@ class OCRService:
             
             return result
             
+        except (OCRQueueFullError, BrokenProcessPool):
+            # Capacity and worker crashes aren't about the image; callers may retry
+            raise
         except Exception as e:
             logger.error(f"Error processing image: {e}")
             return OCRResult(
                 success=False,
                 validation_errors=[f"Image processing failed: {str(e)}"]
             )
+
+    async def _hash_images(self, images: List[ocr_worker.ImageBuffer]) -> Optional[Tuple[str, ...]]:
+        """File digests of the images, or None if caching is off."""
+        if settings.ocr_cache_size <= 0:
+            return None
+        return tuple(await asyncio.gather(*(asyncio.to_thread(ocr_worker.image_digest, image) for image in images)))
+
+    def _cache_key(self, hashes: Tuple[str, ...]) -> str:
+        """Redis key for an exact set of image digests."""
+        return f"ocr:{self.engine}:" + "-".join(hashes)
+
+    async def _get_cached_result(self, hashes: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a previous result for exactly these images.
+
+        Args:
+            hashes: File digest per image
+
+        Returns:
+            Cached payload or None
+        """
+        start = time.perf_counter()
+        payload = self._result_cache.get(hashes)
+        if payload is None:
+            payload = await cache_manager.get(self._cache_key(hashes))
+
+        if payload is None:
+            ocr_metrics.observe("cache_miss", time.perf_counter() - start)
+            return None
+
+        self._store_l1(hashes, payload)
+        ocr_metrics.observe("cache_hit", time.perf_counter() - start)
+        logger.info(f"OCR cache hit for {len(hashes)} image(s)")
+        return payload
+
+    def _store_l1(self, hashes: Tuple[str, ...], payload: Dict[str, Any]):
+        """Insert or refresh an entry in the in-memory LRU."""
+        self._result_cache[hashes] = payload
+        self._result_cache.move_to_end(hashes)
+        while len(self._result_cache) > settings.ocr_cache_size:
+            self._result_cache.popitem(last=False)
+
+    async def _cache_result(
+        self,
+        hashes: Tuple[str, ...],
+        player_names: List[ocr_worker.Detection],
+        matched_players: List[FPLPlayer],
+        unmatched: List[str],
+        positions: Dict[int, Tuple[float, float]]
+    ):
+        """Store the extracted names and matched ids for these images."""
+        payload = {
+            "names": [[name, conf, list(position)] for name, conf, position in player_names],
+            "matched_ids": [player.id for player in matched_players],
+            "unmatched": unmatched,
+            "positions": {str(player_id): list(position) for player_id, position in positions.items()},
+        }
+        self._store_l1(hashes, payload)
+        await cache_manager.set(self._cache_key(hashes), payload, ttl=settings.ocr_cache_ttl)
+
+    async def _revalidate_cached(
+        self,
+        cached: Dict[str, Any],
+        player_names: List[ocr_worker.Detection]
+    ) -> Tuple[List[FPLPlayer], List[str], Dict[int, Tuple[float, float]]]:
+        """
+        Rebuild matches for a cached result from the current player snapshot.
+
+        Matched ids are resolved against current player data (prices, status);
+        if any id no longer exists the cached names are matched again.
+
+        Returns:
+            Tuple of (matched_players, unmatched_names, position by player id)
+        """
+        players_by_id = {player["id"]: player for player in await fpl_client.get_players()}
+        if not all(player_id in players_by_id for player_id in cached["matched_ids"]):
+            logger.info("Cached OCR matches are stale, re-matching cached names")
+            return await self._match_players(player_names)
+
+        matched = [FPLPlayer(**players_by_id[player_id]) for player_id in cached["matched_ids"]]
+        positions = {int(player_id): tuple(position) for player_id, position in cached["positions"].items()}
+        return matched, list(cached["unmatched"]), positions
+
+    def _merge_player_names(self, batches: List[List[ocr_worker.Detection]]) -> List[ocr_worker.Detection]:
+        """
+        Merge candidate names from several screenshots, keeping the best confidence per name.
+        The position from the first screenshot a name appears in is kept, so the
+        pitch view should come first.
+
+        Args:
+            batches: Filtered (name, confidence, position) lists, one per image
+
+        Returns:
+            De-duplicated (name, confidence, position) list in first-seen order
+        """
+        merged: Dict[str, ocr_worker.Detection] = {}
+        for batch in batches:
+            for name, confidence, position in batch:
+                key = name.casefold()
+                if key not in merged:
+                    merged[key] = (name, confidence, position)
+                elif confidence > merged[key][1]:
+                    merged[key] = (merged[key][0], confidence, merged[key][2])
+        return list(merged.values())
     
-    def _filter_player_names(self, extracted_text: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+    def _filter_player_names(self, extracted_text: List[ocr_worker.Detection]) -> List[ocr_worker.Detection]:
         """
         Filter extracted text to likely player names.
         
         Args:
-            extracted_text: List of (text, confidence) tuples
+            extracted_text: List of (text, confidence, position) tuples
             
         Returns:
             Filtered list of likely player names
         """
         player_names = []
         
-        for text, confidence in extracted_text:
+        for text, confidence, position in extracted_text:
             # Skip very short text
             if len(text) < 3:
                 continue
@@ -221,34 +468,72 @@ class OCRService:
             
             # Likely a player name if it's capitalized and alphabetic
             if text[0].isupper() and any(c.isalpha() for c in text):
-                player_names.append((text, confidence))
+                player_names.append((text, confidence, position))
         
         return player_names
     
-    async def _match_players(self, player_names: List[Tuple[str, float]]) -> Tuple[List[FPLPlayer], List[str]]:
+    def _build_name_index(self, players: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Build lookup tables for name matching.
+
+        Args:
+            players: Player dictionaries
+
+        Returns:
+            Tuple of (exact index by lowercased web/full name, fuzzy candidates by web_name)
+        """
+        exact: Dict[str, Dict[str, Any]] = {}
+        by_web_name: Dict[str, Dict[str, Any]] = {}
+        for player in players:
+            web_name = player.get("web_name", "")
+            full_name = f"{player.get('first_name', '')} {player.get('second_name', '')}".strip()
+            exact.setdefault(web_name.lower(), player)
+            exact.setdefault(full_name.lower(), player)
+            by_web_name[web_name] = player
+        return exact, by_web_name
+
+    async def _match_players(
+        self,
+        player_names: List[ocr_worker.Detection]
+    ) -> Tuple[List[FPLPlayer], List[str], Dict[int, Tuple[float, float]]]:
         """
         Match extracted names to FPL database.
+        The player list is fetched and indexed once for the whole squad.
         
         Args:
-            player_names: List of (name, confidence) tuples
+            player_names: List of (name, confidence, position) tuples
             
         Returns:
-            Tuple of (matched_players, unmatched_names)
+            Tuple of (matched_players, unmatched_names, position by player id)
         """
         matched = []
         unmatched = []
+        positions: Dict[int, Tuple[float, float]] = {}
+
+        exact, by_web_name = self._build_name_index(await fpl_client.get_players())
         
-        for name, confidence in player_names:
-            player = await fpl_client.get_player_by_name(name, fuzzy=True)
+        for name, confidence, position in player_names:
+            player = exact.get(name.lower())
+            if player is None:
+                match = process.extractOne(
+                    name,
+                    by_web_name.keys(),
+                    scorer=fuzz.ratio,
+                    score_cutoff=settings.fuzzy_match_threshold
+                )
+                if match:
+                    player = by_web_name[match[0]]
             
             if player:
-                matched.append(FPLPlayer(**player))
+                if player["id"] not in positions:
+                    positions[player["id"]] = position
+                    matched.append(FPLPlayer(**player))
                 logger.info(f"Matched '{name}' to {player['web_name']}")
             else:
                 unmatched.append(name)
                 logger.warning(f"Could not match player: {name}")
         
-        return matched, unmatched
+        return matched, unmatched, positions
     
     def _validate_team(self, players: List[FPLPlayer]) -> Tuple[bool, List[str]]:
         """
@@ -292,20 +577,74 @@ class OCRService:
         is_valid = len(errors) == 0
         return is_valid, errors
     
-    def _detect_formation(self, players: List[FPLPlayer]) -> Optional[str]:
+    def _group_rows(self, players: List[FPLPlayer], positions: Dict[int, Tuple[float, float]]) -> List[List[FPLPlayer]]:
+        """
+        Group players into pitch rows by the vertical position of their names.
+
+        Args:
+            players: Matched players
+            positions: Normalized (x, y) name positions by player id
+
+        Returns:
+            Rows from the top of the screenshot down, each sorted left to right
+        """
+        placed = sorted(
+            (p for p in players if p.id in positions),
+            key=lambda p: positions[p.id][1]
+        )
+
+        rows: List[List[FPLPlayer]] = []
+        last_y = None
+        for player in placed:
+            y = positions[player.id][1]
+            if last_y is None or y - last_y > 0.04:
+                rows.append([])
+            rows[-1].append(player)
+            last_y = y
+
+        return [sorted(row, key=lambda p: positions[p.id][0]) for row in rows]
+
+    def _detect_formation(
+        self,
+        players: List[FPLPlayer],
+        positions: Optional[Dict[int, Tuple[float, float]]] = None
+    ) -> Optional[str]:
         """
         Detect the formation from the starting 11.
-        This is a simplified version - in reality, we'd need to detect which players are on the pitch.
+
+        Names are grouped into rows by their position on the pitch view; the
+        bottom row is the bench when all five rows are present. The formation
+        is read from the positions of the starters, or from the outfield row
+        sizes when not every starter was matched.
         
         Args:
             players: List of matched players
+            positions: Normalized (x, y) name positions by player id
             
         Returns:
             Formation string (e.g., "3-4-3") or None
         """
-        # For now, just return a default formation
-        # In a full implementation, we'd analyze the image layout to determine which players are starting
-        return "3-4-3"
+        if not positions:
+            return None
+
+        rows = self._group_rows(players, positions)
+        if len(rows) >= 5:
+            rows = rows[:-1]  # Bench
+
+        starters = [player for row in rows for player in row]
+        if len(starters) == 11:
+            counts = {1: 0, 2: 0, 3: 0, 4: 0}
+            for player in starters:
+                counts[player.element_type] = counts.get(player.element_type, 0) + 1
+            if counts[1] == 1 and 3 <= counts[2] <= 5 and 2 <= counts[3] <= 5 and 1 <= counts[4] <= 3:
+                return f"{counts[2]}-{counts[3]}-{counts[4]}"
+
+        if len(rows) == 4 and len(rows[0]) == 1:
+            outfield = [len(row) for row in rows[1:]]
+            if sum(outfield) == 10:
+                return "-".join(str(size) for size in outfield)
+
+        return None
 
 
 # Global OCR service instance
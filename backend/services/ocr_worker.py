@@ -0,0 +1,688 @@
+"""
+OCR worker - CPU-bound image processing that runs outside the event loop.
+
+Functions here are executed in OCR pool processes, each of which holds its own
+warmed reader, or in a thread when the pool is disabled.
+
+Before OCR, a layout stage looks for the player name plates on the pitch view
+and only those crops are recognized. Each detection carries the normalized
+(x, y) centre of its text so callers can reason about the pitch layout.
+"""
+import hashlib
+import io
+import logging
+import time
+from dataclasses import dataclass
+from typing import List, Tuple, Optional, Dict, Any, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# (text, confidence, (x, y) centre normalized to the image size)
+Detection = Tuple[str, float, Tuple[float, float]]
+
+PREPROCESS_MODES = ("fast", "balanced", "accurate", "auto")
+
+# Encoded image data; bytearray lets uploads be read without an extra copy
+ImageBuffer = Union[bytes, bytearray]
+
+HEADER_PROBE_BYTES = 256 * 1024
+
+SQUAD_SIZE = 15
+
+# Name plate filters, as fractions
+PLATE_HEADER_BAND = 0.08  # Of image height; the app header (e.g. "Pick Team") lives above this
+PLATE_MIN_FILL = 0.7  # Of the box that is plate-coloured; closed-up white text on dark is far emptier
+PLATE_MAX_SURROUND = 0.5  # Of a ring around the box that is plate-coloured; more means a light background
+
+
+@dataclass(frozen=True)
+class OCROptions:
+    """Tuning passed from settings to wherever OCR runs."""
+    confidence_threshold: float = 0.6
+    layout_detection: bool = True
+    text_height: int = 48  # Plate crops are scaled to this height before recognition
+    min_plates: int = SQUAD_SIZE  # Fewer plates than this falls back to full-image OCR
+    preprocess_mode: str = "auto"  # fast, balanced, accurate, or auto to choose per image
+    max_dimension: int = 2000  # Images are reduced at decode time down to about this long side
+
+
+# Per-process engine state, set by init_worker
+_engine: Optional[str] = None
+_reader: Any = None
+_options = OCROptions()
+
+
+def create_reader(engine: str, languages: List[str]) -> Any:
+    """
+    Create the OCR engine.
+
+    Args:
+        engine: "easyocr" or "tesseract"
+        languages: Language codes for EasyOCR
+
+    Returns:
+        EasyOCR reader, or None for Tesseract (which has no reader object)
+    """
+    if engine == "easyocr":
+        try:
+            import easyocr
+            reader = easyocr.Reader(languages, gpu=False)
+            logger.info(f"EasyOCR initialized with languages: {languages}")
+            return reader
+        except Exception as e:
+            logger.error(f"Failed to initialize EasyOCR: {e}")
+            raise
+    elif engine == "tesseract":
+        try:
+            import pytesseract
+            # Test if tesseract is available
+            pytesseract.get_tesseract_version()
+            logger.info("Tesseract OCR initialized")
+            return None
+        except Exception as e:
+            logger.error(f"Failed to initialize Tesseract: {e}")
+            raise
+    else:
+        raise ValueError(f"Unknown OCR engine: {engine}")
+
+
+def init_worker(engine: str, languages: List[str], options: OCROptions):
+    """Pool initializer: warm this process's reader once."""
+    global _engine, _reader, _options
+    _engine = engine
+    _options = options
+    _reader = create_reader(engine, languages)
+
+
+def _to_gray(image: np.ndarray) -> np.ndarray:
+    """Grayscale view of a BGR or already single-channel image."""
+    if len(image.shape) == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def image_stats(image: np.ndarray) -> Dict[str, float]:
+    """
+    Cheap statistics used to choose a preprocessing mode.
+
+    Computed on a central crop of at most 512x512 pixels, so the cost is
+    negligible next to any denoising.
+
+    Args:
+        image: Input image as numpy array
+
+    Returns:
+        Dict with noise (estimated sigma), blockiness (JPEG 8x8 grid strength,
+        ~1.0 when absent) and width (original pixels)
+    """
+    gray = _to_gray(image)
+    height, width = gray.shape
+
+    # Crop offsets are multiples of 8 so the JPEG block grid stays aligned
+    top = max(0, (height - 512) // 2) // 8 * 8
+    left = max(0, (width - 512) // 2) // 8 * 8
+    sample = gray[top:top + 512, left:left + 512].astype(np.float32)
+
+    # Immerkaer's fast noise estimate: Laplacian-difference kernel over the image
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    h, w = sample.shape
+    response = np.abs(cv2.filter2D(sample, -1, kernel))[1:-1, 1:-1]
+    noise = float(response.sum() * np.sqrt(np.pi / 2) / (6 * max(w - 2, 1) * max(h - 2, 1)))
+
+    # Column steps across 8px block boundaries vs inside blocks; the offset keeps
+    # flat regions (no steps anywhere) near 1.0
+    diff = np.abs(np.diff(sample, axis=1))
+    if diff.shape[1] > 8:
+        on_grid = np.zeros(diff.shape[1], dtype=bool)
+        on_grid[7::8] = True
+        blockiness = float((diff[:, on_grid].mean() + 0.5) / (diff[:, ~on_grid].mean() + 0.5))
+    else:
+        blockiness = 1.0
+
+    return {"noise": noise, "blockiness": blockiness, "width": float(width)}
+
+
+def choose_preprocess_mode(image: np.ndarray) -> str:
+    """
+    Pick a preprocessing mode from image statistics.
+
+    Clean screenshots (PNG captures) need no denoising; mildly compressed or
+    noisy ones get a cheap blur; only very noisy, blocky or small images pay
+    for non-local means.
+
+    Args:
+        image: Input image as numpy array
+
+    Returns:
+        "fast", "balanced" or "accurate"
+    """
+    stats = image_stats(image)
+    if stats["noise"] > 6.0 or stats["blockiness"] > 1.8 or stats["width"] < 600:
+        return "accurate"
+    if stats["noise"] > 2.0 or stats["blockiness"] > 1.15:
+        return "balanced"
+    return "fast"
+
+
+def preprocess_image(image: np.ndarray, mode: str = "accurate") -> np.ndarray:
+    """
+    Preprocess image for better OCR results.
+
+    Modes:
+        fast: grayscale and Otsu threshold
+        balanced: adds CLAHE and a 3x3 median blur
+        accurate: CLAHE, non-local means denoising and, for small images, 2x upscaling
+        auto: one of the above chosen by choose_preprocess_mode
+
+    Args:
+        image: Input image as numpy array
+        mode: Preprocessing mode
+
+    Returns:
+        Preprocessed image
+    """
+    if mode == "auto":
+        mode = choose_preprocess_mode(image)
+
+    # Convert to grayscale
+    gray = _to_gray(image)
+
+    if mode != "fast":
+        # Increase contrast
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        gray = clahe.apply(gray)
+
+    if mode == "balanced":
+        gray = cv2.medianBlur(gray, 3)
+    elif mode == "accurate":
+        if gray.shape[1] < 600:
+            gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+        gray = cv2.fastNlMeansDenoising(gray)
+
+    # Threshold
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    return binary
+
+
+def _bbox_centre(bbox: Any, width: int, height: int) -> Tuple[float, float]:
+    """Normalized centre of an EasyOCR quadrilateral."""
+    xs = [point[0] for point in bbox]
+    ys = [point[1] for point in bbox]
+    return ((min(xs) + max(xs)) / 2 / width, (min(ys) + max(ys)) / 2 / height)
+
+
+def find_name_plates(image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """
+    Locate player name plates on an FPL pitch view.
+
+    Plates are the light, unsaturated rectangles under each shirt. They are
+    segmented by colour, then kept by shape and size relative to the image,
+    which drops the pitch, shirts and most ad graphics. Candidates in the
+    header band, white text on a dark bar (mostly empty once the text is
+    closed up) and boxes on a light background are dropped too. Plates on a
+    light background, e.g. a light-theme bench, can't be separated from it
+    by colour, so callers should not expect every plate to be found.
+
+    Args:
+        image: BGR (or grayscale) image as numpy array
+
+    Returns:
+        Bounding boxes (x, y, w, h), sorted top to bottom then left to right
+    """
+    height, width = image.shape[:2]
+
+    if len(image.shape) == 3:
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, (0, 0, 190), (180, 60, 255))
+    else:
+        _, mask = cv2.threshold(image, 190, 255, cv2.THRESH_BINARY)
+    light = mask > 0
+
+    # Close the holes left by the dark name text so each plate is one blob
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, width // 200), 3))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    plates = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not (2.0 <= w / h <= 10.0):
+            continue
+        if not (0.04 * width <= w <= 0.3 * width and 0.01 * height <= h <= 0.08 * height):
+            continue
+        # Plates are solid rectangles; ragged blobs are graphics or text
+        if cv2.contourArea(contour) < 0.6 * w * h:
+            continue
+        if y + h / 2 < PLATE_HEADER_BAND * height:
+            continue
+        inside = int(light[y:y + h, x:x + w].sum())
+        if inside < PLATE_MIN_FILL * w * h:
+            continue
+        pad = max(2, h // 2)
+        x0, y0, x1, y1 = max(0, x - pad), max(0, y - pad), min(width, x + w + pad), min(height, y + h + pad)
+        surround = (int(light[y0:y1, x0:x1].sum()) - inside) / max(1, (x1 - x0) * (y1 - y0) - w * h)
+        if surround > PLATE_MAX_SURROUND:
+            continue
+        plates.append((x, y, w, h))
+
+    row_height = max(1, height // 50)
+    plates.sort(key=lambda box: (box[1] // row_height, box[0]))
+    return plates
+
+
+def crop_plate(
+    image: np.ndarray,
+    box: Tuple[int, int, int, int],
+    text_height: int,
+    mode: str = "fast"
+) -> np.ndarray:
+    """
+    Cut out one plate and scale it so the text line is text_height pixels tall.
+
+    Args:
+        image: Source image
+        box: Plate bounding box (x, y, w, h)
+        text_height: Target height in pixels
+        mode: Preprocessing mode chosen for the source image
+
+    Returns:
+        Binarized crop
+    """
+    x, y, w, h = box
+    crop = image[y:y + h, x:x + w]
+    if len(crop.shape) == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+
+    scale = text_height / h
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    crop = cv2.resize(crop, (max(1, round(w * scale)), text_height), interpolation=interpolation)
+
+    # Plates are already high contrast, so only the denoising step of each mode applies
+    if mode == "balanced":
+        crop = cv2.medianBlur(crop, 3)
+    elif mode == "accurate":
+        crop = cv2.fastNlMeansDenoising(crop)
+
+    _, binary = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def recognize_plates_easyocr(
+    reader: Any,
+    crops: List[np.ndarray],
+    confidence_threshold: float
+) -> List[Optional[Tuple[str, float]]]:
+    """
+    Recognize plate crops with one EasyOCR recognizer call, skipping text detection.
+
+    The crops are stacked on one canvas and passed as known text boxes.
+
+    Args:
+        reader: EasyOCR reader
+        crops: Single-line crops, all the same height
+        confidence_threshold: Minimum confidence to keep a detection
+
+    Returns:
+        (text, confidence) per crop, or None where nothing was kept
+    """
+    gap = 8
+    width = max(crop.shape[1] for crop in crops)
+    canvas = np.full(
+        (sum(crop.shape[0] + gap for crop in crops), width), 255, dtype=np.uint8
+    )
+
+    boxes = []
+    top = 0
+    for crop in crops:
+        h, w = crop.shape
+        canvas[top:top + h, :w] = crop
+        boxes.append([0, w, top, top + h])
+        top += h + gap
+
+    results = reader.recognize(
+        canvas, horizontal_list=boxes, free_list=[], batch_size=len(crops)
+    )
+
+    # Map results back to crops by their top edge
+    index_by_top = {box[2]: i for i, box in enumerate(boxes)}
+    recognized: List[Optional[Tuple[str, float]]] = [None] * len(crops)
+    for bbox, text, confidence in results:
+        i = index_by_top.get(int(min(point[1] for point in bbox)))
+        if i is not None and confidence >= confidence_threshold and text.strip():
+            recognized[i] = (text.strip(), confidence)
+    return recognized
+
+
+def recognize_plates_tesseract(
+    crops: List[np.ndarray],
+    confidence_threshold: float
+) -> List[Optional[Tuple[str, float]]]:
+    """
+    Recognize plate crops with Tesseract in single-line mode.
+
+    Args:
+        crops: Single-line crops
+        confidence_threshold: Minimum confidence to keep a detection
+
+    Returns:
+        (text, confidence) per crop, or None where nothing was kept
+    """
+    import pytesseract
+    from pytesseract import Output
+
+    recognized: List[Optional[Tuple[str, float]]] = []
+    for crop in crops:
+        data = pytesseract.image_to_data(crop, config="--psm 7", output_type=Output.DICT)
+        words = [
+            (text.strip(), float(conf))
+            for text, conf in zip(data['text'], data['conf'])
+            if text.strip() and float(conf) >= 0
+        ]
+        confidence = sum(conf for _, conf in words) / len(words) / 100.0 if words else 0.0
+        if words and confidence >= confidence_threshold:
+            recognized.append((" ".join(text for text, _ in words), confidence))
+        else:
+            recognized.append(None)
+    return recognized
+
+
+def extract_text_easyocr(reader: Any, image: np.ndarray, confidence_threshold: float) -> List[Detection]:
+    """
+    Extract text using EasyOCR.
+
+    Args:
+        reader: EasyOCR reader
+        image: Input image
+        confidence_threshold: Minimum confidence to keep a detection
+
+    Returns:
+        List of (text, confidence, position) tuples
+    """
+    height, width = image.shape[:2]
+    results = reader.readtext(image)
+
+    # Filter by confidence and extract text
+    extracted = []
+    for bbox, text, confidence in results:
+        if confidence >= confidence_threshold:
+            extracted.append((text.strip(), confidence, _bbox_centre(bbox, width, height)))
+            logger.debug(f"Detected: '{text}' (confidence: {confidence:.2f})")
+
+    return extracted
+
+
+def extract_text_tesseract(image: np.ndarray, confidence_threshold: float) -> List[Detection]:
+    """
+    Extract text using Tesseract.
+
+    Args:
+        image: Input image
+        confidence_threshold: Minimum confidence to keep a detection
+
+    Returns:
+        List of (text, confidence, position) tuples
+    """
+    import pytesseract
+    from pytesseract import Output
+
+    # Get detailed data
+    data = pytesseract.image_to_data(image, output_type=Output.DICT)
+
+    height, width = image.shape[:2]
+    extracted = []
+    n_boxes = len(data['text'])
+
+    for i in range(n_boxes):
+        confidence = float(data['conf'][i])
+        text = data['text'][i].strip()
+
+        if confidence >= confidence_threshold * 100 and text:
+            position = (
+                (data['left'][i] + data['width'][i] / 2) / width,
+                (data['top'][i] + data['height'][i] / 2) / height
+            )
+            extracted.append((text, confidence / 100.0, position))
+            logger.debug(f"Detected: '{text}' (confidence: {confidence:.2f})")
+
+    return extracted
+
+
+def extract_text_easyocr_batch(
+    reader: Any,
+    images: List[np.ndarray],
+    confidence_threshold: float
+) -> List[List[Detection]]:
+    """
+    Extract text from several images with one batched EasyOCR call.
+
+    Images are padded (not resized) onto a common canvas so the detector and
+    recognizer run over the whole batch at once.
+
+    Args:
+        reader: EasyOCR reader
+        images: Preprocessed single-channel images
+        confidence_threshold: Minimum confidence to keep a detection
+
+    Returns:
+        One list of (text, confidence, position) tuples per image
+    """
+    height = max(image.shape[0] for image in images)
+    width = max(image.shape[1] for image in images)
+
+    padded = []
+    for image in images:
+        background = int(np.bincount(image.ravel(), minlength=256).argmax())
+        canvas = np.full((height, width), background, dtype=image.dtype)
+        canvas[:image.shape[0], :image.shape[1]] = image
+        padded.append(canvas)
+
+    batch_results = reader.readtext_batched(padded, n_width=width, n_height=height)
+
+    # Padding is at the bottom/right, so boxes are still in each image's own coordinates
+    extracted = []
+    for image, results in zip(images, batch_results):
+        image_height, image_width = image.shape[:2]
+        extracted.append([
+            (text.strip(), confidence, _bbox_centre(bbox, image_width, image_height))
+            for bbox, text, confidence in results
+            if confidence >= confidence_threshold
+        ])
+    return extracted
+
+
+def probe_size(image_bytes: ImageBuffer) -> Optional[Tuple[int, int]]:
+    """
+    Read (width, height) from the image header without decoding pixels.
+
+    Only the first HEADER_PROBE_BYTES are parsed, which covers the JPEG SOF
+    marker after typical EXIF blocks.
+
+    Returns:
+        (width, height) or None if the header can't be read
+    """
+    try:
+        with Image.open(io.BytesIO(bytes(memoryview(image_bytes)[:HEADER_PROBE_BYTES]))) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def decode_flags(image_bytes: ImageBuffer, max_dimension: int) -> int:
+    """
+    cv2.imdecode flags that shrink the image by the largest power of two
+    keeping its long side at or above max_dimension.
+
+    JPEG decodes directly at the reduced size (DCT scaling), so full-size
+    pixels are never materialized; other formats are reduced right after
+    decoding.
+    """
+    size = probe_size(image_bytes) if max_dimension > 0 else None
+    if size:
+        long_side = max(size)
+        for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if long_side // factor >= max_dimension:
+                return flag
+    return cv2.IMREAD_COLOR
+
+
+def load_image(image_bytes: ImageBuffer, max_dimension: int = 0) -> np.ndarray:
+    """
+    Decode image file bytes to a BGR numpy array.
+
+    The buffer is wrapped, not copied, and decoded once by OpenCV.
+
+    Args:
+        image_bytes: Encoded image file bytes
+        max_dimension: Downscale at decode time while the long side stays >= this (0 keeps full size)
+
+    Returns:
+        BGR image
+
+    Raises:
+        ValueError: If the data isn't a decodable image
+    """
+    image = cv2.imdecode(
+        np.frombuffer(image_bytes, dtype=np.uint8),
+        decode_flags(image_bytes, max_dimension)
+    )
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+
+def extract_plates(
+    images: List[np.ndarray],
+    modes: List[str],
+    engine: str,
+    reader: Any,
+    options: OCROptions
+) -> List[Optional[List[Detection]]]:
+    """
+    Run the layout stage and recognize the name plates of every image that has enough of them.
+
+    Plates from all images go through a single recognizer call.
+
+    Returns:
+        Detections per image, or None for images that need full-image OCR
+    """
+    crops: List[np.ndarray] = []
+    owners: List[Tuple[int, Tuple[float, float]]] = []
+    found: List[bool] = []
+
+    for i, image in enumerate(images):
+        plates = find_name_plates(image)
+        if len(plates) < options.min_plates:
+            logger.debug(f"Found {len(plates)} name plates, falling back to full-image OCR")
+            found.append(False)
+            continue
+        found.append(True)
+        height, width = image.shape[:2]
+        for x, y, w, h in plates:
+            crops.append(crop_plate(image, (x, y, w, h), options.text_height, modes[i]))
+            owners.append((i, ((x + w / 2) / width, (y + h / 2) / height)))
+
+    if not crops:
+        return [None] * len(images)
+
+    if engine == "easyocr":
+        recognized = recognize_plates_easyocr(reader, crops, options.confidence_threshold)
+    else:
+        recognized = recognize_plates_tesseract(crops, options.confidence_threshold)
+
+    extracted: List[Optional[List[Detection]]] = [[] if has_plates else None for has_plates in found]
+    for (i, position), result in zip(owners, recognized):
+        if result:
+            text, confidence = result
+            extracted[i].append((text, confidence, position))
+    return extracted
+
+
+def extract_text(
+    images: List[ImageBuffer],
+    engine: str,
+    reader: Any,
+    options: OCROptions
+) -> List[List[Detection]]:
+    """
+    Decode and OCR a batch of images.
+
+    Name plates are recognized directly where the layout stage finds them;
+    remaining images are preprocessed and OCR'd in full. The preprocessing
+    mode is chosen per image when options.preprocess_mode is "auto".
+
+    Args:
+        images: Encoded image file bytes, one entry per screenshot
+        engine: "easyocr" or "tesseract"
+        reader: EasyOCR reader (ignored for Tesseract)
+        options: OCR tuning
+
+    Returns:
+        One list of (text, confidence, position) tuples per image
+    """
+    decoded = [load_image(image_bytes, options.max_dimension) for image_bytes in images]
+
+    if options.preprocess_mode == "auto":
+        modes = [choose_preprocess_mode(image) for image in decoded]
+        logger.debug(f"Preprocessing modes: {modes}")
+    else:
+        modes = [options.preprocess_mode] * len(decoded)
+
+    if options.layout_detection:
+        extracted = extract_plates(decoded, modes, engine, reader, options)
+    else:
+        extracted = [None] * len(decoded)
+
+    pending = [i for i, result in enumerate(extracted) if result is None]
+    if pending:
+        preprocessed = [preprocess_image(decoded[i], modes[i]) for i in pending]
+        if engine == "easyocr":
+            if len(preprocessed) == 1:
+                full = [extract_text_easyocr(reader, preprocessed[0], options.confidence_threshold)]
+            else:
+                full = extract_text_easyocr_batch(reader, preprocessed, options.confidence_threshold)
+        else:
+            full = [extract_text_tesseract(image, options.confidence_threshold) for image in preprocessed]
+        for i, result in zip(pending, full):
+            extracted[i] = result
+
+    return extracted
+
+
+def image_digest(image_bytes: ImageBuffer) -> str:
+    """
+    SHA-256 of an encoded image file.
+
+    The file bytes are hashed without decoding, so the lookup costs no
+    decode and no full-size pixel buffer ahead of OCR. Re-uploads of the
+    same file match; a re-encoded copy is simply a cache miss.
+
+    Args:
+        image_bytes: Encoded image file bytes
+
+    Returns:
+        Hex digest
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def ping() -> bool:
+    """No-op task used to spawn a worker (running its initializer) ahead of real work."""
+    return True
+
+
+def run_ocr(images: List[ImageBuffer]) -> Tuple[List[List[Detection]], float]:
+    """
+    Pool entry point: OCR a batch of images with this process's reader.
+
+    Returns:
+        Tuple of (per-image extracted (text, confidence, position) items, execution seconds)
+    """
+    start = time.perf_counter()
+    extracted = extract_text(images, _engine, _reader, _options)
+    return extracted, time.perf_counter() - start
@@ -0,0 +1,177 @@
+"""
+Direct Postgres bulk loader - binary COPY into staging tables, then one merge
+"""
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, List, Dict, Any, Tuple
+
+from config import settings
+from utils.metrics import get_recorder
+
+logger = logging.getLogger(__name__)
+
+copy_metrics = get_recorder("postgres_copy")
+
+# Conflict keys for every table the loader is allowed to merge into
+TABLE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "players": ("id",),
+    "teams": ("id",),
+    "fixtures": ("id",),
+    "gameweeks": ("id",),
+    "player_history": ("player_id", "fixture_id"),
+    "player_predictions": ("player_id", "gameweek_id"),
+}
+
+
+def _asyncpg_dsn(database_url: str) -> Optional[str]:
+    """Normalize a SQLAlchemy-style URL to an asyncpg DSN, or None if it isn't Postgres."""
+    scheme, _, rest = database_url.partition("://")
+    base_scheme = scheme.split("+")[0]
+    if base_scheme not in ("postgres", "postgresql"):
+        return None
+    return f"postgresql://{rest}"
+
+
+def _coerce(value: Any, type_name: str) -> Any:
+    """Convert a JSON-style value into what asyncpg's binary codec expects for the column type."""
+    if value is None:
+        return None
+    if type_name == "numeric":
+        return Decimal(str(value))
+    if type_name in ("int2", "int4", "int8"):
+        return int(value)
+    if type_name in ("float4", "float8"):
+        return float(value)
+    if type_name == "bool":
+        return bool(value)
+    if type_name in ("timestamptz", "timestamp"):
+        if isinstance(value, str):
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return value
+    if type_name in ("json", "jsonb"):
+        return value if isinstance(value, str) else json.dumps(value)
+    if type_name in ("text", "varchar", "uuid"):
+        return str(value)
+    return value
+
+
+class PostgresBulkLoader:
+    """
+    Bulk loads rows straight into Postgres.
+
+    Rows are streamed into a temporary staging table with binary COPY and merged
+    into the target with a single INSERT ... ON CONFLICT DO UPDATE, all in one
+    transaction.
+    """
+
+    def __init__(self, database_url: str):
+        self.dsn = _asyncpg_dsn(database_url)
+        self.pool = None
+        self._column_types: Dict[str, Dict[str, str]] = {}
+
+    @property
+    def available(self) -> bool:
+        return self.pool is not None
+
+    async def connect(self):
+        """Open the connection pool."""
+        if not self.dsn:
+            logger.warning("Postgres bulk load enabled but DATABASE_URL is not a Postgres URL")
+            return
+
+        try:
+            import asyncpg
+            self.pool = await asyncpg.create_pool(
+                self.dsn,
+                min_size=1,
+                max_size=settings.postgres_pool_size
+            )
+            logger.info("Postgres bulk loader connected")
+        except Exception as e:
+            logger.error(f"Failed to connect Postgres bulk loader: {e}")
+            self.pool = None
+
+    async def close(self):
+        """Close the connection pool."""
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+            logger.info("Postgres bulk loader closed")
+
+    async def _get_column_types(self, conn, table: str) -> Dict[str, str]:
+        """Column name -> Postgres type name, cached per table."""
+        if table not in self._column_types:
+            rows = await conn.fetch(
+                """
+                SELECT a.attname, t.typname
+                FROM pg_attribute a
+                JOIN pg_type t ON a.atttypid = t.oid
+                WHERE a.attrelid = $1::regclass AND a.attnum > 0 AND NOT a.attisdropped
+                """,
+                table
+            )
+            self._column_types[table] = {row["attname"]: row["typname"] for row in rows}
+        return self._column_types[table]
+
+    async def copy_upsert(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        Merge rows into a table via COPY + INSERT ... ON CONFLICT.
+
+        Args:
+            table: Target table, must be listed in TABLE_KEYS
+            rows: Rows keyed by column name; unknown keys are ignored
+
+        Returns:
+            Number of rows inserted or updated
+        """
+        if not self.pool:
+            raise RuntimeError("Postgres bulk loader is not connected")
+        if table not in TABLE_KEYS:
+            raise ValueError(f"No conflict key configured for table: {table}")
+        if not rows:
+            return 0
+
+        keys = TABLE_KEYS[table]
+        # Last occurrence wins; ON CONFLICT cannot touch the same row twice in one statement
+        rows = list({tuple(row.get(k) for k in keys): row for row in rows}.values())
+
+        with copy_metrics.time(table):
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    types = await self._get_column_types(conn, table)
+
+                    columns: List[str] = []
+                    for row in rows:
+                        for column in row:
+                            if column in types and column not in columns:
+                                columns.append(column)
+
+                    records = [
+                        tuple(_coerce(row.get(column), types[column]) for column in columns)
+                        for row in rows
+                    ]
+
+                    staging = f"_stage_{table}"
+                    await conn.execute(
+                        f'CREATE TEMP TABLE "{staging}" (LIKE "{table}" INCLUDING DEFAULTS) ON COMMIT DROP'
+                    )
+                    await conn.copy_records_to_table(staging, records=records, columns=columns)
+
+                    column_list = ", ".join(f'"{c}"' for c in columns)
+                    key_list = ", ".join(f'"{k}"' for k in keys)
+                    updates = [f'"{c}" = EXCLUDED."{c}"' for c in columns if c not in keys]
+                    if "updated_at" in types and "updated_at" not in columns:
+                        updates.append('"updated_at" = now()')
+                    conflict_action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+
+                    status = await conn.execute(
+                        f'INSERT INTO "{table}" ({column_list}) '
+                        f'SELECT {column_list} FROM "{staging}" '
+                        f'ON CONFLICT ({key_list}) {conflict_action}'
+                    )
+
+        merged = int(status.split()[-1])
+        logger.info(f"COPY-merged {merged} rows into {table}")
+        return merged
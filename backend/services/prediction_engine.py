@@ -0,0 +1,759 @@
+"""
+Vectorized batch prediction engine.
+
+Scores every player in the snapshot for a gameweek in one pass over columnar
+numpy arrays and caches the scored batch per (snapshot version, fixtures
+version, model version, gameweek). Prediction, captain, bench and transfer
+routes all read from the same batch instead of re-scoring player dicts one at
+a time.
+
+Each batch also holds a players x PREDICTION_HORIZON matrix of expected
+points for the gameweeks from the batch's onwards, weighted by each team's
+fixtures: zero in a blank gameweek, both fixtures counted in a double.
+Multi-gameweek questions slice it rather than re-scoring.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+import numpy as np
+
+from config import settings
+from ml.explanations import Explanations, explanation_service
+from ml.feature_store import feature_store
+from ml.model_server import model_server
+from ml.simulation import DIFFICULTY_WEIGHT, availability, simulate_points
+from services.data_cache_service import data_cache
+from services.fpl_api import fpl_client
+from utils.metrics import get_recorder
+
+logger = logging.getLogger(__name__)
+prediction_metrics = get_recorder("predictions")
+
+POSITIONS = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+POSITION_IDS = {name: element_type for element_type, name in POSITIONS.items()}
+PRICE_BUCKET = 5  # now_cost units (£0.5m) per top-N index bucket
+TRANSFER_HORIZON = 5  # Gameweeks behind TransferSuggestion.expected_points_gain_5gw
+
+
+def _column(players: List[Dict[str, Any]], key: str, default: float = 0) -> np.ndarray:
+    """One numeric player attribute as a float64 array (FPL sends some as strings)."""
+    return np.fromiter(
+        (float(player.get(key, default) or 0) for player in players),
+        dtype=np.float64,
+        count=len(players)
+    )
+
+
+def _top_rows(rows: np.ndarray, points: np.ndarray, n: int) -> np.ndarray:
+    """
+    The n best rows by points, best first, ties in row order.
+
+    Partial-sorts with np.partition so only the n winners are fully sorted.
+    """
+    if n <= 0:
+        return rows[:0]
+    if len(rows) > n:
+        values = points[rows]
+        kth = np.partition(values, len(rows) - n)[len(rows) - n]
+        above = rows[values > kth]
+        tied = np.sort(rows[values == kth])[:n - len(above)]
+        rows = np.concatenate([above, tied])
+    return rows[np.lexsort((rows, -points[rows]))]
+
+
+def fixture_weights(
+    fixtures: Optional[List[Dict[str, Any]]],
+    team_count: int,
+    start: int,
+    horizon: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    How many (difficulty-weighted) matches each team plays per horizon gameweek.
+
+    A fixture counts 1 + DIFFICULTY_WEIGHT * (3 - FDR) for each side, so a
+    blank gameweek is 0 and a double roughly 2. Without a fixture list every
+    team is assumed to play one average match.
+
+    Args:
+        fixtures: FPL fixtures (all of them, any order)
+        team_count: Highest team ID
+        start: First gameweek of the horizon
+        horizon: Number of gameweeks
+
+    Returns:
+        Tuple of (weights (team_count + 1, horizon), mean FDR per team in the
+        start gameweek with NaN for blanks)
+    """
+    if not fixtures or start <= 0:
+        return np.ones((team_count + 1, horizon)), np.full(team_count + 1, np.nan)
+
+    sides = [
+        (fixture[f"team_{side}"], fixture["event"] - start, fixture.get(f"team_{side}_difficulty") or 3)
+        for fixture in fixtures
+        if fixture.get("event") and start <= fixture["event"] < start + horizon
+        for side in ("h", "a")
+    ]
+    weights = np.zeros((team_count + 1, horizon))
+    difficulty = np.full(team_count + 1, np.nan)
+    if not sides:
+        return weights, difficulty
+
+    team, offset, fdr = (np.array(values) for values in zip(*sides))
+    np.add.at(weights, (team, offset), 1 + DIFFICULTY_WEIGHT * (3 - fdr))
+
+    first = offset == 0
+    matches = np.bincount(team[first], minlength=team_count + 1)
+    totals = np.bincount(team[first], weights=fdr[first], minlength=team_count + 1)
+    played = matches > 0
+    difficulty[played] = totals[played] / matches[played]
+    return weights, difficulty
+
+
+def opponent_labels(
+    fixtures: Optional[List[Dict[str, Any]]],
+    teams: Optional[List[Dict[str, Any]]],
+    gameweek: int
+) -> Dict[int, str]:
+    """Opponents per team in a gameweek, e.g. "ARS (H)" or "ARS (H), CHE (A)" in a double."""
+    names = {team["id"]: team.get("short_name") or team.get("name", "") for team in teams or []}
+    labels: Dict[int, List[str]] = {}
+    for fixture in sorted(fixtures or [], key=lambda fixture: fixture.get("kickoff_time") or ""):
+        if fixture.get("event") != gameweek:
+            continue
+        home, away = fixture["team_h"], fixture["team_a"]
+        labels.setdefault(home, []).append(f"{names.get(away, away)} (H)")
+        labels.setdefault(away, []).append(f"{names.get(home, home)} (A)")
+    return {team: ", ".join(opponents) for team, opponents in labels.items()}
+
+
+@dataclass
+class TopIndex:
+    """
+    Presorted top-K rows per position and per (position, price bucket).
+
+    Built once per scored batch. Unfiltered top-N queries slice a position
+    list. Price-filtered ones mask the merged bucket lists (kept presorted as
+    one array) down to the buckets inside the range, and only re-rank the few
+    buckets that straddle a price bound.
+    """
+    k: int
+    position_top: Dict[Optional[int], np.ndarray]
+    bucket_position: np.ndarray
+    bucket_min_cost: np.ndarray
+    bucket_max_cost: np.ndarray
+    bucket_truncated: np.ndarray
+    bucket_members: List[np.ndarray]
+    merged: np.ndarray  # every bucket's top-K rows, best first
+    merged_bucket: np.ndarray  # bucket of each row in merged
+
+    @classmethod
+    def build(cls, points: np.ndarray, element_type: np.ndarray, now_cost: np.ndarray, k: int) -> "TopIndex":
+        keys = element_type.astype(np.int64) * 10_000 + (now_cost // PRICE_BUCKET).astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        members = np.split(order, np.flatnonzero(np.diff(keys[order])) + 1) if len(order) else []
+
+        position_top = {None: _top_rows(np.arange(len(points)), points, k)}
+        for position in np.unique(element_type).tolist():
+            position_top[position] = _top_rows(np.flatnonzero(element_type == position), points, k)
+
+        tops = [_top_rows(rows, points, k) for rows in members]
+        merged = np.concatenate(tops) if tops else np.empty(0, dtype=np.int64)
+        merged_bucket = np.repeat(np.arange(len(tops)), [len(top) for top in tops])
+        order = np.lexsort((merged, -points[merged]))
+
+        return cls(
+            k=k,
+            position_top=position_top,
+            bucket_position=np.array([element_type[rows[0]] for rows in members], dtype=np.int64),
+            bucket_min_cost=np.array([now_cost[rows].min() for rows in members], dtype=np.float64),
+            bucket_max_cost=np.array([now_cost[rows].max() for rows in members], dtype=np.float64),
+            bucket_truncated=np.array([len(rows) > k for rows in members], dtype=bool),
+            bucket_members=members,
+            merged=merged[order],
+            merged_bucket=merged_bucket[order],
+        )
+
+    def query(
+        self,
+        points: np.ndarray,
+        now_cost: np.ndarray,
+        position: Optional[int] = None,
+        min_cost: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        limit: int = 10
+    ) -> np.ndarray:
+        """
+        Best rows by points for a position and now_cost range, best first.
+
+        Args:
+            points: Expected points per row
+            now_cost: now_cost per row
+            position: element_type, or None for every position
+            min_cost: Inclusive lower now_cost bound
+            max_cost: Inclusive upper now_cost bound
+            limit: Number of rows
+
+        Returns:
+            Up to limit rows, ties in snapshot order
+        """
+        if min_cost is None and max_cost is None:
+            ranked = self.position_top.get(position)
+            if ranked is None:
+                return np.empty(0, dtype=np.int64)
+            if limit <= self.k or len(ranked) < self.k:
+                return ranked[:limit]
+
+        low = -np.inf if min_cost is None else min_cost
+        high = np.inf if max_cost is None else max_cost
+
+        overlapping = (self.bucket_max_cost >= low) & (self.bucket_min_cost <= high)
+        if position is not None:
+            overlapping &= self.bucket_position == position
+        # Buckets wholly in range answer from their top-K, unless the query needs more than K of them
+        presorted = overlapping & (self.bucket_min_cost >= low) & (self.bucket_max_cost <= high)
+        if limit > self.k:
+            presorted &= ~self.bucket_truncated
+
+        candidates = [self.merged[presorted[self.merged_bucket]][:limit]]
+        for bucket in np.flatnonzero(overlapping & ~presorted).tolist():
+            rows = self.bucket_members[bucket]
+            costs = now_cost[rows]
+            candidates.append(_top_rows(rows[(costs >= low) & (costs <= high)], points, limit))
+
+        if len(candidates) == 1:
+            return candidates[0]
+        return _top_rows(np.concatenate(candidates), points, limit)
+
+
+@dataclass
+class PredictionBatch:
+    """
+    Predictions for every player in a snapshot, one array per PlayerPrediction field.
+
+    Row i of every array belongs to players[i], so rows keep snapshot order.
+    """
+    gameweek: int
+    model_version: str
+    players: List[Dict[str, Any]]
+    ids: np.ndarray
+    element_type: np.ndarray
+    team: np.ndarray
+    now_cost: np.ndarray
+    expected_points: np.ndarray
+    expected_points_floor: np.ndarray
+    expected_points_ceiling: np.ndarray
+    start_probability: np.ndarray
+    expected_minutes: np.ndarray
+    rotation_risk: np.ndarray
+    injury_risk: np.ndarray
+    confidence_score: np.ndarray
+    haul_probability: Optional[np.ndarray]  # None when simulation is off
+    blank_probability: Optional[np.ndarray]
+    explanations: Explanations  # top contributing factors per row
+    horizon: np.ndarray  # (players, PREDICTION_HORIZON) expected points from gameweek onwards
+    fixture_difficulty: np.ndarray  # mean FDR in gameweek, NaN for a blank
+    opponents: Dict[int, str] = field(default_factory=dict)  # by team ID
+    index: Dict[int, int] = field(default_factory=dict)
+    top_index: Optional[TopIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, player_id: int) -> Optional[int]:
+        """Row of a player, or None if they aren't in the snapshot."""
+        return self.index.get(player_id)
+
+    def rows(self, player_ids: Iterable[int]) -> np.ndarray:
+        """Rows of the given players that exist, in the order given."""
+        return np.array([self.index[i] for i in player_ids if i in self.index], dtype=np.int64)
+
+    def select(
+        self,
+        position: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Rows matching a position and price range (£m), in snapshot order.
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        if position is not None:
+            mask &= self.element_type == position
+        if min_price is not None:
+            mask &= self.now_cost >= min_price * 10
+        if max_price is not None:
+            mask &= self.now_cost <= max_price * 10
+        return np.flatnonzero(mask)
+
+    def top(
+        self,
+        position: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 10
+    ) -> np.ndarray:
+        """
+        Best rows for a position and price range (£m), best first.
+
+        Same result as rank(select(...))[:limit], answered from the top-N index.
+        """
+        if self.top_index is None:
+            return self.rank(self.select(position, min_price, max_price))[:limit]
+        return self.top_index.query(
+            self.expected_points,
+            self.now_cost,
+            position,
+            None if min_price is None else min_price * 10,
+            None if max_price is None else max_price * 10,
+            limit
+        )
+
+    def horizon_points(self, rows: Iterable[int], gameweeks: int) -> np.ndarray:
+        """
+        Expected points over the next gameweeks (capped at the stored horizon).
+
+        Args:
+            rows: Batch rows
+            gameweeks: Number of gameweeks from the batch's gameweek
+
+        Returns:
+            Total expected points per row
+        """
+        return self.horizon[rows, :gameweeks].sum(axis=1)
+
+    def rank_horizon(self, rows: np.ndarray, gameweeks: int) -> np.ndarray:
+        """Order rows by expected points over the next gameweeks, best first, ties in snapshot order."""
+        return rows[np.argsort(-self.horizon_points(rows, gameweeks), kind="stable")]
+
+    def rank(self, rows: np.ndarray, descending: bool = True) -> np.ndarray:
+        """
+        Order rows by expected points.
+
+        Stable, so ties keep snapshot order like sorted() did.
+        """
+        points = self.expected_points[rows]
+        order = np.argsort(-points if descending else points, kind="stable")
+        return rows[order]
+
+    def to_prediction(self, row: int) -> Dict[str, Any]:
+        """Materialize one row as a PlayerPrediction dict."""
+        player = self.players[row]
+        expected = float(self.expected_points[row])
+        difficulty = self.fixture_difficulty[row]
+        return {
+            "player_id": int(self.ids[row]),
+            "player_name": player.get("web_name", ""),
+            "team": str(player.get("team", "")),
+            "position": POSITIONS.get(int(self.element_type[row]), "UNK"),
+            "expected_points": round(expected, 1),
+            "expected_points_floor": round(float(self.expected_points_floor[row]), 1),
+            "expected_points_ceiling": round(float(self.expected_points_ceiling[row]), 1),
+            "start_probability": round(float(self.start_probability[row]), 3),
+            "expected_minutes": float(self.expected_minutes[row]),
+            "rotation_risk": round(float(self.rotation_risk[row]), 3),
+            "injury_risk": float(self.injury_risk[row]),
+            "confidence_score": float(self.confidence_score[row]),
+            "haul_probability": None if self.haul_probability is None else round(float(self.haul_probability[row]), 3),
+            "blank_probability": None if self.blank_probability is None else round(float(self.blank_probability[row]), 3),
+            "key_factors": self.explanations.factors(row),
+            "fixture_difficulty": None if np.isnan(difficulty) else int(round(float(difficulty))),
+            "opponent": self.opponents.get(int(self.team[row]))
+        }
+
+    def to_predictions(self, rows: Iterable[int]) -> List[Dict[str, Any]]:
+        """Materialize several rows, keeping their order."""
+        return [self.to_prediction(row) for row in rows]
+
+    def to_horizon(self, row: int, gameweeks: int) -> Dict[str, Any]:
+        """Materialize one row's next gameweeks as a PlayerHorizon dict."""
+        player = self.players[row]
+        points = self.horizon[row, :gameweeks]
+        return {
+            "player_id": int(self.ids[row]),
+            "player_name": player.get("web_name", ""),
+            "team": str(player.get("team", "")),
+            "position": POSITIONS.get(int(self.element_type[row]), "UNK"),
+            "gameweeks": list(range(self.gameweek, self.gameweek + len(points))),
+            "expected_points": [round(float(value), 1) for value in points],
+            "total_expected_points": round(float(points.sum()), 1),
+        }
+
+
+def score_players(
+    players: List[Dict[str, Any]],
+    gameweek: int,
+    model_version: str,
+    model_points: Optional[np.ndarray] = None,
+    model_minutes: Optional[np.ndarray] = None,
+    fixtures: Optional[List[Dict[str, Any]]] = None,
+    teams: Optional[List[Dict[str, Any]]] = None,
+    explanations: Optional[Explanations] = None
+) -> PredictionBatch:
+    """
+    Score a player snapshot in one vectorized pass.
+
+    Uses the served model's predictions where given (non-NaN). Otherwise a
+    form-weighted heuristic: players with under 10 points are scored on form
+    alone, everyone else on 60% form and 40% points per game plus a 10% uplift,
+    per match and scaled by the team's fixture weights. The batch gameweek's
+    expected points are then scaled by each player's chance of being
+    available (ml.simulation.availability), so injured and suspended players
+    expect nothing this gameweek while later horizon gameweeks are unscaled.
+
+    Floor, ceiling, start probability, rotation risk and haul/blank
+    probabilities come from SIMULATION_SAMPLES Monte Carlo draws of the
+    gameweek around those means (ml.simulation); with simulation off they are
+    fixed multiples and thresholds.
+
+    The horizon carries each player's per-match rate across the next
+    PREDICTION_HORIZON gameweeks' fixture weights. For model rows the rate is
+    backed out of the model's prediction for the batch gameweek, and the first
+    column always equals expected_points.
+
+    Args:
+        players: FPL elements
+        gameweek: Gameweek the predictions are for
+        model_version: Model version recorded on the batch
+        model_points: Model expected points per player (NaN where unavailable)
+        model_minutes: Model expected minutes per player (NaN where unavailable)
+        fixtures: FPL fixtures for blank/double gameweeks and difficulty
+            (every team plays one average match without them)
+        teams: FPL teams, for opponent names
+        explanations: Model explanations per player (empty rows where
+            unavailable); other rows are explained by the heuristic's terms
+
+    Returns:
+        Scored batch
+    """
+    ids = np.fromiter((player["id"] for player in players), dtype=np.int64, count=len(players))
+    element_type = _column(players, "element_type").astype(np.int8)
+    team = _column(players, "team").astype(np.int64)
+    now_cost = _column(players, "now_cost")
+    form = _column(players, "form")
+    points_per_game = _column(players, "points_per_game")
+    total_points = _column(players, "total_points")
+    minutes = _column(players, "minutes")
+    event_points = _column(players, "event_points", default=1)
+    available = np.fromiter((player.get("status") == "a" for player in players), dtype=bool, count=len(players))
+
+    team_count = max(int(team.max(initial=0)), max((max(f["team_h"], f["team_a"]) for f in fixtures or []), default=0))
+    weights, difficulty = fixture_weights(fixtures, team_count, gameweek, max(settings.prediction_horizon, 1))
+    weights, difficulty = weights[team], difficulty[team]
+
+    few_points = total_points < 10
+    form_term = np.where(few_points, form * 1.2, form * 0.6 * 1.1)
+    points_per_game_term = np.where(few_points, 0, points_per_game * 0.4 * 1.1)
+    # Evaluated exactly as the per-player helper did, so equal-looking scores tie and order the same way
+    heuristic_rate = np.where(few_points, form * 1.2, (form * 0.6 + points_per_game * 0.4) * 1.1)
+    rate = heuristic_rate
+    expected_minutes = np.minimum(90, minutes / np.maximum(event_points, 1))
+    modelled = np.zeros(len(players), dtype=bool)
+    if model_points is not None:
+        modelled = ~np.isnan(model_points) & (weights[:, 0] > 0)
+        rate = np.where(modelled, np.maximum(model_points, 0) / np.where(modelled, weights[:, 0], 1), rate)
+    if model_minutes is not None:
+        expected_minutes = np.where(np.isnan(model_minutes), expected_minutes, np.clip(model_minutes, 0, 90))
+
+    horizon = rate[:, None] * weights
+    fit_expected = horizon[:, 0].copy()
+    chance = availability(players)
+    horizon[:, 0] *= chance
+    expected = horizon[:, 0]
+
+    # The heuristic is a sum of terms, so the terms are its exact attributions;
+    # whatever a model changed on top of it shows up as one adjustment term,
+    # and availability as another
+    heuristic_expected = heuristic_rate * weights[:, 0]
+    heuristic = Explanations.top(
+        np.stack([
+            form_term,
+            points_per_game_term,
+            heuristic_expected - heuristic_rate,
+            fit_expected - heuristic_expected,
+            expected - fit_expected,
+        ], axis=1),
+        np.stack([form, points_per_game, weights[:, 0], fit_expected, chance], axis=1),
+        ["form", "points_per_game", "fixture_weight", "model_adjustment", "availability"],
+        settings.explanation_top_k,
+    )
+    if explanations is None:
+        explanations = heuristic
+    else:
+        # Only rows whose expected points are the model's are explained by it
+        explanations = explanations.take(np.where(modelled, np.arange(len(players)), -1)).fill(heuristic)
+
+    if settings.simulation_samples > 0:
+        with prediction_metrics.time("simulate"):
+            distribution = simulate_points(
+                players, element_type, team, expected, fixtures, gameweek, settings.simulation_samples
+            )
+        floor, ceiling = distribution.floor, distribution.ceiling
+        start_probability, rotation_risk = distribution.start_probability, distribution.rotation_risk
+        haul_probability, blank_probability = distribution.haul_probability, distribution.blank_probability
+    else:
+        floor, ceiling = expected * 0.6, expected * 1.4
+        start_probability = np.where(minutes > 200, 0.85, 0.65)
+        rotation_risk = np.where(minutes > 500, 0.2, 0.4)
+        haul_probability = blank_probability = None
+
+    return PredictionBatch(
+        gameweek=gameweek,
+        model_version=model_version,
+        players=players,
+        ids=ids,
+        element_type=element_type,
+        team=team,
+        now_cost=now_cost,
+        expected_points=expected,
+        expected_points_floor=floor,
+        expected_points_ceiling=ceiling,
+        start_probability=start_probability,
+        expected_minutes=expected_minutes,
+        rotation_risk=rotation_risk,
+        injury_risk=np.where(available, 0.1, 0.6),
+        confidence_score=np.full(len(players), 0.7),
+        haul_probability=haul_probability,
+        blank_probability=blank_probability,
+        explanations=explanations,
+        horizon=horizon,
+        fixture_difficulty=difficulty,
+        opponents=opponent_labels(fixtures, teams, gameweek),
+        index={int(player_id): row for row, player_id in enumerate(ids)},
+        top_index=TopIndex.build(expected, element_type, now_cost, settings.prediction_top_k),
+    )
+
+
+def suggest_transfers(batch: PredictionBatch, team_rows: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Suggest like-for-like upgrades for the weakest starters.
+
+    Args:
+        batch: Scored snapshot
+        team_rows: Rows of the squad, starters first
+
+    Returns:
+        Up to 5 transfer suggestions
+    """
+    suggestions = []
+
+    worst_performers = batch.rank(team_rows[:11], descending=False)[:3]
+
+    # The best 10 outside the squad are always within the best 10 + squad size overall
+    ranked = batch.top(limit=10 + len(team_rows))
+    best_alternatives = ranked[~np.isin(ranked, team_rows)][:10]
+
+    for i, row_out in enumerate(worst_performers[:2]):
+        for row_in in best_alternatives[:3]:
+            if batch.element_type[row_in] != batch.element_type[row_out]:
+                continue
+
+            cost_diff = float(batch.now_cost[row_in] - batch.now_cost[row_out]) / 10.0
+            if abs(cost_diff) > 3.0:
+                continue
+
+            gain = float(batch.expected_points[row_in] - batch.expected_points[row_out])
+            if gain > 0.5:
+                horizon_out, horizon_in = batch.horizon_points([row_out, row_in], TRANSFER_HORIZON)
+                player_out = batch.players[row_out]
+                player_in = batch.players[row_in]
+                suggestions.append({
+                    "player_out_id": player_out["id"],
+                    "player_out_name": player_out.get("web_name", ""),
+                    "player_in_id": player_in["id"],
+                    "player_in_name": player_in.get("web_name", ""),
+                    "expected_points_gain": round(gain, 1),
+                    "expected_points_gain_5gw": round(float(horizon_in - horizon_out), 1),
+                    "transfer_cost": 0,
+                    "net_cost_change": round(cost_diff, 1),
+                    "category": "overall" if i == 0 else "differential",
+                    "risk_level": "low" if gain > 2 else "medium",
+                    "risk_score": 0.3,
+                    "reasoning": f"Upgrade to higher form player with {gain:.1f} point advantage",
+                    "key_factors": [
+                        f"{player_in.get('web_name')} form: {player_in.get('form', 0)}",
+                        f"{player_out.get('web_name')} form: {player_out.get('form', 0)}",
+                        f"Cost difference: £{cost_diff:.1f}m"
+                    ]
+                })
+                break
+
+    return suggestions[:5]
+
+
+class PredictionEngine:
+    """Scores snapshots on demand and keeps the most recent batches."""
+
+    def __init__(self):
+        self._batches: "OrderedDict[Tuple[int, Optional[int], Optional[str], int], PredictionBatch]" = OrderedDict()
+
+    async def resolve_gameweek(self, gameweek: Optional[int] = None) -> int:
+        """
+        Gameweek to predict for: the one given, else the next, else the current.
+
+        Returns:
+            Gameweek number, or 0 if the schedule is unavailable
+        """
+        if gameweek is not None:
+            return gameweek
+        try:
+            event = await fpl_client.get_next_gameweek() or await fpl_client.get_current_gameweek()
+        except Exception as e:
+            logger.warning(f"Could not resolve the next gameweek: {e}")
+            return 0
+        return event["id"] if event else 0
+
+    async def get_batch(self, players: List[Dict[str, Any]], gameweek: Optional[int] = None) -> PredictionBatch:
+        """
+        Scored batch for a snapshot and gameweek (defaults to the next gameweek).
+
+        Args:
+            players: Snapshot from fpl_client.get_players()
+            gameweek: Gameweek number
+
+        Returns:
+            Scored batch
+        """
+        gameweek = await self.resolve_gameweek(gameweek)
+        try:
+            fixtures = await fpl_client.get_fixtures()
+            teams = await fpl_client.get_teams()
+        except Exception as e:
+            logger.warning(f"Fixtures unavailable, predicting without blank/double gameweeks: {e}")
+            fixtures, teams = None, None
+
+        batch = self._cached(players, gameweek, fixtures)
+        if batch is not None:
+            return batch
+        # Scoring a new snapshot runs the simulation; keep it off the event loop
+        return await asyncio.to_thread(self.predict, players, gameweek, fixtures, teams)
+
+    def predict(
+        self,
+        players: List[Dict[str, Any]],
+        gameweek: int,
+        fixtures: Optional[List[Dict[str, Any]]] = None,
+        teams: Optional[List[Dict[str, Any]]] = None
+    ) -> PredictionBatch:
+        """
+        Score a snapshot, reusing the cached batch when it is the cached snapshot.
+
+        Only the snapshot and fixture list held by data_cache have versions to
+        key on, so other lists are scored without being cached.
+        """
+        batch = self._cached(players, gameweek, fixtures)
+        if batch is not None:
+            return batch
+
+        with prediction_metrics.time("score"):
+            model = self._model_predictions(players, gameweek)
+            if model is None:
+                batch = score_players(players, gameweek, settings.model_version, fixtures=fixtures, teams=teams)
+            else:
+                version, model_points, model_minutes, explanations = model
+                batch = score_players(
+                    players, gameweek, version, model_points, model_minutes, fixtures, teams, explanations
+                )
+        logger.debug(f"Scored {len(batch)} players for GW{gameweek} ({batch.model_version})")
+
+        key = self._key(players, gameweek, fixtures)
+        if key is not None and settings.prediction_cache_size > 0:
+            self._batches[key] = batch
+            while len(self._batches) > settings.prediction_cache_size:
+                self._batches.popitem(last=False)
+        return batch
+
+    def _key(
+        self,
+        players: List[Dict[str, Any]],
+        gameweek: int,
+        fixtures: Optional[List[Dict[str, Any]]]
+    ) -> Optional[Tuple[int, Optional[int], Optional[str], int]]:
+        """Cache key for the data_cache snapshot and fixtures, None for any other lists."""
+        if players is not data_cache.players_cache or (fixtures is not None and fixtures is not data_cache.fixtures_cache):
+            return None
+        # None while no model is served, so heuristic batches never collide with model ones
+        return (
+            data_cache.players_version,
+            data_cache.fixtures_version if fixtures is not None else None,
+            model_server.version,
+            gameweek,
+        )
+
+    def _cached(
+        self,
+        players: List[Dict[str, Any]],
+        gameweek: int,
+        fixtures: Optional[List[Dict[str, Any]]]
+    ) -> Optional[PredictionBatch]:
+        key = self._key(players, gameweek, fixtures)
+        batch = self._batches.get(key) if key is not None else None
+        if batch is not None:
+            self._batches.move_to_end(key)
+        return batch
+
+    def _model_predictions(
+        self,
+        players: List[Dict[str, Any]],
+        gameweek: int
+    ) -> Optional[Tuple[str, np.ndarray, Optional[np.ndarray], Optional[Explanations]]]:
+        """
+        Served model's points and minutes for a snapshot, aligned to its rows.
+
+        The run's explanations come from explanation_service, which computes
+        them once per model version and gameweek.
+
+        Returns:
+            Tuple of (model version, points, minutes or None, explanations or
+            None) with NaN (empty explanations) for players missing from the
+            feature store, or None when there is no model or no stored
+            features for the gameweek
+        """
+        season = feature_store.current_season() if model_server.ready else None
+        if season is None:
+            return None
+        try:
+            frame = feature_store.load(season, gameweek)
+        except (FileNotFoundError, ValueError) as e:
+            logger.debug(f"No model features for GW{gameweek}: {e}")
+            return None
+
+        try:
+            predictions = model_server.predict(frame.features, frame.names, key=(season, gameweek))
+        except Exception as e:
+            logger.error(f"Model inference failed for GW{gameweek}, using heuristic predictions: {e}")
+            return None
+        if predictions is None or "points" not in predictions.outputs:
+            return None
+
+        ids = np.fromiter((player["id"] for player in players), dtype=np.int64, count=len(players))
+        rows = frame.rows(ids)
+        found = rows >= 0
+
+        def align(values: np.ndarray) -> np.ndarray:
+            aligned = np.full(len(players), np.nan)
+            aligned[found] = values[rows[found]]
+            return aligned
+
+        ensemble = model_server.ensemble
+        explanations = None
+        if ensemble is not None and ensemble.version == predictions.version:
+            explanations = explanation_service.explain(ensemble, frame.features, frame.names, season, gameweek)
+
+        minutes = predictions.outputs.get("minutes")
+        return (
+            predictions.version,
+            align(predictions.outputs["points"]),
+            align(minutes) if minutes is not None else None,
+            explanations.take(rows) if explanations is not None else None,
+        )
+
+    def invalidate(self):
+        """Drop every cached batch."""
+        self._batches.clear()
+
+
+# Global prediction engine instance
+prediction_engine = PredictionEngine()
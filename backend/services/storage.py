@@ -0,0 +1,378 @@
+"""
+Storage backends behind SupabaseService - Supabase (PostgREST) or embedded SQLite
+"""
+import json
+import logging
+import re
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# (column, operator, value) where operator is one of gt, gte, lt, lte
+RangeFilter = Tuple[str, str, Any]
+
+DEFAULT_SCHEMA_DIR = Path(__file__).resolve().parents[2] / "supabase" / "migrations"
+
+
+class StorageBackend(ABC):
+    """
+    Minimal table-level operations SupabaseService is built on.
+    Implementations are synchronous and are always called from the service's thread pool.
+    """
+
+    name = "base"
+    # Whether bulk writes should be split into request-sized chunks
+    chunked_writes = True
+
+    @abstractmethod
+    def select(
+        self,
+        table: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        ranges: Optional[List[RangeFilter]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Rows matching equality filters and range filters, optionally ordered and limited."""
+
+    @abstractmethod
+    def upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: str = ""):
+        """Insert rows, updating existing ones that clash on the on_conflict columns."""
+
+    @abstractmethod
+    def insert(self, table: str, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert one row and return it as stored, with generated columns filled in."""
+
+    def close(self):
+        pass
+
+
+class SupabaseBackend(StorageBackend):
+    """Supabase over PostgREST using the synchronous supabase-py client."""
+
+    name = "supabase"
+
+    def __init__(self, client):
+        self.client = client
+
+    def select(self, table, columns=None, filters=None, ranges=None, order_by=None, descending=False, limit=None):
+        query = self.client.table(table).select(",".join(columns) if columns else "*")
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        for column, op, value in ranges or []:
+            query = getattr(query, op)(column, value)
+        if order_by:
+            query = query.order(order_by, desc=descending)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data or []
+
+    def upsert(self, table, rows, on_conflict=""):
+        from postgrest.types import ReturnMethod
+        self.client.table(table).upsert(rows, on_conflict=on_conflict, returning=ReturnMethod.minimal).execute()
+
+    def insert(self, table, row):
+        response = self.client.table(table).insert(row).execute()
+        return response.data[0] if response.data else None
+
+
+@dataclass
+class TableSchema:
+    """Column layout of one table, parsed from the Supabase migrations."""
+    name: str
+    columns: Dict[str, str] = field(default_factory=dict)  # name -> kind (int, real, text, bool, json)
+    primary_key: Tuple[str, ...] = ()
+    unique: List[Tuple[str, ...]] = field(default_factory=list)
+    uuid_defaults: List[str] = field(default_factory=list)
+    ddl: str = ""
+
+
+_TYPE_KINDS = [
+    ("bigint", "int", "INTEGER"),
+    ("int", "int", "INTEGER"),
+    ("numeric", "real", "REAL"),
+    ("boolean", "bool", "INTEGER"),
+    ("jsonb", "json", "TEXT"),
+    ("timestamptz", "text", "TEXT"),
+    ("uuid", "text", "TEXT"),
+    ("text", "text", "TEXT"),
+]
+
+
+def _split_columns(body: str) -> List[str]:
+    """Split a CREATE TABLE body on top-level commas."""
+    parts, depth, current = [], 0, ""
+    for char in body:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _key_list(text: str) -> Tuple[str, ...]:
+    return tuple(part.strip() for part in text.split(","))
+
+
+def load_schema(schema_dir: Path) -> Tuple[Dict[str, TableSchema], List[str]]:
+    """
+    Translate the Postgres migrations into SQLite DDL.
+
+    Only CREATE TABLE and CREATE INDEX statements are used; RLS policies have no
+    SQLite equivalent.
+
+    Args:
+        schema_dir: Directory of *.sql migrations, applied in file name order
+
+    Returns:
+        Tuple of (table schemas by name, CREATE INDEX statements)
+    """
+    tables: Dict[str, TableSchema] = {}
+    indexes: List[str] = []
+
+    for path in sorted(schema_dir.glob("*.sql")):
+        sql = re.sub(r"/\*.*?\*/", "", path.read_text(), flags=re.S)
+        sql = re.sub(r"--[^\n]*", "", sql)
+
+        for match in re.finditer(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\);", sql, flags=re.S):
+            schema = TableSchema(name=match.group(1))
+            definitions = []
+
+            for part in _split_columns(match.group(2)):
+                constraint = re.match(r"(UNIQUE|PRIMARY KEY)\s*\((.*)\)$", part, flags=re.I)
+                if constraint:
+                    keys = _key_list(constraint.group(2))
+                    if constraint.group(1).upper() == "UNIQUE":
+                        schema.unique.append(keys)
+                    else:
+                        schema.primary_key = keys
+                    definitions.append(part)
+                    continue
+
+                name, pg_type, *rest = part.split()
+                constraints = " ".join(rest)
+                kind, sqlite_type = "text", "TEXT"
+                for prefix, column_kind, column_sqlite_type in _TYPE_KINDS:
+                    if pg_type.lower().startswith(prefix):
+                        kind, sqlite_type = column_kind, column_sqlite_type
+                        break
+
+                if "gen_random_uuid()" in constraints:
+                    schema.uuid_defaults.append(name)
+                    constraints = re.sub(r"DEFAULT gen_random_uuid\(\)", "", constraints)
+                constraints = constraints.replace("DEFAULT now()", "DEFAULT CURRENT_TIMESTAMP")
+                constraints = re.sub(r"DEFAULT false\b", "DEFAULT 0", constraints)
+                constraints = re.sub(r"DEFAULT true\b", "DEFAULT 1", constraints)
+                if "PRIMARY KEY" in constraints:
+                    schema.primary_key = (name,)
+
+                schema.columns[name] = kind
+                definitions.append(f"{name} {sqlite_type} {constraints}".strip())
+
+            schema.ddl = f"CREATE TABLE IF NOT EXISTS {schema.name} (\n  " + ",\n  ".join(definitions) + "\n)"
+            tables[schema.name] = schema
+
+        indexes.extend(re.findall(r"CREATE INDEX IF NOT EXISTS [^;]+", sql))
+
+    return tables, indexes
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Embedded SQLite storage using the same schema as supabase/migrations.
+
+    Runs in WAL mode so readers never block on the writer. Each pool thread
+    keeps its own connection.
+    """
+
+    name = "sqlite"
+    chunked_writes = False
+
+    def __init__(self, path: str, schema_dir: Optional[Path] = None):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.tables, indexes = load_schema(schema_dir or DEFAULT_SCHEMA_DIR)
+        if not self.tables:
+            raise RuntimeError(f"No table definitions found in {schema_dir or DEFAULT_SCHEMA_DIR}")
+
+        conn = self._connection()
+        with conn:
+            for schema in self.tables.values():
+                conn.execute(schema.ddl)
+            for statement in indexes:
+                conn.execute(statement)
+        logger.info(f"SQLite storage ready at {path} ({len(self.tables)} tables)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _schema(self, table: str) -> TableSchema:
+        schema = self.tables.get(table)
+        if schema is None:
+            raise ValueError(f"Unknown table: {table}")
+        return schema
+
+    def _encode(self, schema: TableSchema, column: str, value: Any) -> Any:
+        if value is None:
+            return None
+        kind = schema.columns[column]
+        if kind == "json":
+            return json.dumps(value)
+        if kind == "bool":
+            return int(bool(value))
+        return value
+
+    def _decode(self, schema: TableSchema, row: sqlite3.Row) -> Dict[str, Any]:
+        decoded = {}
+        for column in row.keys():
+            value = row[column]
+            kind = schema.columns.get(column)
+            if value is not None and kind == "json":
+                value = json.loads(value)
+            elif value is not None and kind == "bool":
+                value = bool(value)
+            decoded[column] = value
+        return decoded
+
+    def _check_columns(self, schema: TableSchema, columns) -> List[str]:
+        unknown = [c for c in columns if c not in schema.columns]
+        if unknown:
+            raise ValueError(f"Unknown columns for {schema.name}: {unknown}")
+        return list(columns)
+
+    def select(self, table, columns=None, filters=None, ranges=None, order_by=None, descending=False, limit=None):
+        schema = self._schema(table)
+        column_list = ", ".join(self._check_columns(schema, columns)) if columns else "*"
+        operators = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+        clauses, params = [], []
+        for column, value in (filters or {}).items():
+            self._check_columns(schema, [column])
+            clauses.append(f"{column} = ?")
+            params.append(self._encode(schema, column, value))
+        for column, op, value in ranges or []:
+            self._check_columns(schema, [column])
+            clauses.append(f"{column} {operators[op]} ?")
+            params.append(value)
+
+        sql = f"SELECT {column_list} FROM {table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_by:
+            self._check_columns(schema, [order_by])
+            sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        return [self._decode(schema, row) for row in self._connection().execute(sql, params)]
+
+    def upsert(self, table, rows, on_conflict=""):
+        if not rows:
+            return
+        schema = self._schema(table)
+        keys = _key_list(on_conflict) if on_conflict else schema.primary_key
+
+        columns: List[str] = []
+        for row in rows:
+            for column in row:
+                if column in schema.columns and column not in columns:
+                    columns.append(column)
+        for column in schema.uuid_defaults:
+            if column not in columns and column not in keys:
+                columns.append(column)
+
+        updates = [f"{c} = excluded.{c}" for c in columns if c not in keys and c not in schema.uuid_defaults]
+        if "updated_at" in schema.columns and "updated_at" not in columns:
+            updates.append("updated_at = CURRENT_TIMESTAMP")
+        action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(keys)}) {action}"
+        )
+        params = [
+            tuple(
+                str(uuid.uuid4()) if c in schema.uuid_defaults and row.get(c) is None
+                else self._encode(schema, c, row.get(c))
+                for c in columns
+            )
+            for row in rows
+        ]
+
+        conn = self._connection()
+        with conn:
+            conn.executemany(sql, params)
+
+    def insert(self, table, row):
+        schema = self._schema(table)
+        row = dict(row)
+        for column in schema.uuid_defaults:
+            row.setdefault(column, str(uuid.uuid4()))
+        columns = self._check_columns(schema, [c for c in row if c in schema.columns])
+
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"RETURNING *"
+        )
+        conn = self._connection()
+        with conn:
+            inserted = conn.execute(sql, [self._encode(schema, c, row[c]) for c in columns]).fetchone()
+        return self._decode(schema, inserted) if inserted else None
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def sqlite_path(database_url: str) -> str:
+    """Filesystem path from a sqlite:/// URL."""
+    if not database_url.startswith("sqlite:///"):
+        raise ValueError(f"Not a SQLite URL: {database_url}")
+    return database_url[len("sqlite:///"):]
+
+
+def create_backend() -> Optional[StorageBackend]:
+    """Build the backend selected by STORAGE_BACKEND, or None if it isn't configured."""
+    if settings.storage_backend == "sqlite":
+        schema_dir = Path(settings.storage_schema_dir) if settings.storage_schema_dir else None
+        return SQLiteBackend(sqlite_path(settings.database_url), schema_dir)
+
+    if settings.storage_backend == "supabase":
+        if not (settings.supabase_url and settings.supabase_anon_key):
+            logger.warning("Supabase credentials not configured")
+            return None
+        from supabase import create_client
+        return SupabaseBackend(create_client(settings.supabase_url, settings.supabase_anon_key))
+
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
@@ -1,69 +1,336 @@
 """
 Supabase client service for database operations
 """
-from typing import Optional, List, Dict, Any
-from supabase import create_client, Client
+from typing import Optional, List, Dict, Any, AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from config import settings
+from services.data_cache_service import data_cache
+from services.postgres_bulk import PostgresBulkLoader, TABLE_KEYS
+from services.storage import StorageBackend, RangeFilter, create_backend
+from utils.metrics import get_recorder
+import asyncio
+import json
 import logging
+import math
+import time
 
 logger = logging.getLogger(__name__)
 
+db_metrics = get_recorder("supabase")
+
+
+@dataclass
+class BulkWriteResult:
+    """Outcome of a chunked bulk write. Truthy only if every chunk succeeded."""
+    table: str
+    total_rows: int
+    written_rows: int = 0
+    chunks: int = 0
+    failed_chunks: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def failed_rows(self) -> int:
+        return self.total_rows - self.written_rows
+
+    @property
+    def success(self) -> bool:
+        return self.chunks > 0 and not self.failed_chunks
+
+    def __bool__(self) -> bool:
+        return self.success
+
+
+def chunk_rows(
+    rows: List[Dict[str, Any]],
+    max_rows: int,
+    max_bytes: int
+) -> List[List[Dict[str, Any]]]:
+    """
+    Split rows into request-sized chunks.
+
+    Args:
+        rows: Rows to split
+        max_rows: Maximum rows per chunk
+        max_bytes: Approximate maximum JSON payload size per chunk
+
+    Returns:
+        List of chunks, each within both limits (a single oversized row gets its own chunk)
+    """
+    chunks = []
+    current: List[Dict[str, Any]] = []
+    current_bytes = 2  # Enclosing brackets
+
+    for row in rows:
+        row_bytes = len(json.dumps(row, default=str)) + 1
+        if current and (len(current) >= max_rows or current_bytes + row_bytes > max_bytes):
+            chunks.append(current)
+            current = []
+            current_bytes = 2
+        current.append(row)
+        current_bytes += row_bytes
+
+    if current:
+        chunks.append(current)
+    return chunks
+
 
 class SupabaseService:
-    """Service for interacting with Supabase database."""
+    """
+    Service for interacting with the application database.
+
+    Storage goes through a StorageBackend: Supabase (PostgREST) by default, or
+    an embedded SQLite database with the same schema when STORAGE_BACKEND=sqlite.
+    Backends are synchronous, so every call runs on a dedicated, bounded thread
+    pool instead of the event loop.
+    """
 
     def __init__(self):
-        self.client: Optional[Client] = None
+        self.backend: Optional[StorageBackend] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._bulk_loader: Optional[PostgresBulkLoader] = None
 
     async def connect(self):
-        """Initialize Supabase client."""
+        """Initialize the storage backend."""
         try:
-            if settings.supabase_url and settings.supabase_anon_key:
-                self.client = create_client(
-                    settings.supabase_url,
-                    settings.supabase_anon_key
+            self.backend = create_backend()
+            if self.backend:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.supabase_max_workers,
+                    thread_name_prefix="storage"
                 )
-                logger.info("Supabase client initialized successfully")
-            else:
-                logger.warning("Supabase credentials not configured")
+                logger.info(f"Storage backend initialized: {self.backend.name}")
+
+            if settings.postgres_bulk_load:
+                self._bulk_loader = PostgresBulkLoader(settings.database_url)
+                await self._bulk_loader.connect()
         except Exception as e:
-            logger.error(f"Failed to initialize Supabase client: {e}")
+            logger.error(f"Failed to initialize storage backend: {e}")
             raise
 
     async def disconnect(self):
-        """Cleanup Supabase client."""
-        self.client = None
-        logger.info("Supabase client disconnected")
+        """Cleanup the storage backend."""
+        if self._bulk_loader:
+            await self._bulk_loader.close()
+            self._bulk_loader = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.backend:
+            self.backend.close()
+            self.backend = None
+        logger.info("Storage backend disconnected")
+
+    async def _execute(self, table: str, operation: str, *args, **kwargs):
+        """
+        Run a backend operation off the event loop and record its latency.
+
+        Args:
+            table: Table name, used as the metrics key prefix
+            operation: Backend method name (select, upsert, insert)
+            *args, **kwargs: Arguments after the table name
+
+        Returns:
+            The backend method's result
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        error = False
+        try:
+            method = getattr(self.backend, operation)
+            return await loop.run_in_executor(self._executor, lambda: method(table, *args, **kwargs))
+        except Exception:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            db_metrics.observe(f"{table}.{operation}", elapsed, error)
+            if elapsed > settings.supabase_slow_query_seconds:
+                logger.warning(f"Slow {operation} on {table}: {elapsed:.2f}s")
+
+    async def _bulk_upsert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        on_conflict: str = ""
+    ) -> BulkWriteResult:
+        """
+        Upsert rows in size-limited chunks with bounded parallelism and per-chunk retry.
+        When the direct Postgres loader is connected, rows go through COPY instead.
+
+        Args:
+            table: Target table
+            rows: Rows to upsert
+            on_conflict: Comma-separated conflict columns (defaults to the primary key)
+
+        Returns:
+            BulkWriteResult describing written rows and any failed chunks
+        """
+        result = BulkWriteResult(table=table, total_rows=len(rows))
+        if not rows:
+            return result
+
+        if self._bulk_loader and self._bulk_loader.available and table in TABLE_KEYS:
+            try:
+                await self._bulk_loader.copy_upsert(table, rows)
+                result.chunks = 1
+                result.written_rows = len(rows)
+                return result
+            except Exception as e:
+                logger.error(f"COPY bulk load into {table} failed, falling back to PostgREST: {e}")
+
+        if not self.backend:
+            return result
+
+        if self.backend.chunked_writes:
+            chunks = chunk_rows(rows, settings.supabase_upsert_chunk_rows, settings.supabase_upsert_chunk_bytes)
+        else:
+            chunks = [rows]
+        result.chunks = len(chunks)
+        semaphore = asyncio.Semaphore(settings.supabase_upsert_concurrency)
+
+        async def write_chunk(index: int, chunk: List[Dict[str, Any]]):
+            async with semaphore:
+                for attempt in range(settings.supabase_upsert_retries + 1):
+                    try:
+                        await self._execute(table, "upsert", chunk, on_conflict=on_conflict)
+                        result.written_rows += len(chunk)
+                        return
+                    except Exception as e:
+                        if attempt == settings.supabase_upsert_retries:
+                            logger.error(f"Chunk {index} of {table} upsert failed after "
+                                         f"{attempt + 1} attempts: {e}")
+                            result.failed_chunks.append({"index": index, "rows": len(chunk), "error": str(e)})
+                            return
+                        await asyncio.sleep(0.5 * 2 ** attempt)
+
+        await asyncio.gather(*(write_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+
+        if result.failed_chunks:
+            logger.warning(f"Upserted {result.written_rows}/{result.total_rows} {table} rows, "
+                           f"{len(result.failed_chunks)}/{result.chunks} chunks failed")
+        else:
+            logger.info(f"Upserted {result.written_rows} {table} rows in {result.chunks} chunks")
+        return result
+
+    async def _select(
+        self,
+        table: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        ranges: Optional[List[RangeFilter]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Run a filtered select on the backend."""
+        return await self._execute(
+            table, "select", columns, filters,
+            ranges=ranges, order_by=order_by, descending=descending, limit=limit
+        )
+
+    async def _select_one(self, table: str, filters: Dict[str, Any], columns: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """First row matching the filters, or None."""
+        rows = await self._select(table, columns, filters, limit=1)
+        return rows[0] if rows else None
+
+    async def iter_rows(
+        self,
+        table: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        key: str = "id",
+        page_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream every matching row in key order.
+
+        The key range is split into contiguous slices that are fetched
+        concurrently, each walked with keyset pagination (key > last seen), so
+        results are never truncated at the PostgREST row limit. Rows are yielded
+        in key order while later slices prefetch in the background.
+
+        Args:
+            table: Table to read
+            columns: Columns to project (all when None); the key is always included
+            filters: Equality filters
+            key: Integer column that is unique within the filtered rows
+            page_size: Rows per request, must not exceed the PostgREST max-rows setting
+            concurrency: Maximum slices fetched at once
+
+        Yields:
+            Row dictionaries
+        """
+        if not self.backend:
+            return
+
+        page_size = page_size or settings.supabase_page_size
+        concurrency = concurrency or settings.supabase_read_concurrency
+        if columns and key not in columns:
+            columns = [key, *columns]
+
+        first, last = await asyncio.gather(
+            self._select(table, [key], filters, order_by=key, limit=1),
+            self._select(table, [key], filters, order_by=key, descending=True, limit=1),
+        )
+        if not first:
+            return
+
+        low, high = first[0][key], last[0][key]
+        slices = max(1, min(concurrency, math.ceil((high - low + 1) / page_size)))
+        span = math.ceil((high - low + 1) / slices)
+        bounds = [(low + i * span, min(high, low + (i + 1) * span - 1)) for i in range(slices)]
+        queues = [asyncio.Queue(maxsize=2) for _ in bounds]
+
+        async def fetch_slice(start: int, end: int, queue: asyncio.Queue):
+            try:
+                cursor = start - 1
+                while True:
+                    rows = await self._select(
+                        table, columns, filters,
+                        ranges=[(key, "gt", cursor), (key, "lte", end)],
+                        order_by=key, limit=page_size
+                    )
+                    if rows:
+                        await queue.put(rows)
+                    if len(rows) < page_size:
+                        break
+                    cursor = rows[-1][key]
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [asyncio.create_task(fetch_slice(start, end, queue)) for (start, end), queue in zip(bounds, queues)]
+        try:
+            for queue in queues:
+                while True:
+                    page = await queue.get()
+                    if page is None:
+                        break
+                    if isinstance(page, Exception):
+                        raise page
+                    for row in page:
+                        yield row
+        finally:
+            for task in tasks:
+                task.cancel()
 
     # Player operations
-    async def upsert_players(self, players: List[Dict[str, Any]]) -> bool:
+    async def upsert_players(self, players: List[Dict[str, Any]]) -> BulkWriteResult:
         """Bulk upsert players data."""
+        if not self.backend:
+            logger.warning("Storage backend not initialized")
+        return await self._bulk_upsert("players", players)
+
+    async def get_players(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        columns: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get players with optional filters and column projection."""
         try:
-            if not self.client:
-                logger.warning("Supabase client not initialized")
-                return False
-
-            response = self.client.table("players").upsert(players).execute()
-            logger.info(f"Upserted {len(players)} players")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to upsert players: {e}")
-            return False
-
-    async def get_players(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Get players with optional filters."""
-        try:
-            if not self.client:
-                return []
-
-            query = self.client.table("players").select("*")
-
-            if filters:
-                for key, value in filters.items():
-                    query = query.eq(key, value)
-
-            response = query.execute()
-            return response.data
+            return [row async for row in self.iter_rows("players", columns, filters)]
         except Exception as e:
             logger.error(f"Failed to get players: {e}")
             return []
@@ -72,10 +339,10 @@ class SupabaseService:
     async def upsert_teams(self, teams: List[Dict[str, Any]]) -> bool:
         """Bulk upsert teams data."""
         try:
-            if not self.client:
+            if not self.backend:
                 return False
 
-            response = self.client.table("teams").upsert(teams).execute()
+            await self._execute("teams", "upsert", teams)
             logger.info(f"Upserted {len(teams)} teams")
             return True
         except Exception as e:
@@ -85,93 +352,96 @@ class SupabaseService:
     async def get_teams(self) -> List[Dict[str, Any]]:
         """Get all teams."""
         try:
-            if not self.client:
+            if not self.backend:
                 return []
 
-            response = self.client.table("teams").select("*").execute()
-            return response.data
+            return await self._select("teams")
         except Exception as e:
             logger.error(f"Failed to get teams: {e}")
             return []
 
     # Fixture operations
-    async def upsert_fixtures(self, fixtures: List[Dict[str, Any]]) -> bool:
+    async def upsert_fixtures(self, fixtures: List[Dict[str, Any]]) -> BulkWriteResult:
         """Bulk upsert fixtures data."""
-        try:
-            if not self.client:
-                return False
+        return await self._bulk_upsert("fixtures", fixtures)
 
-            response = self.client.table("fixtures").upsert(fixtures).execute()
-            logger.info(f"Upserted {len(fixtures)} fixtures")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to upsert fixtures: {e}")
-            return False
-
-    async def get_fixtures(self, gameweek: Optional[int] = None) -> List[Dict[str, Any]]:
+    async def get_fixtures(
+        self,
+        gameweek: Optional[int] = None,
+        columns: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
         """Get fixtures, optionally filtered by gameweek."""
         try:
-            if not self.client:
-                return []
-
-            query = self.client.table("fixtures").select("*")
-            if gameweek:
-                query = query.eq("event", gameweek)
-
-            response = query.execute()
-            return response.data
+            filters = {"event": gameweek} if gameweek else None
+            return [row async for row in self.iter_rows("fixtures", columns, filters)]
         except Exception as e:
             logger.error(f"Failed to get fixtures: {e}")
             return []
 
+    # Player history operations
+    async def upsert_player_history(self, history: List[Dict[str, Any]]) -> BulkWriteResult:
+        """Bulk upsert per-fixture player history rows."""
+        return await self._bulk_upsert("player_history", history, on_conflict="player_id,fixture_id")
+
     # Gameweek operations
     async def upsert_gameweeks(self, gameweeks: List[Dict[str, Any]]) -> bool:
         """Bulk upsert gameweeks data."""
         try:
-            if not self.client:
+            if not self.backend:
                 return False
 
-            response = self.client.table("gameweeks").upsert(gameweeks).execute()
+            await self._execute("gameweeks", "upsert", gameweeks)
             logger.info(f"Upserted {len(gameweeks)} gameweeks")
             return True
         except Exception as e:
             logger.error(f"Failed to upsert gameweeks: {e}")
             return False
 
+    async def get_gameweeks(self) -> List[Dict[str, Any]]:
+        """Get all gameweeks."""
+        try:
+            if not self.backend:
+                return []
+
+            return await self._select("gameweeks")
+        except Exception as e:
+            logger.error(f"Failed to get gameweeks: {e}")
+            return []
+
     async def get_current_gameweek(self) -> Optional[Dict[str, Any]]:
         """Get the current gameweek."""
         try:
-            if not self.client:
+            if not self.backend:
                 return None
 
-            response = self.client.table("gameweeks").select("*").eq("is_current", True).maybeSingle().execute()
-            return response.data
+            return await self._select_one("gameweeks", {"is_current": True})
         except Exception as e:
             logger.error(f"Failed to get current gameweek: {e}")
             return None
 
     # Prediction operations
-    async def save_predictions(self, predictions: List[Dict[str, Any]]) -> bool:
-        """Save player predictions."""
+    async def save_predictions(self, predictions: List[Dict[str, Any]]) -> BulkWriteResult:
+        """Save player predictions, one row per (player, gameweek)."""
+        return await self._bulk_upsert("player_predictions", predictions, on_conflict="player_id,gameweek_id")
+
+    async def get_predictions(
+        self,
+        gameweek_id: int,
+        columns: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get stored predictions for a specific gameweek.
+
+        Not cached: rows carry no model version to key on, and predictions
+        served by the API come from PredictionEngine's in-memory batches,
+        keyed by snapshot, fixtures, model version and gameweek.
+        """
         try:
-            if not self.client:
-                return False
-
-            response = self.client.table("player_predictions").upsert(predictions).execute()
-            logger.info(f"Saved {len(predictions)} predictions")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to save predictions: {e}")
-            return False
-
-    async def get_predictions(self, gameweek_id: int) -> List[Dict[str, Any]]:
-        """Get predictions for a specific gameweek."""
-        try:
-            if not self.client:
-                return []
-
-            response = self.client.table("player_predictions").select("*").eq("gameweek_id", gameweek_id).execute()
-            return response.data
+            return [
+                row async for row in self.iter_rows(
+                    "player_predictions", columns, {"gameweek_id": gameweek_id}, key="player_id"
+                )
+            ]
         except Exception as e:
             logger.error(f"Failed to get predictions: {e}")
             return []
@@ -180,26 +450,34 @@ class SupabaseService:
     async def save_team_analysis(self, analysis: Dict[str, Any]) -> Optional[str]:
         """Save team analysis and return the ID."""
         try:
-            if not self.client:
+            if not self.backend:
                 return None
 
-            response = self.client.table("team_analyses").insert(analysis).execute()
-            if response.data:
-                logger.info(f"Saved team analysis: {response.data[0]['id']}")
-                return response.data[0]["id"]
+            saved = await self._execute("team_analyses", "insert", analysis)
+            if saved:
+                analysis_id = str(saved["id"])
+                data_cache.set_analysis(analysis_id, saved)
+                logger.info(f"Saved team analysis: {analysis_id}")
+                return analysis_id
             return None
         except Exception as e:
             logger.error(f"Failed to save team analysis: {e}")
             return None
 
     async def get_team_analysis(self, analysis_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific team analysis by ID."""
+        """Get a specific team analysis by ID. Analyses are immutable, so hits are cached indefinitely."""
+        cached = data_cache.get_analysis(analysis_id)
+        if cached is not None:
+            return cached
+
         try:
-            if not self.client:
+            if not self.backend:
                 return None
 
-            response = self.client.table("team_analyses").select("*").eq("id", analysis_id).maybeSingle().execute()
-            return response.data
+            analysis = await self._select_one("team_analyses", {"id": analysis_id})
+            if analysis:
+                data_cache.set_analysis(analysis_id, analysis)
+            return analysis
         except Exception as e:
             logger.error(f"Failed to get team analysis: {e}")
             return None
@@ -208,7 +486,7 @@ class SupabaseService:
     async def update_cache_metadata(self, cache_key: str, data_type: str, ttl_seconds: int = 3600):
         """Update cache metadata to track data freshness."""
         try:
-            if not self.client:
+            if not self.backend:
                 return
 
             from datetime import datetime, timedelta
@@ -220,24 +498,24 @@ class SupabaseService:
                 "expires_at": (datetime.utcnow() + timedelta(seconds=ttl_seconds)).isoformat()
             }
 
-            self.client.table("cache_metadata").upsert(metadata).execute()
+            await self._execute("cache_metadata", "upsert", [metadata])
         except Exception as e:
             logger.error(f"Failed to update cache metadata: {e}")
 
     async def check_cache_freshness(self, cache_key: str) -> bool:
         """Check if cached data is still fresh."""
         try:
-            if not self.client:
+            if not self.backend:
                 return False
 
             from datetime import datetime
 
-            response = self.client.table("cache_metadata").select("expires_at").eq("cache_key", cache_key).maybeSingle().execute()
+            metadata = await self._select_one("cache_metadata", {"cache_key": cache_key}, ["expires_at"])
 
-            if not response.data:
+            if not metadata or not metadata.get("expires_at"):
                 return False
 
-            expires_at = datetime.fromisoformat(response.data["expires_at"].replace("Z", "+00:00"))
+            expires_at = datetime.fromisoformat(metadata["expires_at"].replace("Z", "+00:00"))
             return datetime.utcnow().replace(tzinfo=expires_at.tzinfo) < expires_at
         except Exception as e:
             logger.error(f"Failed to check cache freshness: {e}")
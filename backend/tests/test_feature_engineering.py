@@ -0,0 +1,121 @@
+"""
+Incremental feature state against a full rebuild of the season tensor.
+"""
+import io
+import random
+
+import numpy as np
+import pytest
+
+from ml.feature_engineering import (
+    FEATURE_NAMES, HISTORY_STATS, FeatureState, build_features, history_tensor, team_results,
+)
+
+TEAMS = 6
+GAMEWEEKS = 8
+
+
+def _season(seed=1):
+    """Players, histories, fixtures and teams with doubles, blanks and a mid-season signing."""
+    rng = random.Random(seed)
+    teams = [
+        {"id": team, "strength_attack_home": rng.randint(1000, 1300), "strength_attack_away": rng.randint(1000, 1300),
+         "strength_defence_home": rng.randint(1000, 1300), "strength_defence_away": rng.randint(1000, 1300)}
+        for team in range(1, TEAMS + 1)
+    ]
+
+    fixtures = []
+    for event in range(1, GAMEWEEKS + 1):
+        order = list(range(1, TEAMS + 1))
+        rng.shuffle(order)
+        pairs = [(order[i], order[i + 1]) for i in range(0, TEAMS, 2)]
+        if event == 3:
+            pairs = pairs[1:]  # blank for two teams
+        if event == 5:
+            pairs.append((pairs[0][1], pairs[1][0]))  # double for two teams
+        for home, away in pairs:
+            fixtures.append({
+                "id": len(fixtures) + 1, "event": event, "team_h": home, "team_a": away,
+                "team_h_difficulty": rng.randint(2, 5), "team_a_difficulty": rng.randint(2, 5),
+                "team_h_score": rng.randint(0, 4), "team_a_score": rng.randint(0, 4), "finished": True,
+            })
+
+    players = [
+        {"id": player_id, "team": rng.randint(1, TEAMS), "element_type": rng.randint(1, 4),
+         "now_cost": rng.randrange(40, 130, 5), "selected_by_percent": f"{rng.uniform(0, 40):.1f}"}
+        for player_id in range(1, 25)
+    ]
+    signing = 24  # joins after gameweek 4, no history before
+
+    histories = {}
+    for player in players:
+        history = []
+        for fixture in fixtures:
+            if player["team"] not in (fixture["team_h"], fixture["team_a"]):
+                continue
+            if player["id"] == signing and fixture["event"] <= 4:
+                continue
+            minutes = rng.choice((0, 0, 25, 90, 90))
+            history.append({
+                "fixture": fixture["id"], "round": fixture["event"],
+                "total_points": rng.randint(0, 12) if minutes else 0, "minutes": minutes,
+                "goals_scored": rng.randint(0, 1), "assists": rng.randint(0, 1),
+                "clean_sheets": rng.randint(0, 1), "bonus": rng.randint(0, 3),
+                "ict_index": f"{rng.uniform(0, 15):.1f}", "expected_goals": f"{rng.uniform(0, 1):.2f}",
+                "expected_assists": f"{rng.uniform(0, 1):.2f}",
+                # Price unchanged so the bootstrap price the update reads agrees with the history
+                "value": player["now_cost"], "selected": rng.randint(1000, 90000),
+            })
+        histories[player["id"]] = history
+    return players, histories, fixtures, teams
+
+
+@pytest.mark.parametrize("start", [0, 2, 4])
+def test_incremental_features_match_a_full_build(start):
+    players, histories, fixtures, teams = _season()
+    player_index = {player["id"]: row for row, player in enumerate(players)}
+    stats, fixture_counts, _, _, _ = history_tensor(histories, player_index, GAMEWEEKS - 1)
+    results = np.stack(team_results(fixtures, TEAMS, GAMEWEEKS - 1), axis=-1)
+
+    # Carried state starts after `start` gameweeks without the later signing, as a build then would have
+    state = FeatureState.from_history(players[:-1], histories, fixtures, teams, start)
+    state.extend(player["id"] for player in players)
+    rows = state.rows(np.array([player["id"] for player in players]))
+    price = np.full(len(state.ids), np.nan)
+    price[rows] = [player["now_cost"] / 10.0 for player in players]
+    ownership = np.full(len(state.ids), np.nan)  # no total_players: ownership is the bootstrap figure
+
+    for gameweek in range(start + 1, GAMEWEEKS):
+        gameweek_stats = np.zeros((len(state.ids), len(HISTORY_STATS)))
+        gameweek_stats[rows] = stats[:, gameweek - 1]
+        club_played = np.zeros(len(state.ids), dtype=bool)
+        club_played[rows] = [
+            any(player["team"] in (f["team_h"], f["team_a"]) for f in fixtures if f["event"] == gameweek)
+            for player in players
+        ]
+        state.advance(gameweek_stats, club_played, price, ownership, results[:, gameweek - 1])
+
+        full, _ = build_features(players, histories, fixtures, teams, gameweek, gameweek + 1)
+        incremental = state.features(players, fixtures, teams)
+        for column, name in enumerate(FEATURE_NAMES):
+            np.testing.assert_allclose(
+                incremental[:, column], full[gameweek, :, column], rtol=1e-5, atol=1e-5,
+                err_msg=f"{name} after GW{gameweek}"
+            )
+
+    assert fixture_counts[:, 4].max() == 2 and fixture_counts[:, 2].min() == 0
+
+
+def test_state_round_trips_through_npz():
+    players, histories, fixtures, teams = _season()
+    state = FeatureState.from_history(players, histories, fixtures, teams, 5)
+
+    buffer = io.BytesIO()
+    state.save(buffer)
+    buffer.seek(0)
+    loaded = FeatureState.load(buffer)
+
+    assert loaded.played == 5
+    np.testing.assert_array_equal(
+        loaded.features(players, fixtures, teams), state.features(players, fixtures, teams)
+    )
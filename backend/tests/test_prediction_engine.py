@@ -0,0 +1,147 @@
+"""
+Vectorized prediction engine: heuristic scoring, top-N index and fixture horizon.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from config import settings
+from services.prediction_engine import TopIndex, fixture_weights, score_players
+
+
+def _simple_prediction(player: dict) -> float:
+    """The per-player heuristic the engine replaced (api/routes/teams.py)."""
+    form = float(player.get("form", 0) or 0)
+    points_per_game = float(player.get("points_per_game", 0) or 0)
+    total_points = player.get("total_points", 0)
+
+    if total_points < 10:
+        return form * 1.2
+
+    return (form * 0.6 + points_per_game * 0.4) * 1.1
+
+
+def _players(count, seed=0):
+    rng = random.Random(seed)
+    players = []
+    for player_id in range(1, count + 1):
+        players.append({
+            "id": player_id,
+            "element_type": rng.randint(1, 4),
+            "team": rng.randint(1, 20),
+            "now_cost": rng.randrange(40, 130, 5) + rng.choice((0, 1, 2)),
+            "form": f"{rng.randint(0, 100) / 10:.1f}",
+            "points_per_game": f"{rng.randint(0, 80) / 10:.1f}",
+            "total_points": rng.randint(0, 150),
+            "minutes": rng.randint(0, 2000),
+            "status": "a",
+        })
+    # Identical inputs under different IDs, so ties have to keep snapshot order
+    for copy in range(3):
+        players.append(dict(players[copy], id=count + copy + 1))
+    return players
+
+
+@pytest.fixture
+def no_simulation(monkeypatch):
+    monkeypatch.setattr(settings, "simulation_samples", 0)
+
+
+def test_heuristic_matches_the_per_player_prediction(no_simulation):
+    players = _players(300)
+    batch = score_players(players, gameweek=10, model_version="heuristic")
+
+    expected = [_simple_prediction(player) for player in players]
+    np.testing.assert_allclose(batch.expected_points, expected, rtol=1e-12)
+
+    # Same order as sorted(..., reverse=True) over the old helper, ties included
+    old_order = sorted(range(len(players)), key=lambda row: expected[row], reverse=True)
+    assert batch.rank(np.arange(len(players))).tolist() == old_order
+
+
+def test_rows_keep_the_order_given(no_simulation):
+    batch = score_players(_players(30), gameweek=10, model_version="heuristic")
+
+    assert batch.rows([7, 2, 999, 15]).tolist() == [6, 1, 14]
+    assert batch.rows([]).tolist() == []
+
+
+@pytest.mark.parametrize("k", [3, 50])
+def test_top_index_matches_a_full_sort(k):
+    rng = np.random.default_rng(7)
+    count = 600
+    points = rng.integers(0, 30, count) / 2  # plenty of ties
+    element_type = rng.integers(1, 5, count)
+    now_cost = rng.integers(38, 131, count).astype(np.float64)
+    index = TopIndex.build(points, element_type, now_cost, k)
+
+    def full_sort(position, low, high, limit):
+        mask = np.ones(count, dtype=bool)
+        if position is not None:
+            mask &= element_type == position
+        if low is not None:
+            mask &= now_cost >= low
+        if high is not None:
+            mask &= now_cost <= high
+        rows = np.flatnonzero(mask)
+        return rows[np.lexsort((rows, -points[rows]))][:limit]
+
+    queries = [(None, None, None, 10), (None, None, None, 200), (2, None, None, 5), (3, None, None, 400)]
+    for _ in range(200):
+        low = rng.choice([None, float(rng.integers(35, 135))])
+        high = rng.choice([None, float(rng.integers(35, 135))])
+        queries.append((rng.choice([None, 1, 2, 3, 4]), low, high, int(rng.integers(1, 120))))
+
+    for position, low, high, limit in queries:
+        assert index.query(points, now_cost, position, low, high, limit).tolist() == \
+            full_sort(position, low, high, limit).tolist(), (position, low, high, limit)
+
+
+def _fixture(event, home, away, home_fdr=3, away_fdr=3):
+    return {
+        "id": event * 100 + home, "event": event, "team_h": home, "team_a": away,
+        "team_h_difficulty": home_fdr, "team_a_difficulty": away_fdr,
+    }
+
+
+def test_fixture_weights_count_blank_and_double_gameweeks():
+    fixtures = [
+        _fixture(5, 1, 2), _fixture(5, 3, 4, home_fdr=2, away_fdr=4),
+        # GW6: team 1 plays twice, team 4 blanks
+        _fixture(6, 1, 3), _fixture(6, 2, 1),
+        _fixture(7, 4, 1),
+        _fixture(9, 2, 3),  # past the horizon
+    ]
+    weights, difficulty = fixture_weights(fixtures, team_count=5, start=5, horizon=3)
+
+    assert weights.shape == (6, 3)
+    np.testing.assert_allclose(weights[1], [1, 2, 1])
+    np.testing.assert_allclose(weights[4, 1], 0)
+    assert weights[3, 0] > 1 > weights[4, 0]  # easier and harder than average
+    np.testing.assert_allclose(weights[5], 0)  # no fixtures at all
+    np.testing.assert_allclose(difficulty[[1, 3, 4]], [3, 2, 4])
+    assert np.isnan(difficulty[5])
+
+
+def test_horizon_zeroes_blanks_and_doubles_doubles(no_simulation, monkeypatch):
+    monkeypatch.setattr(settings, "prediction_horizon", 3)
+    players = [
+        {"id": 1, "element_type": 3, "team": 1, "now_cost": 80, "form": "5.0", "points_per_game": "5.0",
+         "total_points": 50, "status": "a"},
+        {"id": 2, "element_type": 4, "team": 4, "now_cost": 70, "form": "4.0", "points_per_game": "4.0",
+         "total_points": 40, "status": "a"},
+        {"id": 3, "element_type": 2, "team": 2, "now_cost": 50, "form": "3.0", "points_per_game": "3.0",
+         "total_points": 30, "status": "i"},
+    ]
+    fixtures = [_fixture(5, 1, 2), _fixture(5, 3, 4), _fixture(6, 1, 3), _fixture(6, 2, 1), _fixture(7, 4, 1)]
+    batch = score_players(players, gameweek=5, model_version="heuristic", fixtures=fixtures)
+
+    rate = np.array([_simple_prediction(player) for player in players])
+    np.testing.assert_allclose(batch.horizon[0], rate[0] * np.array([1, 2, 1]))
+    np.testing.assert_allclose(batch.horizon[1], rate[1] * np.array([1, 0, 1]))
+    # Unavailable this gameweek only
+    np.testing.assert_allclose(batch.horizon[2], rate[2] * np.array([0, 1, 0]))
+    np.testing.assert_allclose(batch.horizon[:, 0], batch.expected_points)
+    np.testing.assert_allclose(batch.horizon_points(np.arange(3), 2), [rate[0] * 3, rate[1], rate[2]])
+    assert batch.rank_horizon(np.arange(3), 3).tolist() == [0, 1, 2]
@@ -0,0 +1,168 @@
+"""
+Bulk-write chunking and the embedded SQLite storage backend.
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from config import settings
+from services.data_cache_service import data_cache
+from services.storage import SQLiteBackend, StorageBackend
+from services.supabase_client import SupabaseService, chunk_rows
+
+
+def _rows(count, padding=0):
+    return [{"id": i, "web_name": f"Player {i}", "note": "x" * padding} for i in range(count)]
+
+
+def test_chunks_respect_the_row_limit_and_keep_order():
+    rows = _rows(1203)
+    chunks = chunk_rows(rows, max_rows=500, max_bytes=10_000_000)
+
+    assert [len(chunk) for chunk in chunks] == [500, 500, 203]
+    assert [row for chunk in chunks for row in chunk] == rows
+
+
+def test_chunks_respect_the_byte_limit():
+    rows = _rows(100, padding=200)
+    chunks = chunk_rows(rows, max_rows=500, max_bytes=5_000)
+
+    assert len(chunks) > 1
+    assert all(len(json.dumps(chunk)) <= 5_000 for chunk in chunks)
+    assert [row for chunk in chunks for row in chunk] == rows
+
+
+def test_oversized_row_gets_its_own_chunk():
+    rows = _rows(2) + _rows(1, padding=10_000) + _rows(2)
+    chunks = chunk_rows(rows, max_rows=500, max_bytes=1_000)
+
+    assert [len(chunk) for chunk in chunks] == [2, 1, 2]
+    assert chunk_rows([], 500, 1_000) == []
+
+
+class FlakyBackend(StorageBackend):
+    """Records upserted chunks; the first attempt at each chunk in `failing` raises."""
+
+    name = "flaky"
+
+    def __init__(self, failing=(), always_failing=()):
+        self.failing = set(failing)
+        self.always_failing = set(always_failing)
+        self.written = []
+        self.lock = threading.Lock()
+
+    def select(self, table, columns=None, filters=None, ranges=None, order_by=None, descending=False, limit=None):
+        return []
+
+    def upsert(self, table, rows, on_conflict=""):
+        first = rows[0]["id"]
+        with self.lock:
+            if first in self.always_failing or first in self.failing:
+                self.failing.discard(first)
+                raise RuntimeError(f"chunk starting at {first} failed")
+            self.written.append(rows)
+
+    def insert(self, table, row):
+        return row
+
+
+def _bulk_upsert(backend, rows):
+    async def main():
+        service = SupabaseService()
+        service.backend = backend
+        return await service._bulk_upsert("players", rows)
+
+    return asyncio.run(main())
+
+
+def test_bulk_upsert_retries_failed_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "supabase_upsert_chunk_rows", 10)
+    monkeypatch.setattr(settings, "supabase_upsert_retries", 1)
+    backend = FlakyBackend(failing={20})
+    result = _bulk_upsert(backend, _rows(45))
+
+    assert result.success
+    assert result.chunks == 5
+    assert result.written_rows == 45
+    assert sorted(row["id"] for chunk in backend.written for row in chunk) == list(range(45))
+
+
+def test_bulk_upsert_reports_chunks_that_keep_failing(monkeypatch):
+    monkeypatch.setattr(settings, "supabase_upsert_chunk_rows", 10)
+    monkeypatch.setattr(settings, "supabase_upsert_retries", 1)
+    result = _bulk_upsert(FlakyBackend(always_failing={10}), _rows(25))
+
+    assert not result
+    assert result.written_rows == 15
+    assert result.failed_rows == 10
+    assert [(chunk["index"], chunk["rows"]) for chunk in result.failed_chunks] == [(1, 10)]
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "fpl.db"))
+    yield backend
+    backend.close()
+
+
+def _player(player_id, **changes):
+    player = {
+        "id": player_id, "web_name": f"Player {player_id}", "first_name": "First", "second_name": "Last",
+        "team_id": player_id % 20 + 1, "team_code": 3, "element_type": 3, "now_cost": 50 + player_id, "status": "a",
+    }
+    player.update(changes)
+    return player
+
+
+def test_sqlite_upsert_updates_in_place(sqlite_backend):
+    sqlite_backend.upsert("players", [_player(i) for i in range(1, 6)])
+    sqlite_backend.upsert("players", [_player(2, now_cost=99), _player(6)])
+
+    rows = sqlite_backend.select("players", columns=["id", "now_cost"], order_by="id")
+    assert [row["id"] for row in rows] == [1, 2, 3, 4, 5, 6]
+    assert rows[1]["now_cost"] == 99
+
+
+def test_sqlite_select_filters_ranges_order_and_limit(sqlite_backend):
+    sqlite_backend.upsert("players", [_player(i, element_type=i % 4 + 1) for i in range(1, 21)])
+
+    rows = sqlite_backend.select(
+        "players", columns=["id"], filters={"element_type": 2},
+        ranges=[("now_cost", "gte", 55), ("now_cost", "lt", 70)],
+        order_by="now_cost", descending=True, limit=3
+    )
+    assert [row["id"] for row in rows] == [17, 13, 9]
+
+    with pytest.raises(ValueError):
+        sqlite_backend.select("players", columns=["id; DROP TABLE players"])
+    with pytest.raises(ValueError):
+        sqlite_backend.select("no_such_table")
+
+
+def test_sqlite_saves_and_reads_back_a_team_analysis(sqlite_backend):
+    analysis = {
+        "team_value": 99.5, "free_transfers": 1, "bank": 0.5, "players": [1, 2, 3],
+        "captain_id": 1, "vice_captain_id": 2,
+        "predicted_gameweek_points": 55.2, "predicted_bench_points": 6.1,
+        "transfer_suggestions": [{"player_out_id": 3, "player_in_id": 9}],
+        "captain_suggestion": {"player_id": 1, "expected_points": 7.4},
+        "vice_captain_suggestion": None, "bench_order": [3],
+    }
+
+    async def main():
+        service = SupabaseService()
+        service.backend = sqlite_backend
+        analysis_id = await service.save_team_analysis(analysis)
+        data_cache.analyses_cache.clear()  # read from the database, not the cache
+        return analysis_id, await service.get_team_analysis(analysis_id)
+
+    analysis_id, stored = asyncio.run(main())
+
+    assert isinstance(analysis_id, str)
+    assert stored["id"] == analysis_id
+    assert stored["players"] == [1, 2, 3]
+    assert stored["transfer_suggestions"] == analysis["transfer_suggestions"]
+    assert stored["captain_suggestion"] == analysis["captain_suggestion"]
+    assert stored["vice_captain_suggestion"] is None
@@ -0,0 +1,99 @@
+"""
+Lightweight in-process latency metrics
+"""
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Any
+
+
+class LatencyRecorder:
+    """Rolling latency statistics keyed by operation name."""
+
+    def __init__(self, name: str, window: int = 1024):
+        self.name = name
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float, error: bool = False):
+        """
+        Record one timed call.
+
+        Args:
+            key: Operation name (e.g. "players.select")
+            seconds: Elapsed wall-clock time
+            error: Whether the call failed
+        """
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            if error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    @contextmanager
+    def time(self, key: str):
+        """Time the enclosed block and record it under key."""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(key, time.perf_counter() - start, error)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize recorded latencies.
+
+        Returns:
+            Mapping of operation name to count, errors and latency percentiles (ms)
+        """
+        with self._lock:
+            items = {key: sorted(samples) for key, samples in self._samples.items()}
+            counts = dict(self._counts)
+            errors = dict(self._errors)
+
+        summary = {}
+        for key, samples in items.items():
+            if not samples:
+                continue
+            summary[key] = {
+                "count": counts.get(key, 0),
+                "errors": errors.get(key, 0),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+                "p50_ms": round(_percentile(samples, 0.50) * 1000, 2),
+                "p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+        return summary
+
+
+def _percentile(sorted_samples, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+_recorders: Dict[str, LatencyRecorder] = {}
+
+
+def get_recorder(name: str) -> LatencyRecorder:
+    """Get or create the named latency recorder."""
+    recorder = _recorders.get(name)
+    if recorder is None:
+        recorder = _recorders[name] = LatencyRecorder(name)
+    return recorder
+
+
+def metrics_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Summaries of every registered recorder."""
+    return {name: recorder.snapshot() for name, recorder in _recorders.items()}
@@ -0,0 +1,103 @@
+"""
+Request body size limits enforced while the body streams in
+"""
+import json
+import logging
+from typing import Dict
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+def _limit_message(limit: int) -> str:
+    return f"Request body must be at most {limit // (1024 * 1024)}MB"
+
+
+class BodyTooLargeError(HTTPException):
+    """
+    Raised from receive() once a request body passes its limit.
+
+    An HTTPException so body parsing lets it through and the app renders the 413.
+    """
+
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=_limit_message(limit))
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that caps request body size for specific paths.
+
+    Requests declaring a larger Content-Length are rejected with 413 before any
+    of the body is read. Bodies without a usable Content-Length (e.g. chunked)
+    are counted as they arrive and cut off with 413 as soon as they pass the
+    limit, so an oversized upload is never buffered in full.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        """
+        Args:
+            app: ASGI application
+            limits: Maximum body bytes by exact request path
+        """
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.limits:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits[scope["path"]]
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > limit:
+                    logger.warning(f"Rejecting {scope['path']}: Content-Length {declared} exceeds {limit}")
+                    await self._reject(send, limit)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise BodyTooLargeError(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLargeError:
+            logger.warning(f"Rejecting {scope['path']}: body exceeded {limit} bytes")
+            if not response_started:
+                await self._reject(send, limit)
+
+    async def _reject(self, send, limit: int):
+        """Send a 413 in the same shape as HTTPException responses."""
+        body = json.dumps({"detail": _limit_message(limit)}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,66 @@
+/*
+  # Player gameweek history
+
+  1. New Tables
+    - `player_history`
+      - Per-fixture stats for each player, from the element-summary endpoint
+      - One row per (player, fixture); double gameweeks produce two rows
+      - Bulk loaded at the end of each gameweek
+
+  2. Security
+    - Enable RLS
+    - Public read access, service role writes
+*/
+
+CREATE TABLE IF NOT EXISTS player_history (
+  player_id bigint NOT NULL,
+  fixture_id bigint NOT NULL,
+  round int NOT NULL,
+  opponent_team bigint,
+  was_home boolean DEFAULT false,
+  kickoff_time timestamptz,
+  team_h_score int,
+  team_a_score int,
+  total_points int DEFAULT 0,
+  minutes int DEFAULT 0,
+  starts int DEFAULT 0,
+  goals_scored int DEFAULT 0,
+  assists int DEFAULT 0,
+  clean_sheets int DEFAULT 0,
+  goals_conceded int DEFAULT 0,
+  own_goals int DEFAULT 0,
+  penalties_saved int DEFAULT 0,
+  penalties_missed int DEFAULT 0,
+  yellow_cards int DEFAULT 0,
+  red_cards int DEFAULT 0,
+  saves int DEFAULT 0,
+  bonus int DEFAULT 0,
+  bps int DEFAULT 0,
+  influence numeric(10,2) DEFAULT 0,
+  creativity numeric(10,2) DEFAULT 0,
+  threat numeric(10,2) DEFAULT 0,
+  ict_index numeric(10,2) DEFAULT 0,
+  expected_goals numeric(10,2),
+  expected_assists numeric(10,2),
+  expected_goal_involvements numeric(10,2),
+  expected_goals_conceded numeric(10,2),
+  value int,
+  selected bigint,
+  transfers_in bigint DEFAULT 0,
+  transfers_out bigint DEFAULT 0,
+  updated_at timestamptz DEFAULT now(),
+  PRIMARY KEY (player_id, fixture_id)
+);
+
+ALTER TABLE player_history ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view player history"
+  ON player_history FOR SELECT
+  USING (true);
+
+CREATE POLICY "Service can update player history"
+  ON player_history FOR ALL
+  USING (true)
+  WITH CHECK (true);
+
+CREATE INDEX IF NOT EXISTS idx_player_history_round ON player_history(round);